@@ -0,0 +1,58 @@
+"""
+Реестр администраторов: роли по user_id в БД и кэш для проверки за O(1)
+"""
+from typing import FrozenSet
+
+from database import Database
+
+
+class AdminRegistry:
+    """Кэш ролей администраторов поверх таблиц admin_roles и admin_invites
+
+    Кэш — неизменяемые frozenset, которые пересобираются после каждого изменения
+    ролей, поэтому проверка прав не обращается к БД и не требует перезапуска.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._admin_ids: FrozenSet[int] = frozenset()
+        self._invited_usernames: FrozenSet[str] = frozenset()
+
+    def reload(self) -> None:
+        """Перечитывание ролей из БД (инвалидация кэша)"""
+        self._admin_ids = frozenset(role['user_id'] for role in self.db.get_admin_roles())
+        self._invited_usernames = frozenset(self.db.get_admin_invites())
+
+    @property
+    def admin_ids(self) -> FrozenSet[int]:
+        return self._admin_ids
+
+    @property
+    def invited_usernames(self) -> FrozenSet[str]:
+        return self._invited_usernames
+
+    def is_admin(self, user) -> bool:
+        """Проверка прав по user_id; приглашенный по username получает роль при первом обращении"""
+        if user.id in self._admin_ids:
+            return True
+
+        if user.username and user.username.lower() in self._invited_usernames:
+            self.grant(user.id, user.username, added_by=None)
+            return True
+
+        return False
+
+    def grant(self, user_id: int, username: str, added_by=None) -> bool:
+        success = self.db.add_admin_role(user_id, username, added_by)
+        self.reload()
+        return success
+
+    def invite(self, username: str, added_by=None) -> bool:
+        success = self.db.add_admin_invite(username.lstrip('@'), added_by)
+        self.reload()
+        return success
+
+    def revoke(self, user_id=None, username=None) -> int:
+        removed = self.db.remove_admin(user_id=user_id, username=username.lstrip('@') if username else None)
+        self.reload()
+        return removed
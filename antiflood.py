@@ -0,0 +1,120 @@
+"""
+Защита от флуда: token bucket на пользователя и на каждую команду
+"""
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Ключ корзины, общей для всех обновлений пользователя
+ANY_UPDATE = "*"
+
+
+class TokenBucket:
+    """Корзина токенов: capacity запросов подряд, затем refill_rate запросов в секунду"""
+
+    __slots__ = ('capacity', 'refill_rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def has_token(self, now: float) -> bool:
+        """Пополнение корзины на текущий момент и проверка, есть ли токен (без траты)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+        return self.tokens >= 1
+
+    def is_idle(self, now: float) -> bool:
+        """Корзина успела бы полностью восстановиться — её можно удалить"""
+        return self.tokens + (now - self.updated) * self.refill_rate >= self.capacity
+
+
+class FloodGuard:
+    """Лимиты запросов по пользователям и командам с подсчетом отброшенных обновлений
+
+    limits: ключ ("*", имя команды, "callback", "message") -> (capacity, refill_rate).
+    Ключи без явного лимита проверяются только общей корзиной пользователя.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], notice_interval: float = 30, prune_every: int = 10000):
+        self.limits = limits
+        self.notice_interval = notice_interval
+        self.prune_every = prune_every
+        self._buckets: Dict[Tuple[int, str], TokenBucket] = {}
+        self._last_notice: Dict[int, float] = {}
+        self._checks = 0
+
+        self.allowed = Counter()
+        self.dropped = Counter()
+        self.dropped_by_user = Counter()
+
+    def _bucket(self, user_id: int, key: str) -> Optional[TokenBucket]:
+        limit = self.limits.get(key)
+        if limit is None:
+            return None
+        bucket = self._buckets.get((user_id, key))
+        if bucket is None:
+            bucket = self._buckets[(user_id, key)] = TokenBucket(*limit)
+        return bucket
+
+    def check(self, user_id: int, key: str) -> bool:
+        """True — обновление можно обрабатывать, False — его нужно отбросить"""
+        now = time.monotonic()
+
+        self._checks += 1
+        if self._checks % self.prune_every == 0:
+            self.prune(now)
+
+        # Токен тратится, только если его дают обе корзины: отброшенное общей корзиной
+        # обновление не должно расходовать лимит команды (и наоборот)
+        buckets = [
+            bucket for bucket in (self._bucket(user_id, key), self._bucket(user_id, ANY_UPDATE))
+            if bucket is not None
+        ]
+        if not all(bucket.has_token(now) for bucket in buckets):
+            self.dropped[key] += 1
+            self.dropped_by_user[user_id] += 1
+            return False
+
+        for bucket in buckets:
+            bucket.tokens -= 1
+        self.allowed[key] += 1
+        return True
+
+    def should_notify(self, user_id: int) -> bool:
+        """Предупреждать пользователя о лимите не чаще раза в notice_interval секунд"""
+        now = time.monotonic()
+        last_notice = self._last_notice.get(user_id)
+        if last_notice is not None and now - last_notice < self.notice_interval:
+            return False
+        self._last_notice[user_id] = now
+        return True
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Удаление восстановившихся корзин, чтобы память не росла с числом пользователей"""
+        now = now or time.monotonic()
+        for bucket_key in [k for k, bucket in self._buckets.items() if bucket.is_idle(now)]:
+            del self._buckets[bucket_key]
+        for user_id in [u for u, t in self._last_notice.items() if now - t >= self.notice_interval]:
+            del self._last_notice[user_id]
+
+    def tracked_buckets(self) -> int:
+        return len(self._buckets)
+
+    def top_offenders(self, limit: int = 5) -> List[Tuple[int, int]]:
+        return self.dropped_by_user.most_common(limit)
+
+
+def update_key(update) -> str:
+    """Ключ лимита для обновления: имя команды, "callback" или "message" """
+    if update.callback_query:
+        return "callback"
+    message = update.effective_message
+    text = message.text if message and message.text else ""
+    if text.startswith("/"):
+        parts = text[1:].split(maxsplit=1)
+        if parts:
+            return parts[0].split("@", 1)[0].lower()
+    return "message"
@@ -0,0 +1,134 @@
+"""
+Учет обращений к Bot API: по методам, ошибки и на одну завершенную регистрацию
+"""
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Callable, Dict, Optional
+
+from telegram.request import BaseRequest, HTTPXRequest
+
+
+class ApiCallStats:
+    """Счетчики вызовов Bot API
+
+    Вызовы в чаты, где идет регистрация (отмечены через begin), суммируются
+    отдельно; при finish сумма попадает в историю завершенных регистраций.
+    Число отслеживаемых чатов ограничено: брошенные регистрации вытесняются
+    первыми и не требуют явной очистки.
+    """
+
+    def __init__(self, history_size: int = 1000, max_tracked: int = 10000):
+        self.calls_by_method: Counter = Counter()
+        self.errors_by_method: Counter = Counter()
+        self.max_tracked = max_tracked
+        self._tracked: "OrderedDict[int, int]" = OrderedDict()
+        self._history: deque = deque(maxlen=history_size)
+        self.completed_total = 0
+
+    def record(self, method: str, chat_id=None) -> None:
+        self.calls_by_method[method] += 1
+        if chat_id is None:
+            return
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            return
+        if chat_id in self._tracked:
+            self._tracked[chat_id] += 1
+
+    def record_error(self, method: str) -> None:
+        """Ответ Bot API с ошибкой (HTTP 4xx/5xx) или сбой соединения"""
+        self.errors_by_method[method] += 1
+
+    def begin(self, chat_id: int) -> None:
+        """Начало регистрации в чате: счетчик чата обнуляется"""
+        self._tracked.pop(chat_id, None)
+        self._tracked[chat_id] = 0
+        while len(self._tracked) > self.max_tracked:
+            self._tracked.popitem(last=False)
+
+    def finish(self, chat_id: int) -> Optional[int]:
+        """Завершение регистрации; возвращает число вызовов Bot API за нее"""
+        calls = self._tracked.pop(chat_id, None)
+        if calls is not None:
+            self._history.append(calls)
+            self.completed_total += 1
+        return calls
+
+    def per_registration(self) -> Dict[str, float]:
+        """Среднее, медиана и максимум вызовов на регистрацию по последним завершенным"""
+        if not self._history:
+            return {}
+        ordered = sorted(self._history)
+        return {
+            'count': len(ordered),
+            'average': sum(ordered) / len(ordered),
+            'median': ordered[len(ordered) // 2],
+            'max': ordered[-1],
+        }
+
+
+async def _count_call(stats: ApiCallStats, charge: Optional[Callable[[float], None]], url: str, request_data, call):
+    """Учет вызова Bot API: метод, чат, ошибка и длительность (call — корутина самого запроса)"""
+    api_method = url.rsplit('/', 1)[-1]
+    chat_id = request_data.parameters.get('chat_id') if request_data is not None else None
+    stats.record(api_method, chat_id)
+    start = time.perf_counter()
+    try:
+        code, payload = await call
+    except Exception:
+        stats.record_error(api_method)
+        raise
+    finally:
+        if charge is not None:
+            charge(time.perf_counter() - start)
+    if code >= 400:
+        stats.record_error(api_method)
+    return code, payload
+
+
+class CountingRequest(HTTPXRequest):
+    """HTTPXRequest, который учитывает каждый вызов Bot API и его ошибки в ApiCallStats
+
+    charge получает длительность каждого вызова (например, для профилировщика обработчиков).
+    """
+
+    def __init__(self, stats: ApiCallStats, charge: Optional[Callable[[float], None]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+        self.charge = charge
+
+    async def do_request(self, url: str, method: str, request_data=None, **kwargs):
+        return await _count_call(self.stats, self.charge, url, request_data,
+                                 super().do_request(url, method, request_data, **kwargs))
+
+
+class PooledRequest(BaseRequest):
+    """Запросы одного бота через общий HTTPXRequest — один пул соединений на процесс
+
+    Нужен, когда в одном процессе работают несколько ботов (multi_event.py).
+    Пулом управляет тот, кто его создал: initialize/shutdown бота его не
+    открывают и не закрывают. stats=None — вызовы не учитываются (getUpdates).
+    """
+
+    def __init__(self, pool: HTTPXRequest, stats: Optional[ApiCallStats] = None,
+                 charge: Optional[Callable[[float], None]] = None):
+        self.pool = pool
+        self.stats = stats
+        self.charge = charge
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self.pool.read_timeout
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data=None, **kwargs):
+        call = self.pool.do_request(url, method, request_data, **kwargs)
+        if self.stats is None:
+            return await call
+        return await _count_call(self.stats, self.charge, url, request_data, call)
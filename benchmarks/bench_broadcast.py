@@ -0,0 +1,142 @@
+"""
+Прогон рассылки на заглушке Bot API: темп отправки, счетчики и продолжение после сбоя
+
+Заглушка отвечает с задержкой, часть получателей «заблокировала бота», а один
+запрос получает RetryAfter. Посреди рассылки бот «падает» (задача отменяется),
+затем рассылка продолжается с сохраненного курсора новым BroadcastRunner.
+
+Запуск: python benchmarks/bench_broadcast.py [получателей] [сообщений в секунду]
+Код возврата 1 — кто-то не получил сообщение, получил его дважды сверх одной
+порции, счетчики не сходятся или превышен темп.
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.error import Forbidden, RetryAfter  # noqa: E402
+
+from broadcast import BroadcastRunner  # noqa: E402
+from database import Database  # noqa: E402
+
+BATCH_SIZE = 50
+LATENCY = 0.05
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = Counter()
+        self.timestamps = []
+        self.retry_after_sent = False
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(LATENCY)
+        if chat_id == 777 and not self.retry_after_sent:
+            self.retry_after_sent = True
+            raise RetryAfter(1)
+        if chat_id % 10 == 0:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        self.sent[chat_id] += 1
+        self.timestamps.append(time.monotonic())
+
+
+def seed(db_path: str, rows: int):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """
+        INSERT INTO registrations
+        (user_id, full_name, birth_date, email, phone, university, course,
+         interested_in_internship, consent_given, consent_datetime, registration_datetime, telegram_username)
+        VALUES (?, 'Иванов Иван Иванович', '15.03.2003', 'ivanov@mail.ru', '+79991234567',
+                'ИТМО (Университет ИТМО)', '2 курс', 0, 1, '2025-01-01T00:00:00', '2025-01-01T00:00:00', '')
+        """,
+        [(user_id,) for user_id in range(1, rows + 1)]
+    )
+    conn.commit()
+    conn.close()
+
+
+async def run(db: Database, recipients: int, rate: float) -> list:
+    failures = []
+    bot = FakeBot()
+    campaign_id = db.create_campaign("Завтра в 10:00 открытие форума", 'all', created_by=None)
+
+    # 1. Старт и «падение» посреди рассылки
+    runner = BroadcastRunner(db, rate, BATCH_SIZE)
+    start = time.monotonic()
+    runner.start(bot, campaign_id)
+    await asyncio.sleep(recipients / rate / 2)
+    await runner.shutdown()
+    checkpoint = db.get_campaign(campaign_id)
+    print(f"Сбой после {sum(bot.sent.values())} отправок, курсор: user_id {checkpoint['last_user_id']}, "
+          f"статус: {checkpoint['status']}")
+
+    # 2. Продолжение с курсора новым экземпляром (как после перезапуска бота)
+    finished = asyncio.Event()
+
+    async def on_finish(campaign):
+        finished.set()
+
+    resumed = BroadcastRunner(db, rate, BATCH_SIZE)
+    for campaign in db.get_running_campaigns():
+        resumed.start(bot, campaign['id'], on_finish=on_finish)
+    await finished.wait()
+    elapsed = time.monotonic() - start
+
+    campaign = db.get_campaign(campaign_id)
+    expected_blocked = recipients // 10
+    duplicates = sum(count - 1 for count in bot.sent.values() if count > 1)
+    missing = [user_id for user_id in range(1, recipients + 1) if user_id % 10 and not bot.sent[user_id]]
+
+    print(f"Получателей: {recipients}, время: {elapsed:.1f} с ({len(bot.timestamps) / elapsed:.1f} сообщ./с, лимит {rate})")
+    print(f"Статус: {campaign['status']}, доставлено: {campaign['delivered']}, "
+          f"заблокировали: {campaign['blocked']}, ошибки: {campaign['failed']}")
+    print(f"Повторных отправок после сбоя: {duplicates} (допустимо до {BATCH_SIZE})")
+
+    if campaign['status'] != 'done':
+        failures.append("рассылка не завершена")
+    if missing:
+        failures.append(f"не получили сообщение: {len(missing)}")
+    if duplicates > BATCH_SIZE:
+        failures.append(f"повторных отправок больше одной порции: {duplicates}")
+    if campaign['blocked'] < expected_blocked or campaign['delivered'] < recipients - expected_blocked:
+        failures.append("счетчики не сходятся с отправками")
+
+    # Темп в любом окне в 1 секунду не выше лимита (с запасом на погрешность таймера)
+    timestamps = sorted(bot.timestamps)
+    left = 0
+    peak = 0
+    for right, moment in enumerate(timestamps):
+        while moment - timestamps[left] > 1.0:
+            left += 1
+        peak = max(peak, right - left + 1)
+    print(f"Пиковый темп за 1 с: {peak}")
+    if peak > rate * 1.1 + 1:
+        failures.append(f"превышен темп: {peak} сообщений за секунду")
+
+    return failures
+
+
+def main():
+    recipients = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "broadcast.db")
+        db = Database(db_path)
+        seed(db_path, recipients)
+        failures = asyncio.run(run(db, recipients, rate))
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Рассылка продолжена после сбоя, все получатели обработаны")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Пропускная способность отметки прохода по билетам
+
+Сравнивает поиск участника в registrations по ФИО (как на входе без билетов)
+с проверкой подписанного билета в CheckInDesk. Проверяет, что повторы
+и поддельные коды распознаются, а все отметки доходят до БД порциями.
+
+Запуск: python benchmarks/bench_checkin.py [участников] [сканирований]
+Код возврата 1 — повтор или подделка не распознаны, либо в БД записано не всё.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from tickets import CheckInDesk, TicketSigner, SCAN_OK, SCAN_DUPLICATE, SCAN_INVALID  # noqa: E402
+
+FLUSH_EVERY = 200
+
+
+def seed(db_path: str, rows: int):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """
+        INSERT INTO registrations
+        (user_id, full_name, birth_date, email, phone, university, course,
+         interested_in_internship, consent_given, consent_datetime, registration_datetime, telegram_username)
+        VALUES (?, ?, '15.03.2003', 'ivanov@mail.ru', '+79991234567',
+                'ИТМО (Университет ИТМО)', '2 курс', 0, 1, '2025-01-01T00:00:00', '2025-01-01T00:00:00', '')
+        """,
+        [(user_id, f"Участник Тестовый {user_id}") for user_id in range(1, rows + 1)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def lookup_by_name(db_path: str, user_ids) -> float:
+    """Прежний способ: поиск участника по ФИО в БД"""
+    conn = sqlite3.connect(db_path)
+    start = time.perf_counter()
+    for user_id in user_ids:
+        conn.execute("SELECT user_id FROM registrations WHERE full_name = ?", (f"Участник Тестовый {user_id}",)).fetchone()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def main():
+    participants = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    scans = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    failures = []
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "checkin.db")
+        db = Database(db_path)
+        seed(db_path, participants)
+
+        signer = TicketSigner(b"bench-secret")
+        desk = CheckInDesk(signer)
+        start = time.perf_counter()
+        desk.load(db.get_confirmed_names(), db.get_checkins())
+        print(f"Загрузка индекса ({participants} участников): {(time.perf_counter() - start) * 1000:.0f} мс")
+
+        # Поток сканирований: большинство — новые участники, часть — повторы и подделки
+        codes = []
+        expected = []
+        seen = set()
+        for _ in range(scans):
+            kind = rng.random()
+            if kind < 0.05:
+                # Подделка: в подписи настоящего билета заменен последний символ
+                valid = signer.issue(rng.randint(1, participants))
+                codes.append(valid[:-1] + ("B" if valid.endswith("A") else "A"))
+                expected.append(SCAN_INVALID)
+                continue
+            user_id = rng.randint(1, participants)
+            codes.append(signer.issue(user_id))
+            expected.append(SCAN_DUPLICATE if user_id in seen else SCAN_OK)
+            seen.add(user_id)
+
+        baseline_sample = [rng.randint(1, participants) for _ in range(200)]
+        baseline = lookup_by_name(db_path, baseline_sample) / len(baseline_sample)
+        print(f"Поиск по ФИО в БД: {baseline * 1000:.2f} мс на участника (~{1 / baseline:.0f}/с)")
+
+        mismatches = 0
+        flush_time = 0.0
+        start = time.perf_counter()
+        for index, (code, want) in enumerate(zip(codes, expected), 1):
+            result, _, _ = desk.scan(code, scanned_by=1)
+            if result != want:
+                mismatches += 1
+            if index % FLUSH_EVERY == 0:
+                flush_start = time.perf_counter()
+                db.save_checkins(desk.take_pending())
+                flush_time += time.perf_counter() - flush_start
+        db.save_checkins(desk.take_pending())
+        elapsed = time.perf_counter() - start
+
+        stored = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM checkins").fetchone()[0]
+        print(f"Проверка билетов: {scans / elapsed:.0f} сканирований/с "
+              f"({(elapsed - flush_time) / scans * 1e6:.1f} мкс на проверку, запись в БД {flush_time * 1000:.0f} мс всего)")
+        print(f"Проходов: {len(desk.checked_in)}, повторов: {desk.duplicates_total}, "
+              f"недействительных: {desk.invalid_total}, записано в БД: {stored}")
+
+        if mismatches:
+            failures.append(f"неверных решений: {mismatches}")
+        if stored != len(desk.checked_in):
+            failures.append(f"в БД {stored} отметок вместо {len(desk.checked_in)}")
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Повторы и подделки распознаны, все отметки записаны")
+
+
+if __name__ == '__main__':
+    main()
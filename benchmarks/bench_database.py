@@ -0,0 +1,218 @@
+"""
+Микробенчмарк слоя Database на 1 тыс., 100 тыс. и 1 млн регистраций
+
+База заполняется синтетическими участниками с правдоподобными ФИО, датами,
+email, телефонами, университетами и курсами. Для каждого размера замеряются
+save_registration, get_registration, get_all_registrations, get_statistics,
+get_admin_chats и выгрузка CSV из админ-панели (get_all_registrations +
+format_registrations_csv): операций в секунду, миллисекунд на операцию и
+пиковая память на одну операцию (tracemalloc, отдельным проходом).
+
+Запуск: python benchmarks/bench_database.py [--sizes 1000,100000,1000000]
+        [--output results/database.json] [--baseline старый.json] [--tolerance 0.3]
+Код возврата 1 — (с --baseline) какая-то операция медленнее базового прогона
+больше чем на tolerance.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from config import UNIVERSITIES, COURSES  # noqa: E402
+from database import Database  # noqa: E402
+from notifications import format_registrations_csv  # noqa: E402
+from reporting import RESULTS_DIR, load_report, save_report  # noqa: E402
+
+MALE = (
+    ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков", "Федоров",
+     "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов", "Егоров", "Павлов", "Козлов", "Степанов", "Николаев"],
+    ["Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Алексей", "Артем", "Илья", "Кирилл", "Михаил",
+     "Никита", "Матвей", "Роман", "Егор", "Арсений", "Иван", "Денис", "Евгений", "Тимофей", "Владимир"],
+    ["Александрович", "Дмитриевич", "Сергеевич", "Андреевич", "Алексеевич", "Михайлович", "Иванович",
+     "Владимирович", "Николаевич", "Евгеньевич", "Олегович", "Игоревич", "Викторович", "Павлович"],
+)
+FEMALE = (
+    [surname + "а" for surname in MALE[0]],
+    ["Анастасия", "Мария", "Анна", "Виктория", "Екатерина", "Наталья", "Марина", "Полина", "София", "Дарья",
+     "Алиса", "Ксения", "Александра", "Елена", "Елизавета", "Варвара", "Вероника", "Ульяна", "Алина", "Ольга"],
+    ["Александровна", "Дмитриевна", "Сергеевна", "Андреевна", "Алексеевна", "Михайловна", "Ивановна",
+     "Владимировна", "Николаевна", "Евгеньевна", "Олеговна", "Игоревна", "Викторовна", "Павловна"],
+)
+_TRANSLIT = dict(zip(
+    "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+    ["a", "b", "v", "g", "d", "e", "e", "zh", "z", "i", "y", "k", "l", "m", "n", "o", "p", "r", "s", "t", "u",
+     "f", "kh", "ts", "ch", "sh", "sch", "", "y", "", "e", "yu", "ya"]
+))
+DOMAINS = ["mail.ru", "yandex.ru", "gmail.com", "edu.spbstu.ru", "niuitmo.ru", "spbu.ru"]
+
+FIRST_USER_ID = 100_000_000
+ADMIN_CHATS = 10
+SEED_CHUNK = 50_000
+
+
+def transliterate(text: str) -> str:
+    return "".join(_TRANSLIT.get(char, char) for char in text.lower())
+
+
+def make_registration(rng: random.Random, user_id: int, now: datetime) -> dict:
+    surnames, names, patronymics = MALE if rng.random() < 0.5 else FEMALE
+    surname, name = rng.choice(surnames), rng.choice(names)
+    university = rng.choice(UNIVERSITIES)
+    if university == UNIVERSITIES[-1]:
+        university = rng.choice(["МГУ им. М.В. Ломоносова", "НИУ ВШЭ", "МФТИ", "УрФУ", "НГУ"])
+    registered = now - timedelta(seconds=rng.randint(0, 60 * 24 * 3600))
+    return {
+        'user_id': user_id,
+        'full_name': f"{surname} {name} {rng.choice(patronymics)}",
+        'birth_date': f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1995, 2007)}",
+        'email': f"{transliterate(name)}.{transliterate(surname)}{user_id % 10000}@{rng.choice(DOMAINS)}",
+        'phone': f"+79{rng.randint(0, 999999999):09d}",
+        'university': university,
+        'course': rng.choice(COURSES),
+        'interested_in_internship': rng.random() < 0.4,
+        'consent_given': True,
+        'consent_datetime': registered.isoformat(),
+        'registration_datetime': registered.isoformat(),
+        'telegram_username': f"{transliterate(name)}_{user_id % 100000}" if rng.random() < 0.8 else '',
+    }
+
+
+def seed(db_path: str, rows: int, rng: random.Random) -> float:
+    """Заполнение таблиц порциями через executemany; возвращает время в секундах"""
+    start = time.perf_counter()
+    now = datetime.now()
+    conn = sqlite3.connect(db_path)
+    for offset in range(0, rows, SEED_CHUNK):
+        chunk = []
+        for user_id in range(FIRST_USER_ID + offset, FIRST_USER_ID + min(rows, offset + SEED_CHUNK)):
+            reg = make_registration(rng, user_id, now)
+            chunk.append((
+                reg['user_id'], reg['full_name'], reg['birth_date'], reg['email'], reg['phone'],
+                reg['university'], reg['course'], reg['interested_in_internship'], reg['consent_given'],
+                reg['consent_datetime'], reg['registration_datetime'], reg['telegram_username'],
+                'waitlist' if rng.random() < 0.1 else 'confirmed'
+            ))
+        conn.executemany(
+            """
+            INSERT INTO registrations
+            (user_id, full_name, birth_date, email, phone, university, course, interested_in_internship,
+             consent_given, consent_datetime, registration_datetime, telegram_username, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            chunk
+        )
+        conn.commit()
+    conn.executemany(
+        "INSERT INTO admin_chats (user_id, username, chat_id, added_datetime) VALUES (?, ?, ?, ?)",
+        [(index, f"admin{index}", index, now.isoformat()) for index in range(1, ADMIN_CHATS + 1)]
+    )
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - start
+
+
+def export(db: Database) -> bytes:
+    """Выгрузка CSV так же, как в админ-панели"""
+    return format_registrations_csv(db.get_all_registrations()).encode('utf-8')
+
+
+def operations(db: Database, rows: int, rng: random.Random):
+    """(название, функция одной операции, число повторов)"""
+    new_ids = iter(range(FIRST_USER_ID + rows, FIRST_USER_ID + rows + 1_000_000))
+    now = datetime.now()
+    full_scans = 3 if rows <= 100_000 else 1
+    return [
+        ("save_registration", lambda: db.save_registration(make_registration(rng, next(new_ids), now)), 300),
+        ("get_registration", lambda: db.get_registration(FIRST_USER_ID + rng.randrange(rows)), 2000),
+        ("get_admin_chats", db.get_admin_chats, 2000),
+        ("get_statistics", db.get_statistics, 10 if rows <= 100_000 else 3),
+        ("get_all_registrations", db.get_all_registrations, full_scans),
+        ("export", lambda: export(db), full_scans),
+    ]
+
+
+def measure(db: Database, rows: int, rng: random.Random) -> dict:
+    results = {}
+    for name, operation, repeats in operations(db, rows, rng):
+        operation()  # прогрев (кэш страниц SQLite)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            operation()
+        per_op = (time.perf_counter() - start) / repeats
+
+        # Память — отдельным вызовом: tracemalloc замедляет выполнение в разы
+        tracemalloc.start()
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            'ops_per_second': round(1 / per_op, 2),
+            'ms_per_op': round(per_op * 1000, 3),
+            'peak_kb_per_op': round(peak / 1024, 1),
+        }
+    return results
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    print(f"\nСравнение с {baseline['revision']} ({baseline['timestamp']}):")
+    for size, methods in report['result'].items():
+        old_methods = baseline['result'].get(size, {})
+        for name, stats in methods.items():
+            old = old_methods.get(name)
+            if not old:
+                continue
+            change = (stats['ms_per_op'] - old['ms_per_op']) / old['ms_per_op']
+            print(f"  {size:>8} {name:<24}{old['ms_per_op']:>10} → {stats['ms_per_op']} мс ({change:+.0%})")
+            if change > tolerance:
+                regressions.append(f"{name} на {size} строк: {old['ms_per_op']} → {stats['ms_per_op']} мс")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк слоя Database")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="размеры таблицы через запятую")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "database.json"))
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    result = {}
+    for rows in sizes:
+        rng = random.Random(args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            db = Database(db_path)
+            seeded = seed(db_path, rows, rng)
+            size_mb = os.path.getsize(db_path) / 1024 / 1024
+            print(f"\n{rows} регистраций: заполнение {seeded:.1f} с, файл {size_mb:.0f} МБ")
+            print(f"{'Операция':<24}{'опер./с':>12}{'мс/опер.':>12}{'пик памяти, КБ':>18}")
+            result[str(rows)] = measure(db, rows, rng)
+            for name, stats in result[str(rows)].items():
+                print(f"{name:<24}{stats['ops_per_second']:>12}{stats['ms_per_op']:>12}{stats['peak_kb_per_op']:>18}")
+
+    report = save_report(args.output, "database", {'sizes': sizes, 'seed': args.seed}, result)
+
+    failures = []
+    if args.baseline:
+        failures = compare(report, load_report(args.baseline), args.tolerance)
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Замеры сохранены")
+
+
+if __name__ == '__main__':
+    main()
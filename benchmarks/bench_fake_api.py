@@ -0,0 +1,136 @@
+"""
+Проверка заглушки Bot API настоящим клиентом python-telegram-bot
+
+telegram.Bot направляется на FakeTelegram и вызывает все методы, которые
+использует бот; затем включаются сбои — 429 с retry_after, зависание запроса
+и заблокированный чат — и проверяется, что клиент получает те же исключения,
+что и от настоящего Telegram. В конце — пропускная способность заглушки.
+
+Запуск: python benchmarks/bench_fake_api.py [параллельных запросов]
+Код возврата 1 — заглушка отвечает не так, как ожидает клиент.
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot  # noqa: E402
+from telegram.error import Forbidden, RetryAfter, TimedOut  # noqa: E402
+from telegram.request import HTTPXRequest  # noqa: E402
+
+from fake_telegram import FakeTelegram  # noqa: E402
+
+TOKEN = "123456:TEST"
+USER_ID = 501
+
+
+async def expect(failures: list, title: str, call, error_type=None):
+    try:
+        result = await call
+    except Exception as e:
+        if error_type and isinstance(e, error_type):
+            print(f"  ✓ {title}: {type(e).__name__} ({e})")
+            return e
+        failures.append(f"{title}: {type(e).__name__}: {e}")
+        print(f"  ✗ {title}: {type(e).__name__}: {e}")
+        return None
+    if error_type:
+        failures.append(f"{title}: нет ошибки {error_type.__name__}")
+        print(f"  ✗ {title}: нет ошибки {error_type.__name__}")
+    else:
+        print(f"  ✓ {title}")
+    return result
+
+
+async def run(concurrency: int) -> list:
+    failures = []
+    api = FakeTelegram(port=0)
+    await api.start()
+    bot = Bot(TOKEN, base_url=api.base_url,
+              request=HTTPXRequest(connection_pool_size=concurrency, read_timeout=1.0),
+              get_updates_request=HTTPXRequest(read_timeout=5.0))
+    await bot.initialize()
+
+    print("Методы Bot API:")
+    me = await expect(failures, "getMe", bot.get_me())
+    if me and me.is_bot is not True:
+        failures.append("getMe: не бот")
+    await expect(failures, "deleteWebhook", bot.delete_webhook())
+
+    api.push_message(USER_ID, "/start")
+    api.push_callback(USER_ID, "unregister_yes")
+    updates = await expect(failures, "getUpdates", bot.get_updates(timeout=1))
+    if updates is not None:
+        if len(updates) != 2 or updates[0].message.text != "/start" or updates[1].callback_query.data != "unregister_yes":
+            failures.append(f"getUpdates: получено {updates}")
+        # Подтвержденные обновления больше не приходят
+        rest = await bot.get_updates(offset=updates[-1].update_id + 1, timeout=0)
+        if rest:
+            failures.append("getUpdates: подтвержденные обновления пришли повторно")
+
+    sent = await expect(failures, "sendMessage", bot.send_message(USER_ID, "Привет"))
+    received = await api.wait_for_message(USER_ID, timeout=1)
+    if received['text'] != "Привет":
+        failures.append(f"sendMessage: пользователь получил {received}")
+    if sent:
+        await expect(failures, "editMessageText", bot.edit_message_text("Изменено", chat_id=USER_ID, message_id=sent.message_id))
+    await expect(failures, "answerCallbackQuery", bot.answer_callback_query("1"))
+    document = await expect(failures, "sendDocument", bot.send_document(
+        USER_ID, document=io.BytesIO(b"full_name;email\n" * 100), filename="registrations.csv", caption="Экспорт"
+    ))
+    if document and document.document.file_name != "registrations.csv":
+        failures.append(f"sendDocument: имя файла {document.document.file_name}")
+
+    print("\nСбои:")
+    api.retry_after_rate, api.retry_after = 1.0, 3
+    error = await expect(failures, "429 retry_after", bot.send_message(USER_ID, "x"), RetryAfter)
+    if error and error.retry_after != 3:
+        failures.append(f"retry_after {error.retry_after} вместо 3")
+    api.retry_after_rate = 0.0
+
+    api.timeout_rate, api.timeout_hold = 1.0, 2.0
+    await expect(failures, "зависший запрос", bot.send_message(USER_ID, "x"), TimedOut)
+    api.timeout_rate = 0.0
+
+    api.blocked_chats.add(USER_ID)
+    await expect(failures, "заблокированный чат", bot.send_message(USER_ID, "x"), Forbidden)
+    api.blocked_chats.clear()
+
+    api.latency, api.jitter = 0.05, 0.01
+    start = time.perf_counter()
+    await bot.send_message(USER_ID, "x")
+    delay = time.perf_counter() - start
+    print(f"  ✓ задержка ответа: {delay * 1000:.0f} мс (задано 50 ± 10)")
+    if not 0.04 <= delay <= 0.2:
+        failures.append(f"задержка ответа {delay * 1000:.0f} мс")
+    api.latency = api.jitter = 0.0
+
+    # Пропускная способность: заглушка не должна быть узким местом нагрузочных тестов
+    requests = concurrency * 20
+    start = time.perf_counter()
+    for _ in range(20):
+        await asyncio.gather(*(bot.send_message(USER_ID + index, "x") for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    print(f"\nПропускная способность: {requests / elapsed:.0f} sendMessage/с ({concurrency} параллельно)")
+    print(f"Вызовы: {dict(api.calls)}; сбои: {dict(api.faults)}")
+
+    await bot.shutdown()
+    await api.stop()
+    return failures
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    failures = asyncio.run(run(concurrency))
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Заглушка отвечает так же, как Bot API, сбои воспроизводятся")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Замер накладных расходов логирования на один вызов из обработчика
+
+Сравнивает прежний вариант (print с ANSI-кодами прямо из обработчика)
+с конвейером из logger.py (запись в очередь, фоновая запись в файл).
+
+Запуск: python benchmarks/bench_logging.py [количество вызовов]
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colorama import Fore, Style  # noqa: E402
+
+import logger  # noqa: E402
+
+
+class FakeUser:
+    id = 123456789
+    username = "test_user"
+
+
+def legacy_log_info(message: str, user=None):
+    """Прежняя реализация log_info из bot.py"""
+    timestamp = datetime.now().strftime('%H:%M:%S')
+    user_info = f"@{user.username} ({user.id})" if user else "System"
+    print(f"{Fore.CYAN}[{timestamp}] ℹ️  {Style.BRIGHT}{message}{Style.RESET_ALL} | {Fore.YELLOW}{user_info}{Style.RESET_ALL}")
+
+
+def measure(func, calls: int) -> float:
+    """Среднее время одного вызова в микросекундах"""
+    user = FakeUser()
+    start = time.perf_counter()
+    for i in range(calls):
+        func(f"Email введен: user{i}@mail.ru", user)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Прежний вариант: консоль перенаправлена в файл, чтобы не зависеть от терминала
+        with open(os.path.join(tmp, "stdout.txt"), "w", encoding="utf-8") as out, redirect_stdout(out):
+            legacy = measure(legacy_log_info, calls)
+
+        logger.setup_logging(
+            os.path.join(tmp, "bot.jsonl"),
+            max_bytes=1024 * 1024,
+            backup_count=2,
+            sample_rates={"DEBUG": 0.0, "INFO": 1.0, "WARNING": 1.0, "ERROR": 1.0},
+        )
+        # Консольный обработчик не нужен для замера — остается только JSON-файл
+        listener = logger._listener
+        listener.handlers = listener.handlers[:1]
+
+        # Стоимость в обработчике замеряется без фонового потока, чтобы не учитывать
+        # конкуренцию за GIL в синтетическом цикле (в боте записи редкие)
+        listener.stop()
+        queued = measure(logger.log_info, calls)
+        sampled_out = measure(logger.log_debug, calls)
+        listener.start()
+
+        drain_start = time.perf_counter()
+        logger.stop_logging()
+        drain = time.perf_counter() - drain_start
+
+    print(f"Вызовов: {calls}")
+    print(f"print() из обработчика:        {legacy:8.2f} мкс/вызов")
+    print(f"Очередь (log_info):           {queued:8.2f} мкс/вызов")
+    print(f"Отброшено выборкой (debug):   {sampled_out:8.2f} мкс/вызов")
+    print(f"Фоновая дозапись очереди:     {drain * 1000:8.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
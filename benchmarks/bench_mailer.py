@@ -0,0 +1,164 @@
+"""
+Пропускная способность почтовой очереди на локальном SMTP-сервере-заглушке
+
+Заглушка принимает письма по SMTP (EHLO/MAIL/RCPT/DATA) и отвечает с задержкой,
+имитирующей сеть до настоящего сервера. Сравниваются:
+  • новое соединение на каждое письмо (как сделал бы простой smtplib в обработчике);
+  • Mailer с разным размером пула и порции.
+Затем заглушка начинает рвать соединения — проверяется, что повторы доставляют все письма.
+
+Запуск: python benchmarks/bench_mailer.py [писем] [задержка ответа, мс]
+Код возврата 1 — доставлены не все письма.
+"""
+import asyncio
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mailer import Mailer  # noqa: E402
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Минимальный SMTP-сервер: считает принятые письма, может рвать соединения"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.latency = latency
+        self.drop_every = 0
+        self.tempfail_every = 0
+        self.received = 0
+        self.accepted = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def receive(self) -> str:
+        """Учет полученного письма: ok, drop (обрыв соединения) или tempfail (ответ 451)"""
+        with self._lock:
+            self.received += 1
+            if self.drop_every and self.received % self.drop_every == 0:
+                return "drop"
+            if self.tempfail_every and self.received % self.tempfail_every == 0:
+                return "tempfail"
+            self.accepted += 1
+            return "ok"
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        time.sleep(self.server.latency)
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        with self.server._lock:
+            self.server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 stand-in")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                result = self.server.receive()
+                if result == "drop":
+                    # Письмо не принято: соединение обрывается до ответа
+                    return
+                if result == "tempfail":
+                    self.reply("451 Temporary failure, try again later")
+                    continue
+                self.reply("250 OK queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def make_message(index: int) -> EmailMessage:
+    message = EmailMessage()
+    message['From'] = "Future Wave <noreply@futurewave.ru>"
+    message['To'] = f"user{index}@mail.ru"
+    message['Subject'] = "Future Wave: регистрация подтверждена"
+    message.set_content("Вы успешно зарегистрированы на форум Future Wave.")
+    return message
+
+
+def connection_per_email(port: int, emails: int) -> float:
+    start = time.perf_counter()
+    for index in range(emails):
+        with smtplib.SMTP("127.0.0.1", port) as smtp:
+            smtp.send_message(make_message(index))
+    return time.perf_counter() - start
+
+
+async def pooled(port: int, emails: int, pool_size: int, batch_size: int) -> Mailer:
+    mailer = Mailer("127.0.0.1", port, "Future Wave <noreply@futurewave.ru>",
+                    pool_size=pool_size, batch_size=batch_size, backoff_base=0.05)
+    mailer.start()
+    for index in range(emails):
+        mailer.enqueue(f"user{index}@mail.ru", "Future Wave: регистрация подтверждена",
+                       "Вы успешно зарегистрированы на форум Future Wave.")
+    await mailer.stop(timeout=120)
+    return mailer
+
+
+def main():
+    emails = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 1.0) / 1000
+    failures = []
+
+    server = SMTPStandIn(latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    print(f"Писем: {emails}, задержка ответа сервера: {latency * 1000:.1f} мс\n")
+    print(f"{'Режим':<36}{'писем/с':>10}{'соединений':>12}")
+
+    baseline = min(emails, 200)
+    elapsed = connection_per_email(port, baseline)
+    print(f"{'соединение на письмо':<36}{baseline / elapsed:>10.0f}{server.connections:>12}")
+
+    for pool_size, batch_size in [(1, 1), (1, 20), (4, 20), (8, 20)]:
+        server.accepted = server.connections = 0
+        start = time.perf_counter()
+        mailer = asyncio.run(pooled(port, emails, pool_size, batch_size))
+        elapsed = time.perf_counter() - start
+        print(f"{f'Mailer: пул {pool_size}, порция {batch_size}':<36}{emails / elapsed:>10.0f}{server.connections:>12}")
+        if server.accepted != emails or mailer.sent_total != emails:
+            failures.append(f"пул {pool_size}: доставлено {server.accepted} из {emails}")
+
+    # Обрыв соединения на каждом 25-м письме и временный отказ на каждом 40-м:
+    # переподключение и повторы с паузой должны доставить все
+    server.accepted = server.connections = 0
+    server.drop_every = 25
+    server.tempfail_every = 40
+    mailer = asyncio.run(pooled(port, emails, 4, 20))
+    print(f"\nОбрывы (каждое 25-е) и ответ 451 (каждое 40-е): доставлено {server.accepted} из {emails}, "
+          f"соединений {server.connections}, повторов {mailer.retries_total}, не отправлено {mailer.failed_total}")
+    if server.accepted != emails:
+        failures.append(f"при обрывах доставлено {server.accepted} из {emails}")
+
+    server.shutdown()
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Все письма доставлены")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Накладные расходы метрик на горячем пути и корректность выдачи для Prometheus
+
+Сравнивает пустой асинхронный обработчик и метод Database с обертками замера
+и без них, затем поднимает MetricsServer и проверяет ответ /metrics: формат
+строк, возрастание корзин гистограмм и число наблюдений.
+
+Запуск: python benchmarks/bench_metrics.py [вызовов]
+Код возврата 1 — обертка дороже бюджета или выдача некорректна.
+"""
+import asyncio
+import os
+import re
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from metrics import MetricsRegistry, MetricsServer, timed, instrument_methods  # noqa: E402
+
+# Бюджет обертки на один вызов обработчика (микросекунды)
+MAX_OVERHEAD_US = 5.0
+
+_LINE_RE = re.compile(r'[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? [0-9.e+-]+')
+
+
+async def handler(update, context):
+    return None
+
+
+async def handler_overhead(calls: int, registry: MetricsRegistry) -> float:
+    family = registry.histogram("bench_handler_seconds", "Пустой обработчик", "state")
+    wrapped = timed(family, "full_name", handler)
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        await handler(None, None)
+    bare = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        await wrapped(None, None)
+    instrumented = time.perf_counter() - start
+    return (instrumented - bare) / calls
+
+
+def db_overhead(db_path: str, calls: int, registry: MetricsRegistry):
+    plain = Database(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """
+        INSERT INTO registrations
+        (user_id, full_name, birth_date, email, phone, university, course,
+         interested_in_internship, consent_given, consent_datetime, registration_datetime, telegram_username)
+        VALUES (?, 'Иванов Иван Иванович', '15.03.2003', 'ivanov@mail.ru', '+79991234567',
+                'ИТМО (Университет ИТМО)', '2 курс', 0, 1, '2025-01-01T00:00:00', '2025-01-01T00:00:00', '')
+        """,
+        [(user_id,) for user_id in range(1, 1001)]
+    )
+    conn.commit()
+    conn.close()
+
+    instrumented = Database(db_path)
+    instrument_methods(instrumented, registry.histogram("bench_db_seconds", "Методы Database", "method"))
+
+    timings = []
+    for db in (plain, instrumented):
+        start = time.perf_counter()
+        for user_id in range(calls):
+            db.get_registration(user_id % 1000 + 1)
+        timings.append((time.perf_counter() - start) / calls)
+    return timings
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def scrape(registry: MetricsRegistry) -> str:
+    server = MetricsServer(registry, "127.0.0.1", free_port())
+    await server.start()
+    try:
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        await writer.drain()
+        response = (await reader.read()).decode("utf-8")
+        writer.close()
+    finally:
+        await server.stop()
+    return response
+
+
+def check_exposition(response: str, expected_counts: dict) -> list:
+    failures = []
+    head, _, body = response.partition("\r\n\r\n")
+    if not head.startswith("HTTP/1.1 200"):
+        return [f"ответ сервера: {head.splitlines()[0] if head else 'пусто'}"]
+
+    buckets = {}
+    for line in body.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        if not _LINE_RE.fullmatch(line):
+            failures.append(f"строка не в формате Prometheus: {line}")
+            continue
+        if "_bucket{" in line:
+            series = line.split(',le=')[0]
+            buckets.setdefault(series, []).append(float(line.rsplit(" ", 1)[1]))
+
+    for series, values in buckets.items():
+        if values != sorted(values):
+            failures.append(f"корзины не возрастают: {series}")
+
+    for series, count in expected_counts.items():
+        if f"{series} {count}" not in body:
+            failures.append(f"нет {series} {count}")
+    return failures
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    failures = []
+    registry = MetricsRegistry()
+    registry.counter("bench_api_calls_total", "Вызовы Bot API", lambda: {"sendMessage": 3, "getUpdates": 1}, label="method")
+    registry.gauge("bench_active_sessions", "Сессии", lambda: 42)
+
+    overhead = asyncio.run(handler_overhead(calls, registry))
+    print(f"Обертка обработчика: +{overhead * 1e6:.2f} мкс на вызов (бюджет {MAX_OVERHEAD_US} мкс)")
+    if overhead * 1e6 > MAX_OVERHEAD_US:
+        failures.append(f"обертка обработчика стоит {overhead * 1e6:.2f} мкс")
+
+    db_calls = min(calls, 5000)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain, instrumented = db_overhead(os.path.join(tmp, "metrics.db"), db_calls, registry)
+    print(f"Database.get_registration: {plain * 1e6:.0f} мкс без замера, {instrumented * 1e6:.0f} мкс с замером "
+          f"({(instrumented - plain) / plain * 100:+.1f}%)")
+
+    response = asyncio.run(scrape(registry))
+    failures += check_exposition(response, {
+        'bench_handler_seconds_count{state="full_name"}': calls,
+        'bench_db_seconds_count{method="get_registration"}': db_calls,
+        'bench_api_calls_total{method="sendMessage"}': 3,
+        'bench_active_sessions': 42,
+    })
+    print(f"Ответ /metrics: {len(response)} байт")
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Метрики дешевые и корректно отдаются в формате Prometheus")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Несколько мероприятий в одном процессе (multi_event.py): память и CPU на мероприятие
+
+Скрипт запускает отдельный процесс с EventHost на 1 и на N мероприятий,
+каждое со своей заглушкой Bot API и своей базой во временном каталоге.
+Замеряются RSS процесса без нагрузки, CPU в простое (опрос Bot API,
+периодические задачи) и CPU на регистрацию, когда одни и те же
+пользователи параллельно регистрируются на все мероприятия. Затем
+проверяется изоляция: в базе каждого мероприятия — ровно его регистрации,
+а ответы пользователям — с названием своего мероприятия.
+
+Стоимость дополнительного мероприятия сравнивается с отдельным процессом
+на одно мероприятие.
+
+Запуск: python benchmarks/bench_multi_event.py [--events 5] [--users 50] [--latency 5]
+        [--memory-budget 0.25] [--cpu-budget 1.5] [--output results/multi_event.json]
+Код возврата 1 — не все регистрации завершились, нарушена изоляция, RSS на
+дополнительное мероприятие больше --memory-budget от RSS отдельного процесса
+или CPU на регистрацию при N мероприятиях больше чем в --cpu-budget раз
+выше, чем при одном.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sqlite3
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_registration_load import FIRST_USER_ID, simulate_user  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+from reporting import RESULTS_DIR, save_report  # noqa: E402
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def event_title(index: int) -> str:
+    return f"Форум №{index + 1}"
+
+
+async def host_events(urls: list) -> None:
+    """Дочерний процесс: EventHost с мероприятием на каждую заглушку, до SIGTERM"""
+    import config
+    # Сервер метрик не нужен и может занимать порт
+    config.METRICS_PORT = None
+    from multi_event import EventHost
+
+    host = EventHost()
+    for index, url in enumerate(urls):
+        token_env = f"BENCH_EVENT_TOKEN_{index}"
+        os.environ[token_env] = f"{index + 1}00000:MULTI-EVENT"
+        host.add(f"bench{index}", {
+            'ORGANIZATION_INFO': dict(config.ORGANIZATION_INFO, event_name=event_title(index)),
+            'BOT_TOKEN_ENV': token_env,
+            'DB_PATH': f"event{index}.db",
+            'BOT_API_BASE_URL': url,
+        })
+    await host.start()
+
+    stopped = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    print("ready", flush=True)
+    await stopped.wait()
+    await host.stop()
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime и stime — 14-е и 15-е поля /proc/<pid>/stat
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def measure(count: int, args, directory: str) -> dict:
+    apis = [FakeTelegram(port=0, latency=args.latency / 1000, seed=index) for index in range(count)]
+    for api in apis:
+        await api.start()
+
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__), "--child", *[api.base_url for api in apis],
+        cwd=directory, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        while (await asyncio.wait_for(process.stdout.readline(), args.timeout)).strip() != b"ready":
+            pass
+
+        # Простой: опрос Bot API и периодические задачи всех мероприятий
+        await asyncio.sleep(1)
+        rss_idle = rss_mb(process.pid)
+        cpu_start = cpu_seconds(process.pid)
+        await asyncio.sleep(args.idle)
+        idle_cpu = (cpu_seconds(process.pid) - cpu_start) / args.idle
+
+        # Одни и те же пользователи регистрируются на все мероприятия параллельно
+        latencies = {}
+        cpu_start = cpu_seconds(process.pid)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            simulate_user(api, FIRST_USER_ID + index, latencies, args.step_timeout)
+            for api in apis for index in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+        load_cpu = cpu_seconds(process.pid) - cpu_start
+        rss_loaded = rss_mb(process.pid)
+    finally:
+        if process.returncode is None:
+            process.send_signal(signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), 30)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        for api in apis:
+            await api.stop()
+
+    completed = sum(results)
+    return {
+        'events': count,
+        'completed': completed,
+        'rss_idle_mb': round(rss_idle, 1),
+        'rss_loaded_mb': round(rss_loaded, 1),
+        'idle_cpu_percent': round(idle_cpu * 100, 2),
+        'cpu_ms_per_registration': round(load_cpu / completed * 1000, 2) if completed else None,
+        'registrations_per_second': round(completed / elapsed, 2),
+        'isolation_errors': isolation_errors(apis, args.users, directory),
+    }
+
+
+def isolation_errors(apis: list, users: int, directory: str) -> list:
+    """Регистрации и ответы каждого мероприятия — только его собственные"""
+    errors = []
+    expected = set(range(FIRST_USER_ID, FIRST_USER_ID + users))
+    for index, api in enumerate(apis):
+        conn = sqlite3.connect(os.path.join(directory, f"event{index}.db"))
+        stored = {row[0] for row in conn.execute("SELECT user_id FROM registrations")}
+        conn.close()
+        if stored != expected:
+            errors.append(f"мероприятие {index + 1}: в базе {len(stored)} регистраций вместо {users}")
+        foreign = [
+            message for chat in api.sent.values() for message in chat
+            for other in range(len(apis)) if other != index
+            if event_title(other) in (message.get('text') or message.get('caption') or '')
+        ]
+        if foreign:
+            errors.append(f"мероприятие {index + 1}: {len(foreign)} ответов с названием другого мероприятия")
+    return errors
+
+
+async def run(args) -> dict:
+    result = {}
+    for count in (1, args.events):
+        with tempfile.TemporaryDirectory() as tmp:
+            result[str(count)] = await measure(count, args, tmp)
+    return result
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        asyncio.run(host_events(sys.argv[2:]))
+        return
+
+    parser = argparse.ArgumentParser(description="Память и CPU на мероприятие в общем процессе")
+    parser.add_argument("--events", type=int, default=5, help="мероприятий во втором замере")
+    parser.add_argument("--users", type=int, default=50, help="пользователей на мероприятие")
+    parser.add_argument("--latency", type=float, default=5, help="задержка ответа Bot API, мс")
+    parser.add_argument("--idle", type=float, default=5, help="длительность замера простоя, с")
+    parser.add_argument("--step-timeout", type=float, default=30)
+    parser.add_argument("--timeout", type=float, default=60, help="сколько ждать запуска процесса, с")
+    parser.add_argument("--memory-budget", type=float, default=0.25,
+                        help="допустимый RSS дополнительного мероприятия, доля RSS отдельного процесса")
+    parser.add_argument("--cpu-budget", type=float, default=1.5,
+                        help="во сколько раз CPU на регистрацию может вырасти при N мероприятиях")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "multi_event.json"))
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    single, multi = result["1"], result[str(args.events)]
+    extra_rss = (multi['rss_idle_mb'] - single['rss_idle_mb']) / (args.events - 1)
+    extra_idle_cpu = (multi['idle_cpu_percent'] - single['idle_cpu_percent']) / (args.events - 1)
+    result['per_extra_event'] = {
+        'rss_mb': round(extra_rss, 1),
+        'rss_share_of_process': round(extra_rss / single['rss_idle_mb'], 3),
+        'idle_cpu_percent': round(extra_idle_cpu, 2),
+    }
+
+    for stats in (single, multi):
+        print(f"{stats['events']} мероприятий: RSS {stats['rss_idle_mb']} МБ (под нагрузкой "
+              f"{stats['rss_loaded_mb']} МБ), CPU в простое {stats['idle_cpu_percent']}%, "
+              f"{stats['cpu_ms_per_registration']} мс CPU на регистрацию, "
+              f"{stats['completed']} регистраций ({stats['registrations_per_second']}/с)")
+    print(f"Дополнительное мероприятие: {extra_rss:.1f} МБ "
+          f"({result['per_extra_event']['rss_share_of_process']:.0%} отдельного процесса), "
+          f"CPU в простое {extra_idle_cpu:+.2f}%")
+
+    save_report(args.output, "multi_event", {
+        'events': args.events, 'users': args.users, 'latency_ms': args.latency, 'idle_seconds': args.idle,
+    }, result)
+
+    failures = []
+    for stats in (single, multi):
+        if stats['completed'] != stats['events'] * args.users:
+            failures.append(f"{stats['events']} мероприятий: завершено {stats['completed']} регистраций "
+                            f"из {stats['events'] * args.users}")
+        failures.extend(stats['isolation_errors'])
+    if result['per_extra_event']['rss_share_of_process'] > args.memory_budget:
+        failures.append(f"дополнительное мероприятие занимает {extra_rss:.1f} МБ — больше "
+                        f"{args.memory_budget:.0%} отдельного процесса")
+    if single['cpu_ms_per_registration'] and multi['cpu_ms_per_registration'] and \
+            multi['cpu_ms_per_registration'] > single['cpu_ms_per_registration'] * args.cpu_budget:
+        failures.append(f"CPU на регистрацию {single['cpu_ms_per_registration']} → "
+                        f"{multi['cpu_ms_per_registration']} мс")
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Мероприятия изолированы, дополнительное мероприятие дешевле отдельного процесса")
+
+
+if __name__ == '__main__':
+    main()
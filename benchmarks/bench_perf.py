@@ -0,0 +1,136 @@
+"""
+Профилировщик обработчиков: накладные расходы и верность разбивки времени
+
+Обработчик-модель делает запрос к БД (через обертки instrument_methods),
+«вызов Bot API» (задержка с передачей времени в charge_api) и считает в Python.
+Обработчики идут параллельно; проверяется, что время Bot API в PerfRecorder
+сходится с ожиданиями, которые измерила сама модель (не перетекает между
+обработчиками), что в горячих стеках cProfile есть расчетная функция и что
+обертка без профилирования укладывается в бюджет.
+
+Запуск: python benchmarks/bench_perf.py [обновлений]
+Код возврата 1 — разбивка неверна, стек не найден или обертка дороже бюджета.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from metrics import MetricsRegistry, instrument_methods  # noqa: E402
+from perf import PerfRecorder, charge_api, charge_db  # noqa: E402
+
+# Бюджет обертки без профилирования на один вызов (микросекунды)
+MAX_OVERHEAD_US = 5.0
+API_LATENCY = 0.004
+
+# Время ожидания «Bot API», измеренное самой моделью (для сверки с PerfRecorder)
+api_waits = []
+
+
+def python_work(rounds: int = 20000) -> int:
+    total = 0
+    for value in range(rounds):
+        total += value * value % 7
+    return total
+
+
+def make_handler(db: Database):
+    async def confirmation(update, context):
+        db.get_registration(1)
+        start = time.perf_counter()
+        await asyncio.sleep(API_LATENCY)
+        waited = time.perf_counter() - start
+        api_waits.append(waited)
+        charge_api(waited)
+        python_work()
+
+    return confirmation
+
+
+async def empty(update, context):
+    return None
+
+
+async def overhead(calls: int) -> float:
+    recorder = PerfRecorder(3600, sample_rate=0.0, max_records=calls)
+    wrapped = recorder.instrument("empty", empty)
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        await empty(None, None)
+    bare = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        await wrapped(None, None)
+    return (time.perf_counter() - start - bare) / calls
+
+
+async def attribution(db: Database, updates: int) -> PerfRecorder:
+    recorder = PerfRecorder(3600, sample_rate=0.2)
+    handler = recorder.instrument("confirmation", make_handler(db))
+    # Параллельно, как при нескольких пользователях: время не должно перетекать между обработчиками
+    for _ in range(updates // 10):
+        await asyncio.gather(*(handler(None, None) for _ in range(10)))
+    return recorder
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    failures = []
+
+    per_call = asyncio.run(overhead(200000))
+    print(f"Обертка без профилирования: +{per_call * 1e6:.2f} мкс на вызов (бюджет {MAX_OVERHEAD_US} мкс)")
+    if per_call * 1e6 > MAX_OVERHEAD_US:
+        failures.append(f"обертка стоит {per_call * 1e6:.2f} мкс")
+
+    start = time.perf_counter()
+    python_work()
+    python_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "perf.db"))
+        registry = MetricsRegistry()
+        instrument_methods(db, registry.histogram("bench_db_seconds", "Методы Database", "method"), charge=charge_db)
+        db_start = time.perf_counter()
+        db.get_registration(1)
+        db_time = time.perf_counter() - db_start
+
+        recorder = asyncio.run(attribution(db, updates))
+
+    [summary] = recorder.slow_handlers(minutes=60)
+    python_share = 1 - summary['db_share'] - summary['api_share']
+    print(f"Обновлений: {summary['count']}, p50 {summary['p50'] * 1000:.1f} мс, p95 {summary['p95'] * 1000:.1f} мс")
+    print(f"Доли: БД {summary['db_share']:.0%}, Bot API {summary['api_share']:.0%}, Python {python_share:.0%} "
+          f"(модель: БД ~{db_time * 1000:.2f} мс, Bot API {API_LATENCY * 1000:.0f} мс, Python ~{python_time * 1000:.1f} мс)")
+
+    if summary['count'] != updates // 10 * 10:
+        failures.append(f"замеров {summary['count']} вместо {updates // 10 * 10}")
+    if summary['db_share'] <= 0 or summary['api_share'] <= 0 or python_share <= 0:
+        failures.append("одна из долей нулевая")
+    # Обработчики работают параллельно: время каждого складывается только из его собственных
+    # ожиданий (ожидание длиннее API_LATENCY, пока цикл занят расчетами других обработчиков)
+    api_expected = sum(api_waits)
+    api_measured = summary['api_share'] * summary['total']
+    if abs(api_measured - api_expected) > 0.01 * api_expected:
+        failures.append(f"время Bot API {api_measured:.3f} с, а обработчики ждали {api_expected:.3f} с")
+
+    stacks = recorder.hot_stacks(minutes=60)
+    print(f"Профилей: {recorder.profiles_total}")
+    for item in stacks[:3]:
+        print(f"  {item['seconds'] * 1000:.1f} мс, {item['samples']} профилей: {item['stack']}")
+    if not any("python_work" in item['stack'] for item in stacks):
+        failures.append("расчетная функция не попала в горячие стеки")
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Время обработчиков разложено верно, горячий стек найден")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Сквозной нагрузочный тест регистрации: N пользователей против заглушки Bot API
+
+Собирает настоящее приложение через bot.build_application, направляет его на
+FakeTelegram и проводит N параллельных пользователей через весь диалог:
+/start, согласие, ФИО, дата рождения, email, телефон, университет, курс,
+стажировки, подтверждение. Задержка шага — от отправки сообщения
+пользователем до ответа бота (включая getUpdates).
+
+Отчет: завершенных регистраций в секунду, p50/p95/p99 задержки по шагам,
+задержка цикла событий (лаг) и пиковый RSS. Результат сохраняется в JSON;
+с --baseline результат сравнивается с прошлым прогоном.
+
+Запуск: python benchmarks/bench_registration_load.py [--users 200] [--latency 30]
+        [--output results/registration_load.json] [--baseline старый.json] [--tolerance 0.2]
+Код возврата 1 — не все регистрации завершились или (с --baseline) пропускная
+способность/p95 хуже базового прогона больше чем на tolerance.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_telegram import FakeTelegram  # noqa: E402
+from reporting import RESULTS_DIR, load_report, save_report  # noqa: E402
+
+TOKEN = "123456:LOAD-TEST"
+FIRST_USER_ID = 10_000_000
+LAG_INTERVAL = 0.01
+
+
+def steps(user_id: int):
+    """Шаги диалога: (название, текст пользователя)"""
+    from keyboards import CONSENT_YES, INTERNSHIP_YES, INTERNSHIP_NO, CONFIRM_YES
+
+    return [
+        ("start", "/start"),
+        ("consent", CONSENT_YES),
+        ("full_name", "Иванов Иван Иванович"),
+        ("birth_date", "15.03.2003"),
+        ("email", f"user{user_id}@mail.ru"),
+        ("phone", "+7 999 123-45-67"),
+        ("university", "ИТМО (Университет ИТМО)"),
+        ("course", "3 курс"),
+        ("internship", INTERNSHIP_YES if user_id % 3 == 0 else INTERNSHIP_NO),
+        ("confirmation", CONFIRM_YES),
+    ]
+
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def simulate_user(api: FakeTelegram, user_id: int, latencies: dict, timeout: float) -> bool:
+    for name, text in steps(user_id):
+        start = time.perf_counter()
+        api.push_message(user_id, text)
+        try:
+            await api.wait_for_message(user_id, timeout)
+        except asyncio.TimeoutError:
+            return False
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+    return True
+
+
+async def measure_lag(samples: list, stop: asyncio.Event) -> None:
+    """Задержка цикла событий: насколько позже заданного просыпается sleep"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - start - LAG_INTERVAL))
+
+
+async def run(bot, args) -> dict:
+    api = FakeTelegram(port=0, latency=args.latency / 1000, jitter=args.latency / 4000)
+    await api.start()
+
+    # Сервер метрик не нужен и может занимать порт
+    bot.metrics_server = None
+    application = bot.build_application(TOKEN, api.base_url)
+    # То же, что делает run_polling, но в уже работающем цикле событий
+    await application.initialize()
+    await bot.on_startup(application)
+    await application.updater.start_polling(poll_interval=0, timeout=10)
+    await application.start()
+
+    latencies = {}
+    lag = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(lag, stop))
+
+    semaphore = asyncio.Semaphore(args.concurrency or args.users)
+
+    async def user(index: int) -> bool:
+        async with semaphore:
+            return await simulate_user(api, FIRST_USER_ID + index, latencies, args.step_timeout)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(user(index) for index in range(args.users)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await lag_task
+    await application.updater.stop()
+    await application.stop()
+    await bot.on_shutdown(application)
+    await application.shutdown()
+    await api.stop()
+
+    completed = sum(results)
+    stored = sum(1 for index in range(args.users) if bot.db.get_registration(FIRST_USER_ID + index))
+    return {
+        'completed': completed,
+        'stored': stored,
+        'elapsed_seconds': round(elapsed, 3),
+        'registrations_per_second': round(completed / elapsed, 2),
+        'steps': {
+            name: {
+                'count': len(values),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+            }
+            for name, values in latencies.items()
+        },
+        'loop_lag_ms': {
+            'p50': round((percentile(lag, 0.50) or 0) * 1000, 2),
+            'p99': round((percentile(lag, 0.99) or 0) * 1000, 2),
+            'max': round(max(lag, default=0) * 1000, 2),
+        },
+        'api_calls': dict(api.calls),
+        # ru_maxrss в Linux — в килобайтах
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Регрессии относительно базового прогона (хуже больше чем на tolerance)"""
+    regressions = []
+    old_rate = baseline['result']['registrations_per_second']
+    new_rate = result['result']['registrations_per_second']
+    print(f"\nСравнение с {baseline['revision']} ({baseline['timestamp']}):")
+    print(f"  регистраций/с: {old_rate} → {new_rate} ({(new_rate - old_rate) / old_rate:+.0%})")
+    if new_rate < old_rate * (1 - tolerance):
+        regressions.append(f"регистраций/с упало с {old_rate} до {new_rate}")
+
+    for name, stats in result['result']['steps'].items():
+        old = baseline['result']['steps'].get(name)
+        if not old:
+            continue
+        change = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0
+        print(f"  {name}: p95 {old['p95_ms']} → {stats['p95_ms']} мс ({change:+.0%})")
+        # Изменения в пределах миллисекунды — шум таймера, а не регрессия
+        if change > tolerance and stats['p95_ms'] - old['p95_ms'] > 1:
+            regressions.append(f"{name}: p95 вырос с {old['p95_ms']} до {stats['p95_ms']} мс")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест диалога регистрации")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=0, help="одновременно регистрирующихся (0 — все сразу)")
+    parser.add_argument("--latency", type=float, default=30, help="задержка ответа Bot API, мс")
+    parser.add_argument("--step-timeout", type=float, default=60, help="сколько ждать ответа на шаг, с")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "registration_load.json"))
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # БД, журнал и состояния диалогов бота — во временном каталоге
+        os.chdir(tmp)
+        import bot
+
+        result = asyncio.run(run(bot, args))
+        os.chdir(ROOT)
+
+    print(f"Пользователей: {args.users}, задержка Bot API: {args.latency:g} мс")
+    print(f"Завершено: {result['completed']} (в БД {result['stored']}) за {result['elapsed_seconds']} с — "
+          f"{result['registrations_per_second']} регистраций/с")
+    print(f"\n{'Шаг':<14}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}")
+    for name, stats in result['steps'].items():
+        print(f"{name:<14}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    print(f"\nЛаг цикла событий: p50 {result['loop_lag_ms']['p50']} мс, p99 {result['loop_lag_ms']['p99']} мс, "
+          f"макс {result['loop_lag_ms']['max']} мс")
+    print(f"Пиковый RSS: {result['peak_rss_mb']} МБ")
+
+    report = save_report(output, "registration_load", {
+        'users': args.users, 'concurrency': args.concurrency or args.users, 'latency_ms': args.latency
+    }, result)
+
+    failures = []
+    if result['completed'] != args.users or result['stored'] != args.users:
+        failures.append(f"завершено {result['completed']} из {args.users}, в БД {result['stored']}")
+    if baseline_path:
+        failures += compare(report, load_report(baseline_path), args.tolerance)
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Все регистрации завершены")
+
+
+if __name__ == '__main__':
+    main()
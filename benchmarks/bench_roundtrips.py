@@ -0,0 +1,127 @@
+"""
+Проверка бюджета вызовов Bot API на регистрацию через пошаговый диалог
+
+Прогоняет полный диалог через обработчики bot.py с заглушками вместо Telegram
+и считает вызовы Bot API на каждом шаге. Вызовы учитываются в bot.api_calls —
+так же, как это делает CountingRequest в работающем боте.
+
+Запуск: python benchmarks/bench_roundtrips.py
+Код возврата 1 — какой-то шаг стоит больше одного вызова или бюджет превышен.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from stubs import StubContext, StubUpdate  # noqa: E402
+
+# Каждый шаг диалога (от /start до подтверждения) — не больше одного вызова в чат пользователя
+MAX_CALLS_PER_STEP = 1
+
+# Все вызовы Bot API заглушек: (метод, chat_id)
+calls = []
+
+
+def record(bot_module, method: str, chat_id):
+    calls.append((method, chat_id))
+    bot_module.api_calls.record(method, chat_id)
+
+
+async def register(bot, user_id: int, steps) -> list:
+    """Прогон диалога; возвращает [(шаг, вызовов в чат пользователя, прочих вызовов, новое состояние)]"""
+    def on_call(method: str, chat_id):
+        record(bot, method, chat_id)
+
+    context = StubContext(on_call)
+    report = []
+    for name, handler, text in steps:
+        before = len(calls)
+        state = await handler(StubUpdate(user_id, text, on_call, f"user{user_id}"), context)
+        step_calls = calls[before:]
+        own = sum(1 for _, chat_id in step_calls if chat_id == user_id)
+        report.append((name, own, len(step_calls) - own, state))
+    return report
+
+
+def conversation(bot, university: str, interested: bool):
+    from keyboards import CONSENT_YES, INTERNSHIP_YES, INTERNSHIP_NO, CONFIRM_YES
+
+    steps = [
+        ("/start", bot.start, "/start"),
+        ("согласие", bot.consent, CONSENT_YES),
+        ("ФИО", bot.full_name, "Иванов Иван Иванович"),
+        ("дата рождения", bot.birth_date, "15.03.2003"),
+        ("email", bot.email, "ivanov@mail.ru"),
+        ("телефон", bot.phone, "+7 999 123-45-67"),
+        ("университет", bot.university, university),
+    ]
+    if university == bot.OTHER_UNIVERSITY:
+        steps.append(("университет вручную", bot.university_custom, "МГУ им. М.В. Ломоносова"))
+    steps += [
+        ("курс", bot.course, "3 курс"),
+        ("стажировки", bot.internship_interest, INTERNSHIP_YES if interested else INTERNSHIP_NO),
+        ("подтверждение", bot.confirmation, CONFIRM_YES),
+    ]
+    return steps
+
+
+async def run(bot) -> list:
+    failures = []
+    scenarios = [
+        (1, "ИТМО (Университет ИТМО)", False),
+        (2, "ИТМО (Университет ИТМО)", True),
+        (3, bot.OTHER_UNIVERSITY, False),
+    ]
+
+    for user_id, university, interested in scenarios:
+        steps = conversation(bot, university, interested)
+        report = await register(bot, user_id, steps)
+        # Счетчик регистрации закрывается в confirmation, повторный finish вернет None
+        per_registration = bot.api_calls.finish(user_id)
+
+        print(f"\nРегистрация {user_id} ({university}, стажировки: {'да' if interested else 'нет'}):")
+        for name, own, other, _ in report:
+            mark = "" if own <= MAX_CALLS_PER_STEP else "  ❌"
+            notifications = f" (+{other} уведомлений)" if other else ""
+            print(f"  {name:<22}{own}{notifications}{mark}")
+            if own > MAX_CALLS_PER_STEP:
+                failures.append(f"регистрация {user_id}: шаг «{name}» — {own} вызовов")
+
+        total = sum(own for _, own, _, _ in report)
+        print(f"  Всего вызовов в чат пользователя: {total}")
+
+        if report[-1][3] != bot.ConversationHandler.END or bot.db.get_registration(user_id) is None:
+            failures.append(f"регистрация {user_id} не завершена")
+        if per_registration is not None:
+            failures.append(f"регистрация {user_id}: счетчик не закрыт в confirmation")
+        if total > len(steps) * MAX_CALLS_PER_STEP:
+            failures.append(f"регистрация {user_id}: {total} вызовов при бюджете {len(steps)}")
+
+    summary = bot.api_calls.per_registration()
+    print(f"\nApiCallStats: {summary}")
+    if summary.get('count') != len(scenarios):
+        failures.append("ApiCallStats учел не все завершенные регистрации")
+
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        import bot
+
+        failures = asyncio.run(run(bot))
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"✅ Каждый шаг диалога — не больше {MAX_CALLS_PER_STEP} вызова Bot API")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Процессы-обработчики по user_id (shards.py): пропускная способность от числа процессов
+
+Для каждого числа процессов запускается python shards.py во временном каталоге,
+направленный на заглушку Bot API, и N пользователей параллельно проходят
+регистрацию. Замеряются завершенные регистрации в секунду и p95 задержки шага;
+эффективность — пропускная способность относительно одного процесса,
+умноженного на число процессов (но не больше числа свободных ядер: одно
+занимают заглушка и пользователи этого скрипта).
+
+Затем проверяется разбиение: состояния диалогов каждого процесса — только
+пользователей, для которых user_id % число процессов равно его номеру, а
+админ-команды показывают сумму по всем процессам (/metrics — завершенные
+регистрации, /admin — все регистрации общей базы).
+
+Запуск: python benchmarks/bench_shards.py [--workers 1,2,4] [--users 200] [--latency 5]
+        [--min-efficiency 0.7] [--output results/shards.json]
+Код возврата 1 — не все регистрации завершились, нарушено разбиение или сводка,
+или эффективность ниже --min-efficiency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import sqlite3
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from config import SHARD_STATUS_INTERVAL  # noqa: E402
+from database import Database  # noqa: E402
+from bench_registration_load import FIRST_USER_ID, percentile, simulate_user  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+from reporting import RESULTS_DIR, save_report  # noqa: E402
+
+TOKEN = "123456:SHARDS"
+ADMIN_ID = 42
+BASE_PORT = 19200
+
+
+async def admin_reply(api: FakeTelegram, command: str, timeout: float) -> str:
+    api.push_message(ADMIN_ID, command)
+    return (await api.wait_for_message(ADMIN_ID, timeout)).get('text', '')
+
+
+def number_after(text: str, label: str):
+    match = re.search(rf"{label}: (\d+)", text)
+    return int(match.group(1)) if match else None
+
+
+def shard_users(directory: str, workers: int) -> dict:
+    """Пользователи в файле состояний каждого процесса"""
+    users = {}
+    for index in range(workers):
+        conn = sqlite3.connect(os.path.join(directory, f"registrations.shard{index}.db"))
+        ids = {row[0] for row in conn.execute("SELECT user_id FROM persistence_user_data")}
+        ids |= {json.loads(row[0])[1] for row in conn.execute("SELECT conversation_key FROM persistence_conversations")}
+        conn.close()
+        users[index] = ids - {ADMIN_ID}
+    return users
+
+
+async def measure(workers: int, args, directory: str) -> dict:
+    Database(os.path.join(directory, "registrations.db")).add_admin_role(ADMIN_ID, "admin", None)
+    api = FakeTelegram(port=0, latency=args.latency / 1000)
+    await api.start()
+
+    env = dict(os.environ, BOT_TOKEN=TOKEN, BOT_API_BASE_URL=api.base_url)
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "shards.py"), "--workers", str(workers), "--port", str(BASE_PORT),
+        cwd=directory, env=env, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    failures = []
+    try:
+        # Фронт начинает опрос, когда все процессы приняли соединение
+        deadline = time.monotonic() + args.timeout
+        while not api.calls['getUpdates']:
+            if time.monotonic() > deadline or process.returncode is not None:
+                raise RuntimeError(f"{workers} процессов: бот не запустился")
+            await asyncio.sleep(0.05)
+
+        latencies = {}
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            simulate_user(api, FIRST_USER_ID + index, latencies, args.step_timeout) for index in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+
+        # Сводка по всем процессам обновляется раз в SHARD_STATUS_INTERVAL секунд
+        await asyncio.sleep(SHARD_STATUS_INTERVAL + 1)
+        completed_total = number_after(await admin_reply(api, "/metrics", args.step_timeout), "Завершено регистраций")
+        registered_total = number_after(await admin_reply(api, "/admin", args.step_timeout), "Всего зарегистрировано")
+    finally:
+        if process.returncode is None:
+            process.send_signal(signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), 60)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        await api.stop()
+
+    completed = sum(results)
+    if completed_total != args.users:
+        failures.append(f"{workers} процессов: /metrics показывает {completed_total} завершенных из {args.users}")
+    if registered_total != args.users:
+        failures.append(f"{workers} процессов: /admin показывает {registered_total} регистраций из {args.users}")
+    users = shard_users(directory, workers)
+    misplaced = sum(1 for index, ids in users.items() for user_id in ids if user_id % workers != index)
+    if misplaced:
+        failures.append(f"{workers} процессов: {misplaced} диалогов не в своем процессе")
+
+    steps = [value for values in latencies.values() for value in values]
+    return {
+        'workers': workers,
+        'completed': completed,
+        'registrations_per_second': round(completed / elapsed, 2),
+        'step_p95_ms': round((percentile(steps, 0.95) or 0) * 1000, 2),
+        'users_per_shard': [len(users[index]) for index in range(workers)],
+        'failures': failures,
+    }
+
+
+async def run(args, counts: list) -> list:
+    results = []
+    for workers in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            results.append(await measure(workers, args, tmp))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пропускная способность от числа процессов-обработчиков")
+    parser.add_argument("--workers", default="1,2,4", help="числа процессов через запятую")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=5, help="задержка ответа Bot API, мс")
+    parser.add_argument("--step-timeout", type=float, default=60)
+    parser.add_argument("--timeout", type=float, default=120, help="сколько ждать запуска, с")
+    parser.add_argument("--min-efficiency", type=float, default=0.7)
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "shards.json"))
+    args = parser.parse_args()
+    counts = sorted({int(count) for count in args.workers.split(",")} | {1})
+
+    cores = max(1, (os.cpu_count() or 1) - 1)
+    results = asyncio.run(run(args, counts))
+    single = results[0]['registrations_per_second']
+    failures = []
+    print(f"Свободных ядер: {cores}")
+    for stats in results:
+        expected = single * min(stats['workers'], cores)
+        stats['efficiency'] = round(stats['registrations_per_second'] / expected, 3) if expected else None
+        print(f"{stats['workers']} процессов: {stats['registrations_per_second']} регистраций/с "
+              f"(эффективность {stats['efficiency']:.0%}), p95 шага {stats['step_p95_ms']} мс, "
+              f"пользователей по процессам {stats['users_per_shard']}")
+        failures.extend(stats['failures'])
+        if stats['completed'] != args.users:
+            failures.append(f"{stats['workers']} процессов: завершено {stats['completed']} из {args.users}")
+        if stats['efficiency'] is not None and stats['efficiency'] < args.min_efficiency:
+            failures.append(f"{stats['workers']} процессов: эффективность {stats['efficiency']:.0%}")
+    if cores < max(counts):
+        print(f"(ядер меньше, чем процессов: рост ограничен {cores} ядрами)")
+
+    save_report(args.output, "shards", {
+        'workers': counts, 'users': args.users, 'latency_ms': args.latency, 'cores': cores,
+    }, {'runs': results})
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Обновления распределены по процессам, сводки общие")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Замер задержки обработчика /start для новых и уже зарегистрированных пользователей
+
+Сравнивает проверку через запрос к БД (множество не загружено — прежнее поведение)
+с быстрой проверкой по множеству зарегистрированных user_id.
+Отправка сообщений заменена заглушками, замеряется только работа бота.
+
+Запуск: python benchmarks/bench_start.py [зарегистрированных в БД] [вызовов /start]
+"""
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from stubs import StubContext, StubUpdate  # noqa: E402
+
+
+def seed(db_path: str, rows: int):
+    """Быстрое заполнение таблицы регистраций"""
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """
+        INSERT INTO registrations
+        (user_id, full_name, birth_date, email, phone, university, course,
+         interested_in_internship, consent_given, consent_datetime, registration_datetime, telegram_username)
+        VALUES (?, 'Иванов Иван Иванович', '15.03.2003', 'ivanov@mail.ru', '+79991234567',
+                'ИТМО (Университет ИТМО)', '2 курс', 0, 1, '2025-01-01T00:00:00', '2025-01-01T00:00:00', '')
+        """,
+        [(user_id,) for user_id in range(1, rows + 1)]
+    )
+    conn.commit()
+    conn.close()
+
+
+async def measure(bot, user_ids) -> list:
+    latencies = []
+    for user_id in user_ids:
+        update, context = StubUpdate(user_id), StubContext()
+        start = time.perf_counter()
+        await bot.start(update, context)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        bot.sessions.end(user_id)
+    return latencies
+
+
+def report(title: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{title:<45} p50 {statistics.median(latencies):8.1f} мкс   p95 {p95:8.1f} мкс")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        import bot
+        import logger
+        logger._logger.disabled = True
+
+        seed(bot.db.db_path, rows)
+        new_users = range(rows + 1, rows + 1 + calls)
+        registered = range(1, calls + 1)
+
+        print(f"Регистраций в БД: {rows}, вызовов /start: {calls}")
+        report("Новые пользователи, запрос к БД", asyncio.run(measure(bot, new_users)))
+        bot.registered_users.load(bot.db.get_registered_user_ids())
+        report("Новые пользователи, множество в памяти", asyncio.run(measure(bot, new_users)))
+        report("Зарегистрированные, множество + запрос к БД", asyncio.run(measure(bot, registered)))
+        print(f"Память множества: ~{sys.getsizeof(bot.registered_users._user_ids) / 1024 / 1024:.1f} МБ")
+
+        logger.stop_logging()
+        os.chdir(ROOT)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Время запуска бота: от старта процесса до ответа на первое обновление
+
+Перезапуск во время мероприятия — это пауза, в которую бот никому не отвечает.
+Скрипт заполняет временную БД регистрациями и незавершенными диалогами
+(как на мероприятии в разгаре), кладет в заглушку Bot API сообщение /start
+от нового пользователя и запускает python bot.py в отдельном процессе,
+направленном на заглушку. Замеряется время от запуска процесса до первого
+getUpdates и до ответа на /start, а также время import bot отдельно.
+
+Запуск: python benchmarks/bench_startup.py [--rows 100000] [--sessions 1000] [--runs 5]
+        [--budget 1.0] [--output results/startup.json]
+Код возврата 1 — медиана времени до первого ответа больше --budget секунд
+(или бот не ответил).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_database import FIRST_USER_ID, seed  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+from reporting import RESULTS_DIR, save_report  # noqa: E402
+
+TOKEN = "123456:STARTUP"
+NEW_USER_ID = 42
+# Состояние FULL_NAME диалога регистрации
+SESSION_STATE = 1
+
+
+def prepare(directory: str, rows: int, sessions: int) -> None:
+    """БД мероприятия в разгаре: регистрации и незавершенные диалоги"""
+    # Схема создается тем же кодом, что и в боте (импорт — в дочернем процессе,
+    # чтобы замеры времени импорта не искажались уже загруженными модулями)
+    subprocess.run([sys.executable, "-c", (
+        "from database import Database; from persistence import SQLitePersistence; "
+        "Database('registrations.db'); SQLitePersistence('registrations.db')"
+    )], cwd=directory, env=dict(os.environ, PYTHONPATH=ROOT), check=True)
+
+    db_path = os.path.join(directory, "registrations.db")
+    seed(db_path, rows, random.Random(1))
+    conn = sqlite3.connect(db_path)
+    base = FIRST_USER_ID + rows
+    conn.executemany(
+        "INSERT INTO persistence_conversations (name, conversation_key, state) VALUES ('registration', ?, ?)",
+        [(json.dumps([user_id, user_id]), json.dumps(SESSION_STATE)) for user_id in range(base, base + sessions)]
+    )
+    conn.executemany(
+        "INSERT INTO persistence_user_data (user_id, data) VALUES (?, ?)",
+        [(user_id, json.dumps({'consent_given': True})) for user_id in range(base, base + sessions)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure_import(directory: str) -> float:
+    code = "import time; start = time.perf_counter(); import bot; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=directory, env=dict(os.environ, PYTHONPATH=ROOT),
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+async def start_once(directory: str, timeout: float) -> dict:
+    api = FakeTelegram(port=0)
+    await api.start()
+    api.push_message(NEW_USER_ID, "/start")
+
+    env = dict(os.environ, BOT_TOKEN=TOKEN, BOT_API_BASE_URL=api.base_url)
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "bot.py"), cwd=directory, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+
+    first_poll = None
+
+    async def watch_polling() -> None:
+        nonlocal first_poll
+        while not api.calls['getUpdates']:
+            await asyncio.sleep(0.001)
+        first_poll = time.perf_counter() - start
+
+    watcher = asyncio.create_task(watch_polling())
+    first_response = None
+    try:
+        await api.wait_for_message(NEW_USER_ID, timeout)
+        first_response = time.perf_counter() - start
+    except asyncio.TimeoutError:
+        pass
+    watcher.cancel()
+
+    process.send_signal(signal.SIGINT)
+    try:
+        await asyncio.wait_for(process.wait(), 15)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+    await api.stop()
+
+    # Следующий запуск должен снова встретить нового пользователя
+    conn = sqlite3.connect(os.path.join(directory, "registrations.db"))
+    conn.execute("DELETE FROM persistence_conversations WHERE conversation_key = ?",
+                 (json.dumps([NEW_USER_ID, NEW_USER_ID]),))
+    conn.execute("DELETE FROM persistence_user_data WHERE user_id = ?", (NEW_USER_ID,))
+    conn.commit()
+    conn.close()
+    return {'first_poll': first_poll, 'first_response': first_response}
+
+
+def seconds(values: list):
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска бота до первого ответа")
+    parser.add_argument("--rows", type=int, default=100000, help="регистраций в БД")
+    parser.add_argument("--sessions", type=int, default=1000, help="незавершенных диалогов в БД")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="допустимая медиана до первого ответа, с")
+    parser.add_argument("--timeout", type=float, default=30, help="сколько ждать ответа, с")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "startup.json"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare(tmp, args.rows, args.sessions)
+        imports = [measure_import(tmp) for _ in range(args.runs)]
+        runs = [asyncio.run(start_once(tmp, args.timeout)) for _ in range(args.runs)]
+
+    result = {
+        'import_seconds': seconds(imports),
+        'first_poll_seconds': seconds([run['first_poll'] for run in runs]),
+        'first_response_seconds': seconds([run['first_response'] for run in runs]),
+        'answered': sum(1 for run in runs if run['first_response'] is not None),
+        'runs': runs,
+    }
+    print(f"БД: {args.rows} регистраций, {args.sessions} незавершенных диалогов; запусков: {args.runs}")
+    print(f"import bot: {result['import_seconds']} с")
+    print(f"До первого getUpdates: {result['first_poll_seconds']} с")
+    print(f"До первого ответа: {result['first_response_seconds']} с (бюджет {args.budget} с)")
+
+    save_report(args.output, "startup", {
+        'rows': args.rows, 'sessions': args.sessions, 'runs': args.runs, 'budget_seconds': args.budget,
+    }, result)
+
+    if result['answered'] != args.runs:
+        print(f"❌ ПРОВАЛ: бот ответил в {result['answered']} запусках из {args.runs}")
+        sys.exit(1)
+    if result['first_response_seconds'] > args.budget:
+        print(f"❌ ПРОВАЛ: до первого ответа {result['first_response_seconds']} с, бюджет {args.budget} с")
+        sys.exit(1)
+    print("✅ Запуск укладывается в бюджет")
+
+
+if __name__ == '__main__':
+    main()
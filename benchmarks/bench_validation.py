@@ -0,0 +1,144 @@
+"""
+Микробенчмарк валидации полей формы и проверка совпадения с прежней логикой
+
+1. Замер времени проверки даты, email и телефона: прежний код из обработчиков
+   bot.py (re.match со строковым шаблоном, возраст через деление дней на 365.25)
+   против validation.py.
+2. Проверка на случайных входных данных: новые валидаторы принимают и отклоняют
+   те же строки, что и прежний код, а нормализация идемпотентна.
+
+Запуск: python benchmarks/bench_validation.py [итераций] [случайных примеров]
+Код возврата 1 — найдено расхождение.
+"""
+import os
+import random
+import re
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import validation  # noqa: E402
+
+SAMPLES = {
+    'date': ["15.03.2003", "31.02.2003", "1.1.2000", "01.01.2020"],
+    'email': ["Example.User@Mail.ru", "bad@mail", "user@@mail.ru", "a.b-c@sub.domain.org"],
+    'phone': ["+7 (999) 123-45-67", "89991234567", "+1 999 123 45 67", "12345"],
+}
+
+
+def legacy_birth_date(date_text: str) -> bool:
+    """Прежняя проверка из bot.birth_date"""
+    if not re.match(r'^\d{2}\.\d{2}\.\d{4}$', date_text):
+        return False
+    try:
+        day, month, year = map(int, date_text.split('.'))
+        date_obj = datetime(year, month, day)
+        age = (datetime.now() - date_obj).days / 365.25
+        return 14 <= age <= 100
+    except ValueError:
+        return False
+
+
+def legacy_email(email_text: str) -> bool:
+    """Прежняя проверка из bot.email"""
+    return bool(re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email_text))
+
+
+def legacy_phone(phone_text: str) -> bool:
+    """Прежняя проверка из bot.phone"""
+    phone_clean = re.sub(r'[^\d+]', '', phone_text)
+    return bool(re.match(r'^(\+7|8)\d{10}$', phone_clean))
+
+
+def benchmark(iterations: int):
+    pairs = [
+        ('date', legacy_birth_date, validation.validate_birth_date),
+        ('email', legacy_email, validation.validate_email),
+        ('phone', legacy_phone, validation.validate_phone),
+    ]
+    print(f"{'Поле':<8}{'прежний код':>16}{'validation.py':>16}")
+    for field, legacy, current in pairs:
+        samples = SAMPLES[field]
+        legacy_time = timeit.timeit(lambda: [legacy(s) for s in samples], number=iterations)
+        current_time = timeit.timeit(lambda: [current(s) for s in samples], number=iterations)
+        per_call = 1e6 / (iterations * len(samples))
+        print(f"{field:<8}{legacy_time * per_call:>12.2f} мкс{current_time * per_call:>12.2f} мкс")
+
+
+def random_date_text(rng: random.Random) -> str:
+    """Случайная дата: чаще корректная, иногда с ошибками формата или несуществующая"""
+    kind = rng.random()
+    if kind < 0.6:
+        born = date.today() - timedelta(days=rng.randint(0, 120 * 366))
+        # Пропускаем даты на границах 14 и 100 лет: прежний код считал возраст приблизительно
+        age_days = (date.today() - born).days
+        if abs(age_days - 14 * 365.25) < 3 or abs(age_days - 100 * 365.25) < 3:
+            born -= timedelta(days=10)
+        return born.strftime('%d.%m.%Y')
+    if kind < 0.8:
+        return f"{rng.randint(0, 39):02d}.{rng.randint(0, 19):02d}.{rng.randint(1900, 2030)}"
+    alphabet = "0123456789./- "
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+
+
+def random_email(rng: random.Random) -> str:
+    alphabet = "abcXYZ019._%+-@"
+    if rng.random() < 0.5:
+        local = "".join(rng.choice("abcXYZ019._") for _ in range(rng.randint(1, 8)))
+        domain = "".join(rng.choice("abc019-") for _ in range(rng.randint(1, 6)))
+        return f"{local}@{domain}.{rng.choice(['ru', 'com', 'r', 'Org'])}"
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16)))
+
+
+def random_phone(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        prefix = rng.choice(["+7", "8", "7", "+8", "+1"])
+        digits = "".join(rng.choice("0123456789") for _ in range(rng.randint(9, 11)))
+        separators = "".join(rng.choice(" -()") for _ in range(rng.randint(0, 3)))
+        return prefix + separators + digits
+    return "".join(rng.choice("0123456789+ -()a") for _ in range(rng.randint(0, 14)))
+
+
+def check_properties(samples: int) -> list:
+    """Совпадение решений с прежним кодом и идемпотентность нормализации"""
+    rng = random.Random(2025)
+    failures = []
+    checks = [
+        ('date', random_date_text, legacy_birth_date, validation.validate_birth_date,
+         lambda value: validation.format_birth_date(value)),
+        ('email', random_email, legacy_email, validation.validate_email, lambda value: value),
+        ('phone', random_phone, legacy_phone, validation.validate_phone, lambda value: value),
+    ]
+
+    for field, generate, legacy, current, to_input in checks:
+        for _ in range(samples):
+            text = generate(rng)
+            result = current(text)
+            if legacy(text) != result.ok:
+                failures.append(f"{field}: {text!r} прежний={legacy(text)} новый={result.ok}")
+                continue
+            if result.ok and current(to_input(result.value)).value != result.value:
+                failures.append(f"{field}: нормализация {text!r} -> {result.value!r} не идемпотентна")
+
+    return failures
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    benchmark(iterations)
+
+    failures = check_properties(samples)
+    if failures:
+        print(f"❌ Расхождений: {len(failures)}")
+        for failure in failures[:20]:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"✅ {samples * 3} случайных значений: решения совпадают с прежним кодом, нормализация идемпотентна")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Сторож цикла событий: находит ли он блокирующий код и сколько стоит обертка
+
+Обработчик-модель в состоянии birth_date вызывает синхронную функцию, которая
+блокирует цикл событий (как долгий запрос к SQLite). Проверяется, что
+зависание записано с этим обработчиком и состоянием, что в стеке есть
+блокирующая функция, что длительность сходится с блокировкой, что короткие
+синхронные участки ниже порога зависаниями не считаются, что блокировка вне
+обработчиков относится к своей задаче и что обертка track укладывается в бюджет.
+
+Запуск: python benchmarks/bench_watchdog.py
+Код возврата 1 — зависание не найдено, приписано не тому или обертка дороже бюджета.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loop_watchdog import LoopWatchdog  # noqa: E402
+
+THRESHOLD = 0.1
+BLOCK = 0.3
+# Бюджет обертки на один вызов (микросекунды)
+MAX_OVERHEAD_US = 5.0
+
+
+def slow_query() -> None:
+    time.sleep(BLOCK)
+
+
+async def birth_date(update, context):
+    await asyncio.sleep(0.01)
+    slow_query()
+
+
+async def quick(update, context):
+    time.sleep(THRESHOLD / 4)
+
+
+async def nightly_export():
+    slow_query()
+
+
+async def empty(update, context):
+    return None
+
+
+async def run() -> list:
+    failures = []
+    watchdog = LoopWatchdog(THRESHOLD, state_of=lambda update, context: "birth_date")
+    watchdog.start()
+    await asyncio.sleep(THRESHOLD)
+
+    await watchdog.track("birth_date", birth_date)(None, None)
+    await asyncio.sleep(THRESHOLD)
+    await watchdog.track("quick", quick)(None, None)
+    await asyncio.sleep(THRESHOLD)
+    await asyncio.create_task(nightly_export(), name="nightly_export")
+    await asyncio.sleep(THRESHOLD)
+
+    stalls = sorted(watchdog.latest(1, limit=10), key=lambda item: -item['ago'])
+    for item in stalls:
+        print(f"  {item['lag'] * 1000:.0f} мс — {item['handler']} [{item['state']}]: {item['stack']}")
+
+    if len(stalls) != 2:
+        failures.append(f"записано зависаний: {len(stalls)} вместо 2")
+    if stalls:
+        first = stalls[0]
+        if (first['handler'], first['state']) != ("birth_date", "birth_date"):
+            failures.append(f"зависание приписано {first['handler']} [{first['state']}]")
+        if "slow_query" not in first['stack']:
+            failures.append("в стеке нет блокирующей функции")
+        # Задержка пульса меньше блокировки не больше чем на интервал пульса
+        if not BLOCK - watchdog.interval <= first['lag'] <= BLOCK + THRESHOLD:
+            failures.append(f"длительность {first['lag'] * 1000:.0f} мс вместо {BLOCK * 1000:.0f}")
+    if len(stalls) > 1 and stalls[1]['handler'] != "nightly_export":
+        failures.append(f"блокировка вне обработчиков приписана {stalls[1]['handler']}")
+
+    calls = 100000
+    wrapped = watchdog.track("empty", empty)
+    start = time.perf_counter()
+    for _ in range(calls):
+        await empty(None, None)
+    bare = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        await wrapped(None, None)
+    overhead_us = (time.perf_counter() - start - bare) / calls * 1e6
+    print(f"\nОбертка track: {overhead_us:.2f} мкс на вызов (бюджет {MAX_OVERHEAD_US})")
+    if overhead_us > MAX_OVERHEAD_US:
+        failures.append(f"обертка {overhead_us:.2f} мкс дороже бюджета")
+
+    await watchdog.stop()
+    return failures
+
+
+def main():
+    failures = asyncio.run(run())
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Зависания находятся и приписываются обработчику и состоянию")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,437 @@
+"""
+Локальная заглушка Telegram Bot API с внедрением сбоев
+
+Говорит по HTTP так же, как api.telegram.org, для методов, которые использует
+бот: getMe, deleteWebhook, getUpdates (long polling), sendMessage,
+editMessageText, answerCallbackQuery, sendDocument (и sendPhoto). Настоящий
+Application направляется на нее через base_url (в боте — BOT_API_BASE_URL в .env):
+
+    base_url = "http://127.0.0.1:8081/bot"
+
+Пользователи моделируются методами push_message / push_callback /
+push_web_app_data, ответы бота читаются через wait_for_message. Сбои:
+задержка ответа (latency ± jitter), 429 с retry_after, зависание запроса
+дольше таймаута клиента и чаты, заблокировавшие бота (403).
+
+Запуск отдельно: python benchmarks/fake_telegram.py [--port 8081] [--latency 50] ...
+Управление отдельным сервером: POST /control/message {"user_id": 1, "text": "/start"},
+GET /control/messages?chat_id=1, GET /control/stats.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+BOT_USER = {
+    'id': 100000001,
+    'is_bot': True,
+    'first_name': "Future Wave",
+    'username': "future_wave_test_bot",
+    'can_join_groups': True,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False,
+}
+
+# Методы, в которые внедряются сбои (getUpdates и служебные вызовы не трогаются)
+FAULTY_METHODS = {
+    'sendMessage', 'editMessageText', 'answerCallbackQuery', 'sendDocument', 'sendPhoto',
+    'editMessageReplyMarkup', 'deleteMessage',
+}
+
+MAX_REQUEST_BYTES = 50 * 1024 * 1024
+
+
+class FakeTelegram:
+    """Заглушка Bot API на asyncio (один бот, любой токен)
+
+    Сбои задаются атрибутами и могут меняться на ходу:
+      latency, jitter — задержка ответа в секундах (равномерно latency ± jitter);
+      retry_after_rate, retry_after — доля вызовов, получающих 429, и retry_after в ответе;
+      timeout_rate, timeout_hold — доля вызовов, на которые сервер молчит timeout_hold секунд;
+      blocked_chats — чаты, где бот заблокирован (403 на любой вызов в этот чат).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081, latency: float = 0.0,
+                 jitter: float = 0.0, seed: int = 1):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.retry_after_rate = 0.0
+        self.retry_after = 1
+        self.timeout_rate = 0.0
+        self.timeout_hold = 10.0
+        self.blocked_chats: set = set()
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+        self._updates: List[Dict] = []
+        self._next_update_id = 1
+        self._updates_event = asyncio.Event()
+        self._next_message_id = 1
+        # Сообщения бота по чатам и ожидающие их пользователи
+        self.sent: Dict[int, List[Dict]] = defaultdict(list)
+        self._read_positions: Dict[int, int] = defaultdict(int)
+        self._chat_events: Dict[int, asyncio.Event] = defaultdict(asyncio.Event)
+
+        self.calls = Counter()
+        self.faults = Counter()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_REQUEST_BYTES)
+        if not self.port:
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._updates_event.set()
+            await self._server.wait_closed()
+            self._server = None
+
+    # Действия пользователей
+
+    def _user(self, user_id: int) -> Dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f"Участник {user_id}", 'username': f"user{user_id}"}
+
+    def _chat(self, chat_id: int) -> Dict:
+        return {'id': chat_id, 'type': 'private', 'first_name': f"Участник {chat_id}"}
+
+    def _push(self, update: Dict) -> int:
+        update['update_id'] = self._next_update_id
+        self._next_update_id += 1
+        self._updates.append(update)
+        self._updates_event.set()
+        return update['update_id']
+
+    def _user_message(self, user_id: int) -> Dict:
+        message = {
+            'message_id': self._next_message_id,
+            'date': int(time.time()),
+            'chat': self._chat(user_id),
+            'from': self._user(user_id),
+        }
+        self._next_message_id += 1
+        return message
+
+    def push_message(self, user_id: int, text: str) -> int:
+        """Пользователь пишет боту текст (или команду, если текст начинается с /)"""
+        message = self._user_message(user_id)
+        message['text'] = text
+        if text.startswith("/"):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return self._push({'message': message})
+
+    def push_callback(self, user_id: int, data: str, message_id: Optional[int] = None) -> int:
+        """Пользователь нажимает inline-кнопку под сообщением бота"""
+        message = {
+            'message_id': message_id or 1,
+            'date': int(time.time()),
+            'chat': self._chat(user_id),
+            'from': BOT_USER,
+            'text': "",
+        }
+        return self._push({'callback_query': {
+            'id': str(self._next_update_id),
+            'from': self._user(user_id),
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': message,
+        }})
+
+    def push_web_app_data(self, user_id: int, data: str, button_text: str = "Заполнить форму") -> int:
+        """Пользователь отправляет форму Telegram Web App"""
+        message = self._user_message(user_id)
+        message['web_app_data'] = {'data': data, 'button_text': button_text}
+        return self._push({'message': message})
+
+    def push_update(self, update: Dict) -> int:
+        """Готовое обновление (например, из записи): update_id и время сообщений заменяются текущими"""
+        update = copy.deepcopy(update)
+        update.pop('update_id', None)
+        now = int(time.time())
+        for message in (update.get('message'), update.get('edited_message'),
+                        (update.get('callback_query') or {}).get('message')):
+            if message:
+                message['date'] = now
+        return self._push(update)
+
+    async def wait_for_message(self, chat_id: int, timeout: float = 10) -> Dict:
+        """Следующее еще не прочитанное сообщение бота в чат (ожидание не дольше timeout)"""
+        deadline = time.monotonic() + timeout
+        while self._read_positions[chat_id] >= len(self.sent[chat_id]):
+            event = self._chat_events[chat_id]
+            event.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"бот не ответил в чат {chat_id} за {timeout} с")
+            await asyncio.wait_for(event.wait(), remaining)
+        message = self.sent[chat_id][self._read_positions[chat_id]]
+        self._read_positions[chat_id] += 1
+        return message
+
+    # HTTP
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Клиент держит соединения открытыми (keep-alive): запросы читаются по очереди
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self._dispatch(method, target, headers, body)
+                if status is None:
+                    # Имитация зависшего запроса: ответа нет, соединение закрывается
+                    return
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write((
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    "Connection: keep-alive\r\n\r\n"
+                ).encode("latin-1") + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        url = urlsplit(target)
+        if url.path.startswith("/control/"):
+            return self._control(url.path, dict(parse_qsl(url.query)), body)
+
+        # /bot<token>/<метод>
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 2 or not parts[0].startswith("bot"):
+            return "404 Not Found", {'ok': False, 'error_code': 404, 'description': "Not Found"}
+        api_method = parts[1]
+        params = self._parse_params(headers.get('content-type', ''), body)
+        params.update(parse_qsl(url.query))
+        self.calls[api_method] += 1
+
+        if api_method in FAULTY_METHODS:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter) if self.latency else 0
+            if delay > 0:
+                await asyncio.sleep(delay)
+            fault = self._fault(params)
+            if fault == "timeout":
+                await asyncio.sleep(self.timeout_hold)
+                return None, None
+            if fault:
+                return fault
+
+        handler = getattr(self, f"_api_{api_method}", None)
+        if handler is None:
+            return "200 OK", {'ok': True, 'result': True}
+        result = handler(params)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return "200 OK", {'ok': True, 'result': result}
+
+    def _fault(self, params: Dict):
+        chat_id = _int(params.get('chat_id'))
+        if chat_id in self.blocked_chats:
+            self.faults['blocked'] += 1
+            return "403 Forbidden", {'ok': False, 'error_code': 403, 'description': "Forbidden: bot was blocked by the user"}
+        if self.retry_after_rate and self._random.random() < self.retry_after_rate:
+            self.faults['retry_after'] += 1
+            return "429 Too Many Requests", {
+                'ok': False,
+                'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after}",
+                'parameters': {'retry_after': self.retry_after},
+            }
+        if self.timeout_rate and self._random.random() < self.timeout_rate:
+            self.faults['timeout'] += 1
+            return "timeout"
+        return None
+
+    @staticmethod
+    def _parse_params(content_type: str, body: bytes) -> Dict:
+        """Параметры запроса: form-urlencoded (значения-объекты в JSON) или multipart"""
+        if not body:
+            return {}
+        if content_type.startswith("application/json"):
+            return json.loads(body)
+        if content_type.startswith("multipart/form-data"):
+            message = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+            )
+            params = {}
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                if part.get_filename():
+                    params[name] = {'filename': part.get_filename(), 'size': len(part.get_payload(decode=True))}
+                else:
+                    params[name] = part.get_content().strip()
+            return params
+        return dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+
+    def _bot_message(self, chat_id: int, **fields) -> Dict:
+        message = {
+            'message_id': self._next_message_id,
+            'date': int(time.time()),
+            'chat': self._chat(chat_id),
+            'from': BOT_USER,
+        }
+        self._next_message_id += 1
+        message.update(fields)
+        return message
+
+    def _deliver(self, api_method: str, chat_id: int, message: Dict, params: Dict) -> None:
+        """Сохранение ответа бота для пользователя (вместе с клавиатурой)"""
+        stored = dict(message, method=api_method)
+        if 'reply_markup' in params:
+            stored['reply_markup'] = _json(params['reply_markup'])
+        self.sent[chat_id].append(stored)
+        self._chat_events[chat_id].set()
+
+    # Методы Bot API
+
+    def _api_getMe(self, params: Dict) -> Dict:
+        return BOT_USER
+
+    def _api_deleteWebhook(self, params: Dict) -> bool:
+        return True
+
+    async def _api_getUpdates(self, params: Dict) -> List[Dict]:
+        offset = _int(params.get('offset')) or 0
+        limit = _int(params.get('limit')) or 100
+        timeout = float(params.get('timeout') or 0)
+
+        # Подтвержденные клиентом обновления (id < offset) больше не нужны
+        if offset:
+            self._updates = [update for update in self._updates if update['update_id'] >= offset]
+        if not self._updates and timeout:
+            self._updates_event.clear()
+            try:
+                await asyncio.wait_for(self._updates_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    def _api_sendMessage(self, params: Dict) -> Dict:
+        chat_id = _int(params['chat_id'])
+        message = self._bot_message(chat_id, text=params.get('text', ''))
+        self._deliver('sendMessage', chat_id, message, params)
+        return message
+
+    def _api_editMessageText(self, params: Dict):
+        if 'inline_message_id' in params:
+            return True
+        chat_id = _int(params['chat_id'])
+        message = self._bot_message(chat_id, text=params.get('text', ''), edit_date=int(time.time()))
+        message['message_id'] = _int(params.get('message_id')) or message['message_id']
+        self._deliver('editMessageText', chat_id, message, params)
+        return message
+
+    def _api_answerCallbackQuery(self, params: Dict) -> bool:
+        return True
+
+    def _api_sendDocument(self, params: Dict) -> Dict:
+        chat_id = _int(params['chat_id'])
+        document = params.get('document') or {}
+        message = self._bot_message(chat_id, caption=params.get('caption', ''), document={
+            'file_id': f"doc{self._next_message_id}",
+            'file_unique_id': f"doc{self._next_message_id}",
+            'file_name': document.get('filename') if isinstance(document, dict) else None,
+            'file_size': document.get('size') if isinstance(document, dict) else None,
+        })
+        self._deliver('sendDocument', chat_id, message, params)
+        return message
+
+    def _api_sendPhoto(self, params: Dict) -> Dict:
+        chat_id = _int(params['chat_id'])
+        message = self._bot_message(chat_id, caption=params.get('caption', ''), photo=[{
+            'file_id': f"photo{self._next_message_id}",
+            'file_unique_id': f"photo{self._next_message_id}",
+            'width': 512,
+            'height': 512,
+        }])
+        self._deliver('sendPhoto', chat_id, message, params)
+        return message
+
+    # Управление отдельно запущенным сервером
+
+    def _control(self, path: str, query: Dict, body: bytes):
+        if path == "/control/message":
+            request = json.loads(body or b"{}")
+            update_id = self.push_message(int(request['user_id']), request['text'])
+            return "200 OK", {'ok': True, 'update_id': update_id}
+        if path == "/control/messages":
+            return "200 OK", {'ok': True, 'messages': self.sent.get(int(query.get('chat_id', 0)), [])}
+        if path == "/control/stats":
+            return "200 OK", {'ok': True, 'calls': dict(self.calls), 'faults': dict(self.faults)}
+        return "404 Not Found", {'ok': False, 'description': "Not Found"}
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _json(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+async def serve(args) -> None:
+    api = FakeTelegram(args.host, args.port, latency=args.latency / 1000, jitter=args.jitter / 1000)
+    api.retry_after_rate = args.retry_after_rate
+    api.retry_after = args.retry_after
+    api.timeout_rate = args.timeout_rate
+    api.blocked_chats = set(args.blocked)
+    await api.start()
+    print(f"Заглушка Bot API: {api.base_url}  (в .env: BOT_API_BASE_URL={api.base_url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0, help="задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=0, help="разброс задержки, мс")
+    parser.add_argument("--retry-after-rate", type=float, default=0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответе 429, с")
+    parser.add_argument("--timeout-rate", type=float, default=0, help="доля зависающих запросов")
+    parser.add_argument("--blocked", type=int, nargs="*", default=[], help="чаты, заблокировавшие бота")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Воспроизведение записанных обновлений (recorder.py) против заглушки Bot API
+
+Запись с настоящего мероприятия содержит то, чего нет в синтетическом
+нагрузочном тесте: опечатки в датах и email, повторные /restart, брошенные
+на середине регистрации, шквалы обновлений админ-панели. Скрипт собирает
+настоящее приложение через bot.build_application с пустой временной БД,
+направляет его на FakeTelegram и отправляет обновления из записи с исходными
+интервалами (--speed 1), ускоренно (--speed 10) или без пауз (--speed 0).
+
+Перед воспроизведением администраторам из записи выдаются права, а для
+пользователей, которые уже были зарегистрированы, создаются синтетические
+регистрации. Пользователи, начавшие диалог до начала записи, воспроизводятся,
+но в сверке не участвуют.
+
+Отчет: обновлений в секунду, p50/p95/p99 времени обработки обновления и
+задержки от отправки до конца обработки, лаг цикла событий и расхождения с
+записью — состояние диалога перед каждым обновлением, итоговое состояние и
+статус регистрации. Защита от флуда и таймауты диалога зависят от времени,
+поэтому при ускорении расхождения на них ожидаемы (--no-flood-control
+отключает защиту от флуда).
+
+Запуск: python benchmarks/replay_updates.py запись.jsonl [--speed 1] [--latency 30]
+        [--output results/replay.json] [--max-divergence 0]
+Код возврата 1 — доля расходящихся обновлений больше --max-divergence или
+не все обновления обработаны.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from telegram import Update  # noqa: E402
+from telegram.ext import TypeHandler  # noqa: E402
+
+from bench_database import make_registration  # noqa: E402
+from bench_registration_load import measure_lag, percentile  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+from reporting import RESULTS_DIR, save_report  # noqa: E402
+
+TOKEN = "123456:REPLAY"
+MAX_EXAMPLES = 10
+
+
+def load_recording(path: str):
+    """События и итоговые состояния записи
+
+    Файл дописывается при каждом запуске бота, поэтому в нем может быть
+    несколько сегментов (meta … final): время сегментов складывается,
+    итоговые состояния берутся из последнего сегмента, где есть пользователь.
+    """
+    events, final = [], {}
+    offset = last = 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'meta' in record:
+                offset = last
+            elif 'final' in record:
+                final.update(record['final'])
+            else:
+                record['t'] += offset
+                last = record['t']
+                events.append(record)
+    return events, final
+
+
+def event_user(update: Dict) -> Optional[Dict]:
+    """Отправитель обновления (поле from сообщения, нажатия кнопки и т.п.)"""
+    for value in update.values():
+        if isinstance(value, dict) and isinstance(value.get('from'), dict):
+            return value['from']
+    return None
+
+
+def prepare(bot, events: List[Dict]) -> set:
+    """Права администраторов и синтетические регистрации; возвращает пользователей, исключенных из сверки"""
+    rng = random.Random(0)
+    now = datetime.now()
+    seen, excluded = set(), set()
+    for event in events:
+        user = event_user(event['update'])
+        if not user or user['id'] in seen:
+            continue
+        seen.add(user['id'])
+        if event['admin']:
+            bot.admin_registry.grant(user['id'], user.get('username') or '')
+        if event.get('registered'):
+            bot.db.save_registration(make_registration(rng, user['id'], now))
+        if event['state'] is not None:
+            excluded.add(user['id'])
+    return excluded
+
+
+async def replay(bot, events: List[Dict], args) -> Dict:
+    api = FakeTelegram(port=0, latency=args.latency / 1000, jitter=args.latency / 4000)
+    await api.start()
+
+    # Сервер метрик не нужен, а воспроизведение не должно записывать само себя
+    bot.metrics_server = None
+    bot.update_recorder = None
+    excluded = prepare(bot, events)
+    application = bot.build_application(TOKEN, api.base_url)
+    if not args.flood_control:
+        for handler in list(application.handlers.get(-2, [])):
+            application.remove_handler(handler, group=-2)
+
+    states = {}
+
+    async def capture_state(update: Update, context) -> None:
+        if update.effective_user and update.effective_chat:
+            states[update.update_id] = bot.conversation_state(update, context)
+
+    application.add_handler(TypeHandler(Update, capture_state), group=-3)
+
+    pushed, processing, finished = {}, {}, {}
+    all_processed = asyncio.Event()
+    process_update = application.process_update
+
+    async def timed_process_update(update) -> None:
+        start = time.perf_counter()
+        try:
+            await process_update(update)
+        finally:
+            end = time.perf_counter()
+            if isinstance(update, Update):
+                processing[update.update_id] = end - start
+                finished[update.update_id] = end
+                if len(finished) == len(events):
+                    all_processed.set()
+
+    application.process_update = timed_process_update
+
+    await application.initialize()
+    await bot.on_startup(application)
+    await application.updater.start_polling(poll_interval=0, timeout=10)
+    await application.start()
+
+    lag = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(lag, stop))
+
+    start = time.perf_counter()
+    for index, event in enumerate(events):
+        if args.speed:
+            delay = start + event['t'] / args.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        update_id = api.push_update(event['update'])
+        pushed[update_id] = (time.perf_counter(), index)
+    try:
+        await asyncio.wait_for(all_processed.wait(), args.drain_timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await lag_task
+    await application.updater.stop()
+    await application.stop()
+
+    final_states = {user_id: bot.STATE_NAMES.get(state, state) for user_id, state in bot.sessions.states().items()}
+    await bot.on_shutdown(application)
+    await application.shutdown()
+    await api.stop()
+
+    delays = [finished[update_id] - pushed_at for update_id, (pushed_at, _) in pushed.items() if update_id in finished]
+    return {
+        'pushed': pushed,
+        'states': states,
+        'final_states': final_states,
+        'excluded': excluded,
+        'summary': {
+            'updates': len(events),
+            'processed': len(finished),
+            'elapsed_seconds': round(elapsed, 3),
+            'updates_per_second': round(len(finished) / elapsed, 2) if elapsed else None,
+            'processing_ms': latency_stats(list(processing.values())),
+            'end_to_end_ms': latency_stats(delays),
+            'loop_lag_ms': latency_stats(lag),
+            'api_calls': dict(api.calls),
+        },
+    }
+
+
+def latency_stats(values: List[float]) -> Dict:
+    return {
+        name: round((percentile(values, q) or 0) * 1000, 2)
+        for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))
+    }
+
+
+def divergence(bot, events: List[Dict], final: Dict, outcome: Dict) -> Dict:
+    """Сверка состояний диалога перед каждым обновлением и итогов с записью"""
+    replayed = {index: outcome['states'].get(update_id) for update_id, (_, index) in outcome['pushed'].items()}
+    compared = diverged = 0
+    examples = []
+    for index, event in enumerate(events):
+        user = event_user(event['update'])
+        if not user or user['id'] in outcome['excluded']:
+            continue
+        compared += 1
+        if replayed.get(index) != event['state']:
+            diverged += 1
+            if len(examples) < MAX_EXAMPLES:
+                examples.append(f"#{index} пользователь {user['id']}: в записи {event['state']}, "
+                                f"при воспроизведении {replayed.get(index)}")
+
+    final_diverged = 0
+    for pseudonym, expected in final.items():
+        user_id = int(pseudonym)
+        if user_id in outcome['excluded']:
+            continue
+        registration = bot.db.get_registration(user_id)
+        actual = {
+            'state': outcome['final_states'].get(user_id),
+            'status': registration['status'] if registration else None,
+        }
+        if actual != expected:
+            final_diverged += 1
+            if len(examples) < MAX_EXAMPLES:
+                examples.append(f"итог пользователя {user_id}: в записи {expected}, при воспроизведении {actual}")
+
+    return {
+        'compared_updates': compared,
+        'diverged_updates': diverged,
+        'share': round(diverged / compared, 4) if compared else 0.0,
+        'compared_users': len(final),
+        'diverged_final': final_diverged,
+        'excluded_users': len(outcome['excluded']),
+        'examples': examples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизведение записанных обновлений")
+    parser.add_argument("recording", help="файл записи (UPDATE_RECORDING_FILE)")
+    parser.add_argument("--speed", type=float, default=1.0, help="ускорение относительно записи (0 — без пауз)")
+    parser.add_argument("--latency", type=float, default=30, help="задержка ответа Bot API, мс")
+    parser.add_argument("--no-flood-control", dest="flood_control", action="store_false",
+                        help="отключить защиту от флуда (при ускорении она срабатывает чаще, чем при записи)")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="сколько ждать обработки после отправки, с")
+    parser.add_argument("--max-divergence", type=float, default=0.0, help="допустимая доля расходящихся обновлений")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "replay.json"))
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    events, final = load_recording(os.path.abspath(args.recording))
+    if not events:
+        print("❌ В записи нет обновлений")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # БД, журнал и состояния диалогов бота — во временном каталоге
+        os.chdir(tmp)
+        import bot
+
+        outcome = asyncio.run(replay(bot, events, args))
+        result = dict(outcome['summary'], divergence=divergence(bot, events, final, outcome))
+        os.chdir(ROOT)
+
+    stats = result['divergence']
+    print(f"Обновлений: {result['processed']} из {result['updates']} за {result['elapsed_seconds']} с "
+          f"(скорость ×{args.speed:g}) — {result['updates_per_second']} обновлений/с")
+    print(f"Обработка: p50 {result['processing_ms']['p50']} мс, p95 {result['processing_ms']['p95']} мс, "
+          f"p99 {result['processing_ms']['p99']} мс")
+    print(f"От отправки до конца обработки: p50 {result['end_to_end_ms']['p50']} мс, "
+          f"p95 {result['end_to_end_ms']['p95']} мс, p99 {result['end_to_end_ms']['p99']} мс")
+    print(f"Лаг цикла событий: p99 {result['loop_lag_ms']['p99']} мс")
+    print(f"\nРасхождения: {stats['diverged_updates']} из {stats['compared_updates']} обновлений "
+          f"({stats['share']:.1%}), итогов — {stats['diverged_final']} из {stats['compared_users']} пользователей "
+          f"(не сверялись: {stats['excluded_users']})")
+    for example in stats['examples']:
+        print(f"  {example}")
+    if stats['diverged_updates'] and args.speed != 1:
+        print("  (защита от флуда и таймауты диалога зависят от времени — при ускорении часть расхождений ожидаема)")
+
+    save_report(output, "replay", {
+        'recording': os.path.basename(args.recording), 'speed': args.speed, 'latency_ms': args.latency,
+        'flood_control': args.flood_control,
+    }, result)
+
+    failures = []
+    if result['processed'] != result['updates']:
+        failures.append(f"обработано {result['processed']} из {result['updates']}")
+    if stats['share'] > args.max_divergence or (stats['diverged_final'] and not args.max_divergence):
+        failures.append(f"расхождений {stats['share']:.1%}, итогов {stats['diverged_final']}")
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Воспроизведение совпало с записью")
+
+
+if __name__ == '__main__':
+    main()
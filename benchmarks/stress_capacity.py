@@ -0,0 +1,125 @@
+"""
+Стресс-тест вместимости площадки: сотни одновременных подтверждений регистрации
+
+Проверяет, что Database.reserve_registration не выдает мест больше capacity,
+а отмены переводят участников из листа ожидания строго в порядке очереди.
+
+Запуск: python benchmarks/stress_capacity.py [участников] [вместимость]
+Код возврата 1 — обнаружено превышение вместимости или нарушение порядка.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+def make_registration(user_id: int) -> dict:
+    now = datetime.now().isoformat()
+    return {
+        'user_id': user_id,
+        'full_name': f"Участник Тестовый {user_id}",
+        'birth_date': "15.03.2003",
+        'email': f"user{user_id}@mail.ru",
+        'phone': "+79991234567",
+        'university': "СПбГУ (Санкт-Петербургский государственный университет)",
+        'course': "3 курс",
+        'interested_in_internship': user_id % 2 == 0,
+        'consent_given': True,
+        'consent_datetime': now,
+        'registration_datetime': now,
+        'telegram_username': f"user{user_id}",
+    }
+
+
+def run_concurrently(func, args_list):
+    """Запуск func одновременно во всех потоках (старт по барьеру)"""
+    barrier = threading.Barrier(len(args_list))
+    results = [None] * len(args_list)
+
+    def worker(index, args):
+        barrier.wait()
+        results[index] = func(*args)
+
+    threads = [threading.Thread(target=worker, args=(i, args)) for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def count_by_status(db_path: str) -> dict:
+    conn = sqlite3.connect(db_path)
+    counts = dict(conn.execute("SELECT status, COUNT(*) FROM registrations GROUP BY status").fetchall())
+    conn.close()
+    return counts
+
+
+def main():
+    participants = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    failures = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stress.db")
+        db = Database(db_path)
+
+        # 1. Одновременные подтверждения
+        start = time.perf_counter()
+        statuses = run_concurrently(
+            db.reserve_registration,
+            [(make_registration(user_id), capacity) for user_id in range(1, participants + 1)]
+        )
+        elapsed = time.perf_counter() - start
+
+        counts = count_by_status(db_path)
+        print(f"Подтверждений: {participants} за {elapsed:.2f} с ({participants / elapsed:.0f}/с)")
+        print(f"Мест: {capacity}, подтверждено: {counts.get('confirmed', 0)}, лист ожидания: {counts.get('waitlist', 0)}")
+
+        if None in statuses:
+            failures.append(f"ошибок сохранения: {statuses.count(None)}")
+        if counts.get('confirmed', 0) != min(capacity, participants):
+            failures.append("число подтвержденных не совпадает с вместимостью")
+        if statuses.count('confirmed') != counts.get('confirmed', 0):
+            failures.append("возвращенные статусы расходятся с БД")
+
+        # 2. Одновременные отмены подтвержденных участников
+        waitlist_before = [
+            row[0] for row in sqlite3.connect(db_path).execute(
+                "SELECT user_id FROM registrations WHERE status = 'waitlist' ORDER BY id"
+            )
+        ]
+        confirmed = [registration['user_id'] for registration in db.get_all_registrations() if registration['status'] == 'confirmed']
+        cancelled = confirmed[:min(20, len(confirmed))]
+
+        promoted_lists = run_concurrently(db.cancel_registration, [(user_id, capacity) for user_id in cancelled])
+        promoted = sorted(user_id for promoted_ids in promoted_lists for user_id in promoted_ids or [])
+        if None in promoted_lists:
+            failures.append(f"ошибок при отмене: {promoted_lists.count(None)}")
+
+        counts = count_by_status(db_path)
+        print(f"Отменено: {len(cancelled)}, переведено из листа ожидания: {len(promoted)}")
+        print(f"После отмен подтверждено: {counts.get('confirmed', 0)}, лист ожидания: {counts.get('waitlist', 0)}")
+
+        if counts.get('confirmed', 0) > capacity:
+            failures.append("превышение вместимости после отмен")
+        if promoted != sorted(waitlist_before[:len(promoted)]):
+            failures.append("из листа ожидания переведены не первые по очереди")
+        if waitlist_before and len(promoted) != min(len(cancelled), len(waitlist_before)):
+            failures.append("освободившиеся места не заняты листом ожидания")
+
+    if failures:
+        print("❌ ПРОВАЛ: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Превышения вместимости нет")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Заглушки объектов Telegram для прогона обработчиков bot.py без сети
+
+on_call — необязательный обработчик вызовов Bot API заглушек: получает имя
+метода и chat_id (например, чтобы посчитать вызовы на шаг диалога).
+"""
+from typing import Callable, Optional
+
+OnCall = Optional[Callable[[str, int], None]]
+
+
+class StubMessage:
+    message_id = 1
+
+    def __init__(self, chat_id: int = 0, text: str = "", on_call: OnCall = None):
+        self.chat_id = chat_id
+        self.text = text
+        self.on_call = on_call
+
+    async def reply_text(self, *args, **kwargs):
+        if self.on_call is not None:
+            self.on_call('sendMessage', self.chat_id)
+        return self
+
+
+class StubBot:
+    def __init__(self, on_call: OnCall = None):
+        self.on_call = on_call
+
+    async def send_message(self, chat_id, *args, **kwargs):
+        if self.on_call is not None:
+            self.on_call('sendMessage', chat_id)
+
+
+class StubUser:
+    def __init__(self, user_id: int, username: Optional[str] = None):
+        self.id = user_id
+        self.username = username
+        self.first_name = "Тест"
+
+
+class StubChat:
+    def __init__(self, chat_id: int):
+        self.id = chat_id
+
+
+class StubUpdate:
+    callback_query = None
+
+    def __init__(self, user_id: int, text: str = "", on_call: OnCall = None, username: Optional[str] = None):
+        self.effective_user = StubUser(user_id, username)
+        self.effective_chat = StubChat(user_id)
+        self.message = self.effective_message = StubMessage(user_id, text, on_call)
+
+
+class StubContext:
+    def __init__(self, on_call: OnCall = None):
+        self.user_data = {}
+        self.bot = StubBot(on_call)
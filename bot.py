@@ -1,87 +1,241 @@
 """
 Telegram бот для регистрации на форум Future Wave
 """
+import asyncio
+import functools
+import json
 import os
 import re
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, Message, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     ConversationHandler,
     CallbackQueryHandler,
+    TypeHandler,
+    ApplicationHandlerStop,
     filters,
     ContextTypes
 )
 from dotenv import load_dotenv
-from colorama import Fore, Back, Style, init
 
 from config import (
-    UNIVERSITIES,
-    COURSES,
     PERSONAL_DATA_CONSENT,
     ORGANIZATION_INFO,
     ADMIN_USERNAMES,
-    INTERNSHIP_CHAT_ID
+    INTERNSHIP_CHAT_ID,
+    NOTIFICATION_MODE,
+    DIGEST_WINDOW_SECONDS,
+    DIGEST_MAX_BATCH,
+    PERSISTENCE_UPDATE_INTERVAL,
+    LOG_FILE,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_SAMPLE_RATES,
+    FLOOD_LIMITS,
+    FLOOD_NOTICE_INTERVAL,
+    WAITING_ROOM_ENABLED,
+    MAX_ACTIVE_SESSIONS,
+    WAITING_ROOM_INVITE_TTL,
+    WAITING_ROOM_TICK_SECONDS,
+    WAITING_ROOM_UPDATE_INTERVAL,
+    WAITING_ROOM_MAX_EDITS_PER_UPDATE,
+    VENUE_CAPACITY,
+    SESSION_TIMEOUT_SECONDS,
+    SESSION_SWEEP_INTERVAL,
+    UNIVERSITIES,
+    OTHER_UNIVERSITY,
+    COURSES,
+    CONSENT_URL,
+    PRIVACY_POLICY_URL,
+    WEBAPP_URL,
+    WEBAPP_HOST,
+    WEBAPP_PORT,
+    WEBAPP_SERVE,
+    BROADCAST_RATE_PER_SECOND,
+    BROADCAST_BATCH_SIZE,
+    EMAIL_ENABLED,
+    SMTP_HOST,
+    SMTP_PORT,
+    SMTP_USE_TLS,
+    SMTP_SENDER,
+    MAILER_POOL_SIZE,
+    MAILER_BATCH_SIZE,
+    MAILER_MAX_ATTEMPTS,
+    TICKET_PREFIX,
+    CHECKIN_FLUSH_INTERVAL,
+    METRICS_HOST,
+    METRICS_PORT,
+    PERF_WINDOW_MINUTES,
+    PERF_MAX_RECORDS,
+    PERF_PROFILE_SAMPLE_RATE,
+    UPDATE_RECORDING_FILE,
+    UPDATE_RECORDING_FLUSH_INTERVAL,
+    LOOP_STALL_THRESHOLD_SECONDS,
+    LOOP_STALL_MAX_RECORDS,
+    EVENT_NAME,
+    BOT_TOKEN_ENV,
+    TICKET_SECRET_ENV,
+    DB_PATH,
+    PERSISTENCE_PATH,
+    SHARD_INDEX,
+    SHARD_COUNT,
+    SHARD_STATUS_INTERVAL
 )
 from database import Database
-
-# Инициализация colorama для Windows
-init(autoreset=True)
-
-
-def log_info(message: str, user=None):
-    """Логирование информационных сообщений"""
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    user_info = f"@{user.username} ({user.id})" if user else "System"
-    print(f"{Fore.CYAN}[{timestamp}] ℹ️  {Style.BRIGHT}{message}{Style.RESET_ALL} | {Fore.YELLOW}{user_info}{Style.RESET_ALL}")
-
-
-def log_success(message: str, user=None):
-    """Логирование успешных действий"""
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    user_info = f"@{user.username} ({user.id})" if user else "System"
-    print(f"{Fore.GREEN}[{timestamp}] ✅ {Style.BRIGHT}{message}{Style.RESET_ALL} | {Fore.YELLOW}{user_info}{Style.RESET_ALL}")
-
-
-def log_warning(message: str, user=None):
-    """Логирование предупреждений"""
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    user_info = f"@{user.username} ({user.id})" if user else "System"
-    print(f"{Fore.YELLOW}[{timestamp}] ⚠️  {Style.BRIGHT}{message}{Style.RESET_ALL} | {Fore.YELLOW}{user_info}{Style.RESET_ALL}")
-
-
-def log_error(message: str, user=None):
-    """Логирование ошибок"""
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    user_info = f"@{user.username} ({user.id})" if user else "System"
-    print(f"{Fore.RED}[{timestamp}] ❌ {Style.BRIGHT}{message}{Style.RESET_ALL} | {Fore.YELLOW}{user_info}{Style.RESET_ALL}")
-
-
-def log_admin(message: str, user=None):
-    """Логирование действий администраторов"""
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    user_info = f"@{user.username} ({user.id})" if user else "Admin"
-    print(f"{Fore.MAGENTA}[{timestamp}] 👑 {Style.BRIGHT}{message}{Style.RESET_ALL} | {Fore.YELLOW}{user_info}{Style.RESET_ALL}")
-
-
-def log_registration(message: str, data: Dict):
-    """Логирование регистраций"""
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    print(f"{Fore.GREEN}{Back.BLACK}[{timestamp}] 🎉 {Style.BRIGHT}{message}{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}    👤 {data.get('full_name', 'N/A')}")
-    print(f"{Fore.CYAN}    📧 {data.get('email', 'N/A')}")
-    print(f"{Fore.CYAN}    🎓 {data.get('university', 'N/A')}")
-    print(f"{Fore.CYAN}    📚 {data.get('course', 'N/A')}{Style.RESET_ALL}")
+from logger import (
+    setup_logging,
+    log_debug,
+    log_info,
+    log_success,
+    log_warning,
+    log_error,
+    log_admin,
+    log_registration
+)
+from persistence import SQLitePersistence
+from sessions import SessionRegistry, approximate_size
+from antiflood import FloodGuard, update_key
+from waiting_room import WaitingRoom
+from membership import RegisteredUsers
+from admins import AdminRegistry
+from apicalls import ApiCallStats, CountingRequest
+from broadcast import BroadcastRunner, AUDIENCE_TITLES, STATUS_TITLES
+from mailer import Mailer
+from metrics import MetricsRegistry, MetricsServer, instrument_methods
+from perf import PerfRecorder, charge_db, charge_api
+from recorder import UpdateRecorder
+from loop_watchdog import LoopWatchdog
+from tickets import (
+    TicketSigner,
+    CheckInDesk,
+    ticket_secret,
+    render_qr,
+    SCAN_OK,
+    SCAN_DUPLICATE,
+    SCAN_REVOKED,
+    SCAN_NOT_READY
+)
+from keyboards import (
+    UNIVERSITY_KEYBOARD,
+    COURSE_KEYBOARD,
+    WEBAPP_KEYBOARD,
+    CONSENT_KEYBOARD,
+    INTERNSHIP_KEYBOARD,
+    CONFIRM_KEYBOARD,
+    CONSENT_YES,
+    CONSENT_NO,
+    INTERNSHIP_YES,
+    INTERNSHIP_NO,
+    CONFIRM_YES,
+    CONFIRM_NO
+)
+from validation import (
+    validate_full_name,
+    validate_birth_date,
+    format_birth_date,
+    validate_email,
+    validate_phone,
+    validate_university,
+    validate_form
+)
+from webapp import WebAppServer, render_form
+from notifications import (
+    NotificationDigest,
+    format_registration_entry,
+    format_confirmation_email,
+    format_registrations_csv,
+    MODE_DIGEST,
+    MODE_IMMEDIATE
+)
 
 # Загрузка переменных окружения
 load_dotenv()
 
+# Логирование через очередь с фоновой записью
+setup_logging(LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_SAMPLE_RATES)
+
+# Название мероприятия в сообщениях участникам
+EVENT_TITLE = ORGANIZATION_INFO['event_name']
+
 # Инициализация базы данных
-db = Database()
+db = Database(DB_PATH)
+
+# Роли администраторов (при первом запуске заполняются из ADMIN_USERNAMES)
+admin_registry = AdminRegistry(db)
+db.seed_admin_invites(ADMIN_USERNAMES)
+admin_registry.reload()
+
+# Сводки уведомлений (используются в режиме "digest")
+notification_digest = NotificationDigest(DIGEST_WINDOW_SECONDS, DIGEST_MAX_BATCH)
+notification_mode = NOTIFICATION_MODE
+
+# Активные сессии регистрации
+sessions = SessionRegistry(SESSION_TIMEOUT_SECONDS)
+
+
+class ExpiredSessionFilter(filters.MessageFilter):
+    """Сообщения пользователей, брошенная сессия которых вытеснена, а диалог еще не завершен"""
+
+    __slots__ = ()
+
+    def filter(self, message: Message) -> bool:
+        return message.from_user is not None and sessions.is_expired(message.from_user.id)
+
+
+# Зарегистрированные пользователи в памяти (загружаются при старте)
+registered_users = RegisteredUsers()
+
+# Очередь на регистрацию при пиковой нагрузке
+waiting_room = WaitingRoom(MAX_ACTIVE_SESSIONS, WAITING_ROOM_INVITE_TTL, enabled=WAITING_ROOM_ENABLED)
+
+# Лимиты запросов от пользователей
+flood_guard = FloodGuard(FLOOD_LIMITS, notice_interval=FLOOD_NOTICE_INTERVAL)
+
+# Рассылки участникам
+broadcast_runner = BroadcastRunner(db, BROADCAST_RATE_PER_SECOND, BROADCAST_BATCH_SIZE)
+
+# Письма участникам (отправляются пулом SMTP-соединений в фоне)
+mailer = Mailer(
+    SMTP_HOST,
+    SMTP_PORT,
+    SMTP_SENDER,
+    username=os.getenv('SMTP_USERNAME'),
+    password=os.getenv('SMTP_PASSWORD'),
+    use_tls=SMTP_USE_TLS,
+    pool_size=MAILER_POOL_SIZE,
+    batch_size=MAILER_BATCH_SIZE,
+    max_attempts=MAILER_MAX_ATTEMPTS
+) if EMAIL_ENABLED else None
+
+# Билеты и отметка прохода на площадку (в одном процессе — проверка без обращения к БД)
+ticket_signer = TicketSigner(ticket_secret(os.getenv(TICKET_SECRET_ENV), os.getenv(BOT_TOKEN_ENV)), TICKET_PREFIX)
+# При нескольких процессах-обработчиках места и отметки проверяются по общей БД при каждом
+# сканировании: место могли выдать или отменить, а билет — отметить в другом процессе
+checkin_desk = CheckInDesk(
+    ticket_signer,
+    lookup=lambda user_id: db.get_confirmed_name(user_id),
+    record=lambda user_id, moment, scanned_by: db.record_checkin(user_id, moment, scanned_by)
+) if SHARD_INDEX is not None else CheckInDesk(ticket_signer)
+# Администраторы в режиме сканирования: любое их текстовое сообщение — код билета
+checkin_mode = set()
+
+# Учет вызовов Bot API (по методам и на одну регистрацию)
+api_calls = ApiCallStats()
+
+# Локальный сервер формы Web App (только если задан внешний адрес WEBAPP_URL и страницу отдает этот процесс)
+webapp_server = WebAppServer(
+    render_form(
+        f"{ORGANIZATION_INFO['venue']}, {ORGANIZATION_INFO['city']}",
+        UNIVERSITIES, COURSES, CONSENT_URL, PRIVACY_POLICY_URL, OTHER_UNIVERSITY, ORGANIZATION_INFO['event_name']
+    ),
+    WEBAPP_HOST,
+    WEBAPP_PORT
+) if WEBAPP_URL and WEBAPP_SERVE else None
 
 # Состояния диалога
 (
@@ -97,22 +251,113 @@ db = Database()
     CONFIRMATION
 ) = range(10)
 
+# Имя ConversationHandler регистрации (ключ его состояний в persistence)
+REGISTRATION_CONVERSATION = "registration"
+
+# Названия состояний для метрик
+STATE_NAMES = {
+    CONSENT: "consent",
+    FULL_NAME: "full_name",
+    BIRTH_DATE: "birth_date",
+    EMAIL: "email",
+    PHONE: "phone",
+    UNIVERSITY: "university",
+    UNIVERSITY_CUSTOM: "university_custom",
+    COURSE: "course",
+    INTERNSHIP_INTEREST: "internship_interest",
+    CONFIRMATION: "confirmation",
+    ConversationHandler.TIMEOUT: "timeout",
+}
+
+
+def outbound_queues() -> Dict[str, int]:
+    """Размеры очередей исходящей работы (для метрик)"""
+    return {
+        'mail': mailer.queue_size() if mailer else 0,
+        'admin_digest': notification_digest.pending_count(),
+        'checkins': checkin_desk.pending_count(),
+        'waiting_room': len(waiting_room),
+    }
+
+
+# Метрики: время обработки по шагам диалога и методам БД, вызовы Bot API, очереди.
+# Счетчики других модулей читаются только при запросе метрик
+metrics = MetricsRegistry({
+    label: str(value) for label, value in (('event', EVENT_NAME), ('shard', SHARD_INDEX)) if value is not None
+})
+handler_seconds = metrics.histogram("bot_handler_seconds", "Время обработки обновления по шагам диалога и обработчикам", "state")
+db_seconds = metrics.histogram("bot_db_seconds", "Время выполнения методов Database", "method")
+instrument_methods(db, db_seconds, charge=charge_db)
+metrics.counter("bot_api_calls_total", "Вызовы Bot API по методам",
+                lambda: dict(api_calls.calls_by_method), label="method")
+metrics.counter("bot_api_errors_total", "Ошибки Bot API по методам",
+                lambda: dict(api_calls.errors_by_method), label="method")
+metrics.counter("bot_registrations_completed_total", "Завершенные регистрации", lambda: api_calls.completed_total)
+metrics.gauge("bot_active_sessions", "Незавершенные регистрации", lambda: len(sessions))
+metrics.gauge("bot_queue_depth", "Размер очередей исходящей работы", outbound_queues, label="queue")
+metrics.gauge("bot_broadcasts_running", "Идущие рассылки", lambda: broadcast_runner.running_count())
+if mailer:
+    metrics.counter("bot_emails_total", "Письма участникам по результату", lambda: {
+        'sent': mailer.sent_total, 'failed': mailer.failed_total, 'retried': mailer.retries_total
+    }, label="result")
+
+metrics_server = MetricsServer(metrics, METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+
+# Замеры обработчиков (доли БД, Bot API и Python) и выборочные профили для /perf
+perf_recorder = PerfRecorder(PERF_WINDOW_MINUTES * 60, PERF_PROFILE_SAMPLE_RATE, max_records=PERF_MAX_RECORDS)
+metrics.counter("bot_profiles_total", "Обновления, обработанные под cProfile", lambda: perf_recorder.profiles_total)
+
+
+# Обезличенная запись входящих обновлений для воспроизведения в нагрузочных тестах (по умолчанию выключена)
+update_recorder = UpdateRecorder(
+    UPDATE_RECORDING_FILE,
+    keep_texts=[CONSENT_YES, CONSENT_NO, INTERNSHIP_YES, INTERNSHIP_NO, CONFIRM_YES, CONFIRM_NO] + UNIVERSITIES + COURSES,
+    salt=os.getenv('UPDATE_RECORDING_SALT', '').encode() or None
+) if UPDATE_RECORDING_FILE else None
+
+
+def conversation_state(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Текущее состояние диалога регистрации пользователя (None — вне диалога)"""
+    user = update.effective_user
+    if not user:
+        return None
+    state = sessions.state_of(user.id)
+    return STATE_NAMES.get(state, state)
+
+
+# Сторож цикла событий: зависания дольше порога с обработчиком, состоянием диалога и стеком
+loop_watchdog = LoopWatchdog(LOOP_STALL_THRESHOLD_SECONDS, LOOP_STALL_MAX_RECORDS)
+metrics.counter("bot_event_loop_stalls_total", "Зависания цикла событий дольше порога",
+                lambda: loop_watchdog.stalls_total)
+metrics.gauge("bot_event_loop_max_lag_seconds", "Наибольшая задержка цикла событий с запуска",
+              lambda: loop_watchdog.max_lag)
+
+
+def instrument(handler, name: str) -> None:
+    callback = perf_recorder.instrument(name, handler.callback, handler_seconds)
+    # Сторож может быть общим для нескольких мероприятий процесса — имя обработчика с мероприятием
+    name = f"{EVENT_NAME}/{handler.callback.__name__}" if EVENT_NAME else handler.callback.__name__
+    # Состояние диалога — из сессий этого бота, даже если сторож общий для нескольких мероприятий
+    handler.callback = loop_watchdog.track(name, callback, state_of=conversation_state)
+
+
+def instrument_handlers(application: Application) -> None:
+    """Замер всех обработчиков приложения: шаги диалога — по имени состояния, остальные — по имени функции"""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler):
+                for state, state_handlers in handler.states.items():
+                    for state_handler in state_handlers:
+                        instrument(state_handler, STATE_NAMES.get(state, str(state)))
+                for inner in handler.entry_points + handler.fallbacks:
+                    instrument(inner, inner.callback.__name__)
+            else:
+                instrument(handler, handler.callback.__name__)
+
 
 def is_admin(user) -> bool:
     """Проверка является ли пользователь администратором"""
-    if not user.username:
-        log_warning(f"У пользователя {user.first_name} (ID: {user.id}) нет username в Telegram", user)
-        return False
-
-    is_admin_user = user.username.lower() in [admin.lower() for admin in ADMIN_USERNAMES]
-
-    if is_admin_user:
-        log_admin(f"Пользователь @{user.username} распознан как администратор", user)
-    else:
-        log_info(f"Пользователь @{user.username} не является администратором", user)
-        log_info(f"Список админов: {ADMIN_USERNAMES}")
-
-    return is_admin_user
+    return admin_registry.is_admin(user)
 
 
 async def send_to_internship_chat(context: ContextTypes.DEFAULT_TYPE, registration_data: Dict) -> None:
@@ -121,7 +366,7 @@ async def send_to_internship_chat(context: ContextTypes.DEFAULT_TYPE, registrati
 
     # Отправляем только если заинтересован в стажировках
     if not interested:
-        log_info("Пользователь не заинтересован в стажировках, отправка в групповой чат пропущена")
+        log_debug("Пользователь не заинтересован в стажировках, отправка в групповой чат пропущена")
         return
 
     # Если ID чата не настроен, просто выходим
@@ -129,20 +374,14 @@ async def send_to_internship_chat(context: ContextTypes.DEFAULT_TYPE, registrati
         log_warning("ID группового чата для стажировок не настроен (INTERNSHIP_CHAT_ID = None)")
         return
 
-    username_display = f"@{registration_data['telegram_username']}" if registration_data['telegram_username'] else "не указан"
+    entry = format_registration_entry(registration_data, interest_text="✅ Да, интересны")
 
-    message_text = (
-        f"🆕 НОВАЯ ЗАЯВКА (ЗАИНТЕРЕСОВАН В СТАЖИРОВКАХ)\n\n"
-        f"👤 ФИО: {registration_data['full_name']}\n"
-        f"📅 Дата рождения: {registration_data['birth_date']}\n"
-        f"📧 Email: {registration_data['email']}\n"
-        f"📱 Телефон: {registration_data['phone']}\n"
-        f"🎓 Университет: {registration_data['university']}\n"
-        f"📚 Курс: {registration_data['course']}\n"
-        f"💼 Стажировки: ✅ Да, интересны\n"
-        f"🆔 Telegram: {username_display}\n"
-        f"🕐 Время: {datetime.fromisoformat(registration_data['registration_datetime']).strftime('%d.%m.%Y %H:%M:%S')}\n"
-    )
+    if notification_mode == MODE_DIGEST:
+        notification_digest.add(context.bot, INTERNSHIP_CHAT_ID, "🆕 НОВЫЕ ЗАЯВКИ (ЗАИНТЕРЕСОВАНЫ В СТАЖИРОВКАХ)", entry)
+        log_info(f"Заявка со стажировкой добавлена в сводку (chat_id: {INTERNSHIP_CHAT_ID})")
+        return
+
+    message_text = "🆕 НОВАЯ ЗАЯВКА (ЗАИНТЕРЕСОВАН В СТАЖИРОВКАХ)\n\n" + entry
 
     try:
         await context.bot.send_message(chat_id=INTERNSHIP_CHAT_ID, text=message_text)
@@ -153,21 +392,7 @@ async def send_to_internship_chat(context: ContextTypes.DEFAULT_TYPE, registrati
 
 async def notify_admins(context: ContextTypes.DEFAULT_TYPE, registration_data: Dict) -> None:
     """Отправка уведомления всем админам о новой регистрации"""
-    username_display = f"@{registration_data['telegram_username']}" if registration_data['telegram_username'] else "не указан"
-    interest_text = "✅ Да" if registration_data.get('interested_in_internship', False) else "❌ Нет"
-
-    notification_text = (
-        "🆕 НОВАЯ РЕГИСТРАЦИЯ!\n\n"
-        f"👤 ФИО: {registration_data['full_name']}\n"
-        f"📅 Дата рождения: {registration_data['birth_date']}\n"
-        f"📧 Email: {registration_data['email']}\n"
-        f"📱 Телефон: {registration_data['phone']}\n"
-        f"🎓 Университет: {registration_data['university']}\n"
-        f"📚 Курс: {registration_data['course']}\n"
-        f"💼 Стажировки: {interest_text}\n"
-        f"🆔 Telegram: {username_display}\n"
-        f"🕐 Время: {datetime.fromisoformat(registration_data['registration_datetime']).strftime('%d.%m.%Y %H:%M:%S')}\n"
-    )
+    entry = format_registration_entry(registration_data)
 
     # Получаем chat_id всех админов
     admin_chats = db.get_admin_chats()
@@ -176,8 +401,15 @@ async def notify_admins(context: ContextTypes.DEFAULT_TYPE, registration_data: D
         log_warning("⚠️ НЕТ ЗАРЕГИСТРИРОВАННЫХ АДМИНИСТРАТОРОВ! Администраторы должны написать боту /start или /admin чтобы получать уведомления")
         return
 
+    if notification_mode == MODE_DIGEST:
+        for chat_id in admin_chats:
+            notification_digest.add(context.bot, chat_id, "🆕 НОВЫЕ РЕГИСТРАЦИИ", entry)
+        log_info(f"Регистрация добавлена в сводку для {len(admin_chats)} администраторов")
+        return
+
     log_info(f"Отправка уведомлений {len(admin_chats)} администраторам о новой регистрации")
-    log_info(f"Chat IDs админов: {admin_chats}")
+
+    notification_text = "🆕 НОВАЯ РЕГИСТРАЦИЯ!\n\n" + entry
 
     # Отправляем уведомление каждому админу
     sent_count = 0
@@ -186,7 +418,7 @@ async def notify_admins(context: ContextTypes.DEFAULT_TYPE, registration_data: D
     for chat_id in admin_chats:
         try:
             await context.bot.send_message(chat_id=chat_id, text=notification_text)
-            log_success(f"✅ Уведомление отправлено админу (chat_id: {chat_id})")
+            log_debug(f"Уведомление отправлено админу (chat_id: {chat_id})")
             sent_count += 1
         except Exception as e:
             log_error(f"❌ Ошибка при отправке уведомления админу {chat_id}: {e}")
@@ -208,9 +440,16 @@ async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         f"👑 АДМИН-ПАНЕЛЬ\n\n"
         f"Добро пожаловать, @{user.username}!\n\n"
         f"📊 СТАТИСТИКА РЕГИСТРАЦИЙ:\n"
-        f"👥 Всего зарегистрировано: {stats['total']}\n\n"
+        f"👥 Всего зарегистрировано: {stats['total']}\n"
     )
 
+    if VENUE_CAPACITY is not None:
+        panel_text += (
+            f"🎟 Мест на площадке: {stats['confirmed']} из {VENUE_CAPACITY}\n"
+            f"📝 В листе ожидания: {stats['waitlist']}\n"
+        )
+    panel_text += "\n"
+
     # Добавляем статистику по университетам
     if stats['by_university']:
         panel_text += "🎓 По университетам:\n"
@@ -224,11 +463,15 @@ async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         for course, count in sorted(stats['by_course'].items(), key=lambda x: x[1], reverse=True):
             panel_text += f"  • {course}: {count}\n"
 
+    mode_text = "сводками" if notification_mode == MODE_DIGEST else "мгновенно"
+    panel_text += f"\n🔔 Уведомления о регистрациях: {mode_text}\n"
+
     # Кнопки админ-панели
     keyboard = [
         [InlineKeyboardButton("📋 Список всех участников", callback_data="admin_list_all")],
         [InlineKeyboardButton("📊 Обновить статистику", callback_data="admin_refresh")],
         [InlineKeyboardButton("📥 Экспорт данных", callback_data="admin_export")],
+        [InlineKeyboardButton("🔔 Переключить режим уведомлений", callback_data="admin_toggle_digest")],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -240,6 +483,7 @@ async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 async def admin_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик кнопок админ-панели"""
+    global notification_mode
     query = update.callback_query
     await query.answer()
 
@@ -305,15 +549,7 @@ async def admin_callback_handler(update: Update, context: ContextTypes.DEFAULT_T
             return
 
         # Формируем CSV
-        csv_content = "ФИО,Дата рождения,Email,Телефон,Университет,Курс,Telegram,Дата регистрации\n"
-
-        for reg in registrations:
-            username = reg['telegram_username'] or ''
-            csv_content += (
-                f"{reg['full_name']},{reg['birth_date']},{reg['email']},"
-                f"{reg['phone']},{reg['university']},{reg['course']},"
-                f"@{username},{reg['registration_datetime']}\n"
-            )
+        csv_content = format_registrations_csv(registrations)
 
         # Отправляем файл
         from io import BytesIO
@@ -329,6 +565,16 @@ async def admin_callback_handler(update: Update, context: ContextTypes.DEFAULT_T
         log_success(f"Экспорт выполнен: {len(registrations)} записей", user)
         await query.answer("✅ Файл отправлен")
 
+    elif query.data == "admin_toggle_digest":
+        if notification_mode == MODE_DIGEST:
+            notification_mode = MODE_IMMEDIATE
+            # Отправляем накопленное, чтобы ничего не потерялось при смене режима
+            await notification_digest.flush()
+        else:
+            notification_mode = MODE_DIGEST
+        log_admin(f"Режим уведомлений изменен на {notification_mode}", user)
+        await show_admin_panel(update, context)
+
     elif query.data == "admin_back":
         # Возврат в админ-панель
         await show_admin_panel(update, context)
@@ -338,7 +584,7 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     """Команда для открытия админ-панели"""
     user = update.effective_user
 
-    log_admin(f"Команда /admin от пользователя @{user.username or 'NO_USERNAME'} (ID: {user.id})", user)
+    log_admin("Команда /admin", user)
 
     if not is_admin(user):
         log_warning(f"Попытка доступа к /admin без прав администратора", user)
@@ -351,14 +597,14 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     # Сохраняем chat_id админа
     chat_id = update.effective_chat.id
     if not db.is_admin_registered(user.id):
-        log_admin(f"Сохранение нового chat_id для администратора @{user.username}: {chat_id}", user)
+        log_admin(f"Сохранение нового chat_id администратора: {chat_id}", user)
         success = db.save_admin_chat(user.id, user.username or '', chat_id)
         if success:
             log_success(f"✅ Chat ID администратора успешно сохранен: {chat_id}", user)
         else:
             log_error(f"❌ Ошибка при сохранении chat_id администратора", user)
     else:
-        log_info(f"Chat ID администратора уже сохранен (user_id: {user.id}, chat_id: {chat_id})", user)
+        log_debug(f"Chat ID администратора уже сохранен (chat_id: {chat_id})", user)
 
     await show_admin_panel(update, context)
 
@@ -375,14 +621,14 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         # Сохраняем chat_id админа, если еще не сохранен
         chat_id = update.effective_chat.id
         if not db.is_admin_registered(user.id):
-            log_admin(f"Сохранение нового chat_id для администратора @{user.username}: {chat_id}", user)
+            log_admin(f"Сохранение нового chat_id администратора: {chat_id}", user)
             success = db.save_admin_chat(user.id, user.username or '', chat_id)
             if success:
                 log_success(f"✅ Chat ID администратора успешно сохранен: {chat_id}", user)
             else:
                 log_error(f"❌ Ошибка при сохранении chat_id администратора", user)
         else:
-            log_info(f"Chat ID администратора уже сохранен (user_id: {user.id}, chat_id: {chat_id})", user)
+            log_debug(f"Chat ID администратора уже сохранен (chat_id: {chat_id})", user)
 
         # Открываем админ-панель
         await show_admin_panel(update, context)
@@ -391,25 +637,36 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     # Проверяем флаг перезапуска
     force_restart = context.user_data.get('force_restart', False)
 
-    # Проверяем, не зарегистрирован ли пользователь уже (только если не перезапуск)
-    if not force_restart:
+    # Проверяем, не зарегистрирован ли пользователь уже (только если не перезапуск).
+    # Полная запись читается из БД только для тех, кто есть в множестве зарегистрированных
+    if not force_restart and registered_users.might_be_registered(user.id):
         registration = db.get_registration(user.id)
         if registration:
             log_info("Пользователь уже зарегистрирован", user)
-            await update.message.reply_text(
+            await update.effective_message.reply_text(
                 f"Здравствуйте, {registration['full_name']}!\n\n"
-                f"Вы уже зарегистрированы на форум Future Wave.\n\n"
+                f"Вы уже зарегистрированы на форум {EVENT_TITLE}.\n\n"
                 f"📋 Ваши данные:\n"
                 f"ФИО: {registration['full_name']}\n"
                 f"Дата рождения: {registration['birth_date']}\n"
                 f"Email: {registration['email']}\n"
                 f"Телефон: {registration['phone']}\n"
                 f"Университет: {registration['university']}\n"
-                f"Курс: {registration['course']}\n\n"
-                f"Для повторной регистрации используйте /restart"
+                f"Курс: {registration['course']}\n"
+                f"{status_line(registration)}\n"
+                f"Для повторной регистрации используйте /restart\n"
+                f"Для отмены регистрации используйте /unregister"
             )
             return ConversationHandler.END
 
+    # При пиковой нагрузке новые пользователи ждут свободного места в очереди
+    if user.id not in sessions and not waiting_room.try_admit(user.id, len(sessions)):
+        await enqueue_waiting_user(update)
+        return ConversationHandler.END
+
+    sessions.touch(user.id, update.effective_chat.id)
+    api_calls.begin(update.effective_chat.id)
+
     # Очищаем флаг перезапуска, если он был установлен
     if force_restart:
         context.user_data.pop('force_restart', None)
@@ -417,11 +674,12 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     else:
         log_info("Начало новой регистрации", user)
 
-    # Приветствие
+    # Приветствие, согласие на обработку персональных данных с кликабельными ссылками
+    # и кнопки ответа — одним сообщением
     welcome_text = (
         f"👋 Здравствуйте, {user.first_name}!\n\n"
-        f"Добро пожаловать в систему регистрации на форум **Future Wave** — "
-        f"форум по поиску работы!\n\n"
+        f"Добро пожаловать в систему регистрации на форум **{EVENT_TITLE}** — "
+        f"{ORGANIZATION_INFO['event_description'].lower()}!\n\n"
         f"📍 Место проведения: {ORGANIZATION_INFO['venue']}, {ORGANIZATION_INFO['city']}\n\n"
         f"Для регистрации вам необходимо будет предоставить следующие данные:\n"
         f"• ФИО\n"
@@ -430,79 +688,222 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         f"• Номер телефона\n"
         f"• Университет\n"
         f"• Курс обучения\n\n"
-        f"Начнём с ознакомления с согласием на обработку персональных данных."
+        f"Начнём с ознакомления с согласием на обработку персональных данных.\n"
+        f"{PERSONAL_DATA_CONSENT}\n"
+        f"Пожалуйста, ознакомьтесь с согласием выше и подтвердите своё решение кнопкой ниже."
+    )
+
+    if force_restart:
+        welcome_text = "🔄 Начинаем регистрацию заново.\n\n" + welcome_text
+
+    if WEBAPP_KEYBOARD:
+        welcome_text += (
+            "\n\n📝 Можно заполнить всю анкету сразу — кнопка "
+            "«Заполнить анкету одной формой» под полем ввода."
+        )
+
+    await update.effective_message.reply_text(
+        welcome_text,
+        parse_mode='Markdown',
+        disable_web_page_preview=True,
+        reply_markup=CONSENT_KEYBOARD
+    )
+
+    return CONSENT
+
+
+async def waiting_room_enter(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Начало регистрации по приглашению из очереди"""
+    query = update.callback_query
+    await query.answer()
+    return await start(update, context)
+
+
+def waiting_room_text(position: int) -> str:
+    """Текст сообщения о позиции в очереди"""
+    text = (
+        "⏳ Сейчас регистрацию заполняет очень много людей.\n\n"
+        f"Вы в очереди: №{position}\n"
     )
+    wait = waiting_room.estimate_wait(position)
+    if wait is not None:
+        text += f"Примерное ожидание: ~{max(1, round(wait / 60))} мин.\n"
+    text += "\nКогда подойдёт ваша очередь, мы пришлём сообщение — ничего нажимать не нужно."
+    return text
+
+
+async def enqueue_waiting_user(update: Update) -> None:
+    """Постановка пользователя в очередь и отправка его позиции"""
+    user = update.effective_user
+    position = waiting_room.enqueue(user.id, update.effective_chat.id)
+    log_info(f"Пользователь поставлен в очередь на регистрацию (позиция {position})", user)
+
+    message = await update.effective_message.reply_text(waiting_room_text(position))
+    waiting_room.set_status_message(user.id, message.message_id, position)
+
+
+async def admit_waiting_users(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Приглашение пользователей из очереди на освободившиеся места"""
+    invited = waiting_room.release(len(sessions))
+    if not invited:
+        return
+
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("📝 Начать регистрацию", callback_data="waitroom_enter")]])
+    for user_id, chat_id in invited:
+        try:
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=f"🎉 Ваша очередь подошла! Нажмите кнопку ниже в течение {WAITING_ROOM_INVITE_TTL // 60} мин., "
+                     f"чтобы начать регистрацию.",
+                reply_markup=keyboard
+            )
+        except Exception as e:
+            log_error(f"Ошибка при отправке приглашения из очереди (chat_id: {chat_id}): {e}")
+
+    log_info(f"Из очереди приглашено пользователей: {len(invited)}, осталось в очереди: {len(waiting_room)}")
+
+
+async def update_waiting_positions(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обновление сообщений с позицией в очереди (только если позиция изменилась)"""
+    edits = 0
+    for position, user_id, chat_id, message_id, shown in list(waiting_room.waiting()):
+        if message_id is None or shown == position:
+            continue
+        if edits >= WAITING_ROOM_MAX_EDITS_PER_UPDATE:
+            break
+        try:
+            await context.bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=waiting_room_text(position))
+            waiting_room.set_status_message(user_id, message_id, position)
+        except Exception as e:
+            log_debug(f"Не удалось обновить позицию в очереди (chat_id: {chat_id}): {e}")
+        edits += 1
+
+
+def status_line(registration: Dict) -> str:
+    """Строка со статусом участия для сообщений пользователю"""
+    if registration.get('status') == 'waitlist':
+        return "Статус: 📝 лист ожидания\n"
+    return "Статус: ✅ участник\n"
+
 
-    await update.message.reply_text(welcome_text, parse_mode='Markdown')
+async def unregister_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Запрос на отмену регистрации"""
+    user = update.effective_user
+    log_info("Команда /unregister", user)
 
-    # Отправляем согласие на обработку персональных данных с кликабельными ссылками
-    await update.message.reply_text(PERSONAL_DATA_CONSENT, parse_mode='Markdown', disable_web_page_preview=True)
+    if not registered_users.might_be_registered(user.id) or not db.get_registration(user.id):
+        await update.message.reply_text("Вы не зарегистрированы на форум. Для регистрации используйте /start")
+        return
 
-    # Кнопки для согласия
     keyboard = [
-        [InlineKeyboardButton("✅ Даю согласие", callback_data="consent_yes")],
-        [InlineKeyboardButton("❌ Не даю согласие", callback_data="consent_no")]
+        [InlineKeyboardButton("✅ Да, отменить регистрацию", callback_data="unregister_yes")],
+        [InlineKeyboardButton("❌ Нет, оставить", callback_data="unregister_no")]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await update.message.reply_text(
-        "Пожалуйста, ознакомьтесь с согласием выше и подтвердите своё решение:",
-        reply_markup=reply_markup
+        "Вы уверены, что хотите отменить регистрацию на форум? Ваше место получит следующий из листа ожидания.",
+        reply_markup=InlineKeyboardMarkup(keyboard)
     )
 
-    return CONSENT
-
 
-async def consent_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Обработка согласия на обработку персональных данных"""
+async def unregister_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отмена регистрации и перевод участников из листа ожидания"""
     query = update.callback_query
     await query.answer()
 
     user = update.effective_user
 
-    if query.data == "consent_yes":
+    if query.data != "unregister_yes":
+        await query.edit_message_text("Регистрация сохранена. До встречи на форуме! 👋")
+        return
+
+    promoted = db.cancel_registration(user.id, VENUE_CAPACITY)
+    if promoted is None:
+        await query.edit_message_text("⚠️ Не удалось отменить регистрацию. Пожалуйста, попробуйте позже.")
+        return
+
+    # Регистрация удалена из БД — теперь ее можно убрать из индексов в памяти
+    registered_users.discard(user.id)
+    checkin_desk.revoke(user.id)
+    if promoted is False:
+        await query.edit_message_text("Вы не зарегистрированы на форум. Для регистрации используйте /start")
+        return
+
+    log_info("Пользователь отменил регистрацию", user)
+    await query.edit_message_text("Ваша регистрация отменена. Если передумаете, используйте /start.")
+
+    await notify_promoted(context.bot, promoted)
+
+
+async def notify_promoted(bot, promoted: List[int]) -> None:
+    """Уведомление участников, переведенных из листа ожидания"""
+    for user_id in promoted:
+        log_info(f"Участник переведен из листа ожидания (user_id: {user_id})")
+        registration = db.get_registration(user_id)
+        if registration:
+            checkin_desk.admit(user_id, registration['full_name'])
+        try:
+            await bot.send_message(
+                chat_id=user_id,
+                text=f"🎉 Освободилось место! Вы переведены из листа ожидания и теперь участник форума {EVENT_TITLE}.\n\n"
+                     f"📍 Место: {ORGANIZATION_INFO['venue']}, {ORGANIZATION_INFO['city']}\n\n"
+                     f"{ticket_line(ticket_signer.issue(user_id))}",
+                parse_mode='Markdown'
+            )
+        except Exception as e:
+            log_error(f"Ошибка при уведомлении участника из листа ожидания {user_id}: {e}")
+
+
+async def consent(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Обработка согласия на обработку персональных данных"""
+    user = update.effective_user
+    answer = update.message.text.strip()
+
+    if answer == CONSENT_YES:
         log_success("Пользователь дал согласие на обработку данных", user)
         # Сохраняем согласие и время
         context.user_data['consent_given'] = True
         context.user_data['consent_datetime'] = datetime.now().isoformat()
 
-        await query.edit_message_text(
+        await update.message.reply_text(
             "✅ Спасибо! Вы дали согласие на обработку персональных данных.\n\n"
             "Теперь давайте начнём заполнение регистрационной формы.\n\n"
-            "📝 Пожалуйста, введите ваше ФИО (Фамилия Имя Отчество):"
+            "📝 Пожалуйста, введите ваше ФИО (Фамилия Имя Отчество):",
+            reply_markup=ReplyKeyboardRemove()
         )
 
         return FULL_NAME
-    else:
+    elif answer == CONSENT_NO:
         log_warning("Пользователь отказался от обработки данных", user)
-        await query.edit_message_text(
+        await update.message.reply_text(
             "❌ Без согласия на обработку персональных данных мы не можем зарегистрировать вас на форум.\n\n"
             "Если вы передумаете, используйте команду /start для повторной регистрации.\n\n"
-            "Если у вас есть вопросы, свяжитесь с организаторами."
+            "Если у вас есть вопросы, свяжитесь с организаторами.",
+            reply_markup=ReplyKeyboardRemove()
         )
 
+        sessions.end(user.id)
         return ConversationHandler.END
+    else:
+        # Клавиатура с вариантами ответа уже показана, повторно ее не отправляем
+        await update.message.reply_text("Пожалуйста, выберите вариант ответа на клавиатуре ниже.")
+        return CONSENT
 
 
 async def full_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Получение ФИО"""
     user = update.effective_user
-    name = update.message.text.strip()
+    result = validate_full_name(update.message.text)
 
-    # Простая валидация (минимум 2 слова)
-    if len(name.split()) < 2:
-        log_warning(f"Некорректный ввод ФИО: {name}", user)
-        await update.message.reply_text(
-            "⚠️ Пожалуйста, введите полное ФИО (минимум Фамилия и Имя).\n"
-            "Например: Иванов Иван Иванович"
-        )
+    if not result.ok:
+        log_debug("Некорректный ввод ФИО", user)
+        await update.message.reply_text(result.error)
         return FULL_NAME
 
-    log_info(f"ФИО введено: {name}", user)
-    context.user_data['full_name'] = name
+    log_debug("ФИО введено", user)
+    context.user_data['full_name'] = result.value
 
     await update.message.reply_text(
-        f"✅ ФИО: {name}\n\n"
+        f"✅ ФИО: {result.value}\n\n"
         f"📅 Теперь введите вашу дату рождения в формате ДД.ММ.ГГГГ\n"
         f"Например: 15.03.2003"
     )
@@ -513,45 +914,15 @@ async def full_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 async def birth_date(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Получение даты рождения"""
     user = update.effective_user
-    date_text = update.message.text.strip()
-
-    # Валидация формата даты
-    date_pattern = r'^\d{2}\.\d{2}\.\d{4}$'
-    if not re.match(date_pattern, date_text):
-        log_warning(f"Некорректный формат даты: {date_text}", user)
-        await update.message.reply_text(
-            "⚠️ Неверный формат даты. Пожалуйста, используйте формат ДД.ММ.ГГГГ\n"
-            "Например: 15.03.2003"
-        )
-        return BIRTH_DATE
-
-    # Проверка валидности даты
-    try:
-        day, month, year = map(int, date_text.split('.'))
-        date_obj = datetime(year, month, day)
-
-        # Проверка возраста (должен быть не младше 14 лет)
-        age = (datetime.now() - date_obj).days / 365.25
-        if age < 14:
-            await update.message.reply_text(
-                "⚠️ К сожалению, участие в форуме доступно для лиц старше 14 лет."
-            )
-            return BIRTH_DATE
-
-        if age > 100:
-            await update.message.reply_text(
-                "⚠️ Пожалуйста, проверьте правильность введённой даты."
-            )
-            return BIRTH_DATE
+    result = validate_birth_date(update.message.text)
 
-    except ValueError:
-        log_warning(f"Некорректная дата: {date_text}", user)
-        await update.message.reply_text(
-            "⚠️ Указана некорректная дата. Пожалуйста, проверьте правильность ввода."
-        )
+    if not result.ok:
+        log_debug("Некорректная дата рождения", user)
+        await update.message.reply_text(result.error)
         return BIRTH_DATE
 
-    log_info(f"Дата рождения введена: {date_text}", user)
+    log_debug("Дата рождения введена", user)
+    date_text = format_birth_date(result.value)
     context.user_data['birth_date'] = date_text
 
     await update.message.reply_text(
@@ -565,23 +936,18 @@ async def birth_date(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 async def email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Получение email"""
     user = update.effective_user
-    email_text = update.message.text.strip()
+    result = validate_email(update.message.text)
 
-    # Валидация email
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(email_pattern, email_text):
-        log_warning(f"Некорректный email: {email_text}", user)
-        await update.message.reply_text(
-            "⚠️ Неверный формат email. Пожалуйста, введите корректный адрес.\n"
-            "Например: example@mail.ru"
-        )
+    if not result.ok:
+        log_debug("Некорректный email", user)
+        await update.message.reply_text(result.error)
         return EMAIL
 
-    log_info(f"Email введен: {email_text}", user)
-    context.user_data['email'] = email_text
+    log_debug("Email введен", user)
+    context.user_data['email'] = result.value
 
     await update.message.reply_text(
-        f"✅ Email: {email_text}\n\n"
+        f"✅ Email: {result.value}\n\n"
         f"📱 Теперь введите ваш номер телефона в формате +7XXXXXXXXXX или 8XXXXXXXXXX:"
     )
 
@@ -591,39 +957,20 @@ async def email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 async def phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Получение номера телефона"""
     user = update.effective_user
-    phone_text = update.message.text.strip()
-
-    # Очистка от лишних символов
-    phone_clean = re.sub(r'[^\d+]', '', phone_text)
+    result = validate_phone(update.message.text)
 
-    # Валидация номера телефона
-    phone_pattern = r'^(\+7|8)\d{10}$'
-    if not re.match(phone_pattern, phone_clean):
-        log_warning(f"Некорректный телефон: {phone_text}", user)
-        await update.message.reply_text(
-            "⚠️ Неверный формат номера телефона.\n"
-            "Пожалуйста, введите номер в формате: +79991234567 или 89991234567"
-        )
+    if not result.ok:
+        log_debug("Некорректный телефон", user)
+        await update.message.reply_text(result.error)
         return PHONE
 
-    log_info(f"Телефон введен: {phone_clean}", user)
-    context.user_data['phone'] = phone_clean
-
-    # Кнопки с университетами
-    keyboard = []
-    for i in range(0, len(UNIVERSITIES), 2):
-        row = []
-        row.append(UNIVERSITIES[i])
-        if i + 1 < len(UNIVERSITIES):
-            row.append(UNIVERSITIES[i + 1])
-        keyboard.append(row)
-
-    reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
+    log_debug("Телефон введен", user)
+    context.user_data['phone'] = result.value
 
     await update.message.reply_text(
-        f"✅ Телефон: {phone_clean}\n\n"
+        f"✅ Телефон: {result.value}\n\n"
         f"🎓 Выберите ваш университет из списка или введите название вручную:",
-        reply_markup=reply_markup
+        reply_markup=UNIVERSITY_KEYBOARD
     )
 
     return UNIVERSITY
@@ -634,32 +981,21 @@ async def university(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
     university_text = update.message.text.strip()
 
-    if university_text == "Другой университет":
-        log_info("Выбран вариант 'Другой университет'", user)
+    if university_text == OTHER_UNIVERSITY:
+        log_debug(f"Выбран вариант '{OTHER_UNIVERSITY}'", user)
         await update.message.reply_text(
             "🎓 Пожалуйста, введите название вашего университета:",
             reply_markup=ReplyKeyboardRemove()
         )
         return UNIVERSITY_CUSTOM
 
-    log_info(f"Университет выбран: {university_text}", user)
+    log_debug(f"Университет выбран: {university_text}", user)
     context.user_data['university'] = university_text
 
-    # Кнопки с курсами
-    keyboard = []
-    for i in range(0, len(COURSES), 2):
-        row = []
-        row.append(COURSES[i])
-        if i + 1 < len(COURSES):
-            row.append(COURSES[i + 1])
-        keyboard.append(row)
-
-    reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-
     await update.message.reply_text(
         f"✅ Университет: {university_text}\n\n"
         f"📚 Выберите ваш курс обучения:",
-        reply_markup=reply_markup
+        reply_markup=COURSE_KEYBOARD
     )
 
     return COURSE
@@ -668,33 +1004,20 @@ async def university(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 async def university_custom(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Получение названия другого университета"""
     user = update.effective_user
-    university_text = update.message.text.strip()
+    result = validate_university(update.message.text)
 
-    if len(university_text) < 3:
-        log_warning(f"Слишком короткое название университета: {university_text}", user)
-        await update.message.reply_text(
-            "⚠️ Пожалуйста, введите корректное название университета."
-        )
+    if not result.ok:
+        log_debug("Слишком короткое название университета", user)
+        await update.message.reply_text(result.error)
         return UNIVERSITY_CUSTOM
 
-    log_info(f"Университет (вручную) введен: {university_text}", user)
-    context.user_data['university'] = university_text
-
-    # Кнопки с курсами
-    keyboard = []
-    for i in range(0, len(COURSES), 2):
-        row = []
-        row.append(COURSES[i])
-        if i + 1 < len(COURSES):
-            row.append(COURSES[i + 1])
-        keyboard.append(row)
-
-    reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
+    log_debug(f"Университет (вручную) введен: {result.value}", user)
+    context.user_data['university'] = result.value
 
     await update.message.reply_text(
-        f"✅ Университет: {university_text}\n\n"
+        f"✅ Университет: {result.value}\n\n"
         f"📚 Выберите ваш курс обучения:",
-        reply_markup=reply_markup
+        reply_markup=COURSE_KEYBOARD
     )
 
     return COURSE
@@ -705,25 +1028,14 @@ async def course(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
     course_text = update.message.text.strip()
 
-    log_info(f"Курс выбран: {course_text}", user)
+    log_debug(f"Курс выбран: {course_text}", user)
     context.user_data['course'] = course_text
 
-    # Спрашиваем о заинтересованности в стажировках
-    keyboard = [
-        [InlineKeyboardButton("✅ Да, интересны", callback_data="internship_yes")],
-        [InlineKeyboardButton("❌ Нет, не интересны", callback_data="internship_no")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
+    # Вопрос о стажировках — тем же сообщением, что и подтверждение курса
     await update.message.reply_text(
         f"✅ Курс: {course_text}\n\n"
         f"💼 Интересны ли вам стажировки?",
-        reply_markup=ReplyKeyboardRemove()
-    )
-
-    await update.message.reply_text(
-        "Пожалуйста, выберите ваш ответ:",
-        reply_markup=reply_markup
+        reply_markup=INTERNSHIP_KEYBOARD
     )
 
     return INTERNSHIP_INTEREST
@@ -731,21 +1043,22 @@ async def course(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 async def internship_interest(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка ответа на вопрос о стажировках"""
-    query = update.callback_query
-    await query.answer()
-
     user = update.effective_user
+    answer = update.message.text.strip()
 
-    if query.data == "internship_yes":
-        log_info("Пользователь заинтересован в стажировках", user)
+    if answer == INTERNSHIP_YES:
+        log_debug("Пользователь заинтересован в стажировках", user)
         context.user_data['interested_in_internship'] = True
         interest_text = "Да, интересны"
-    else:
-        log_info("Пользователь не заинтересован в стажировках", user)
+    elif answer == INTERNSHIP_NO:
+        log_debug("Пользователь не заинтересован в стажировках", user)
         context.user_data['interested_in_internship'] = False
         interest_text = "Нет, не интересны"
+    else:
+        await update.message.reply_text("Пожалуйста, выберите вариант ответа на клавиатуре ниже.")
+        return INTERNSHIP_INTEREST
 
-    # Формируем сводку всех данных
+    # Формируем сводку всех данных вместе с просьбой подтвердить их
     user_data = context.user_data
     summary = (
         "📋 ПРОВЕРЬТЕ ВВЕДЁННЫЕ ДАННЫЕ\n\n"
@@ -756,34 +1069,100 @@ async def internship_interest(update: Update, context: ContextTypes.DEFAULT_TYPE
         f"Университет: {user_data['university']}\n"
         f"Курс: {user_data['course']}\n"
         f"Стажировки: {interest_text}\n\n"
-        f"Всё верно?"
+        f"Всё верно? Пожалуйста, подтвердите введённые данные:"
     )
 
-    keyboard = [
-        [InlineKeyboardButton("✅ Да, всё верно", callback_data="confirm_yes")],
-        [InlineKeyboardButton("❌ Нет, заполнить заново", callback_data="confirm_no")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    await update.message.reply_text(summary, reply_markup=CONFIRM_KEYBOARD)
+
+    return CONFIRMATION
+
+
+async def complete_registration(context: ContextTypes.DEFAULT_TYPE, registration_data: Dict) -> Optional[str]:
+    """Сохранение регистрации с учетом вместимости и уведомления о ней
+
+    Общий путь для пошагового диалога и формы Web App. Возвращает статус
+    ('confirmed' или 'waitlist') или None при ошибке сохранения.
+    """
+    status = db.reserve_registration(registration_data, VENUE_CAPACITY)
+    registration_data['status'] = status
+    if status is None:
+        log_error(f"Ошибка при сохранении регистрации в БД (user_id: {registration_data['user_id']})")
+        return None
+
+    registered_users.add(registration_data['user_id'])
+
+    ticket = None
+    if status == 'confirmed':
+        checkin_desk.admit(registration_data['user_id'], registration_data['full_name'])
+        ticket = ticket_signer.issue(registration_data['user_id'])
+
+    if status == 'waitlist':
+        log_registration("НОВАЯ РЕГИСТРАЦИЯ В ЛИСТ ОЖИДАНИЯ", registration_data)
+    else:
+        log_registration("НОВАЯ РЕГИСТРАЦИЯ ЗАВЕРШЕНА!", registration_data)
+
+    # Отправляем уведомления админам о новой регистрации (всегда)
+    await notify_admins(context, registration_data)
+
+    # Отправляем данные в групповой чат стажировок (только если заинтересован)
+    await send_to_internship_chat(context, registration_data)
+
+    # Письмо участнику ставится в очередь и уходит в фоне
+    if mailer:
+        venue = f"{ORGANIZATION_INFO['venue']}, {ORGANIZATION_INFO['city']}"
+        mailer.enqueue(registration_data['email'], *format_confirmation_email(
+            registration_data, venue, ticket, ORGANIZATION_INFO['event_name'], ORGANIZATION_INFO['event_description']
+        ))
+
+    return status
 
-    await query.edit_message_text(summary)
 
-    await query.message.reply_text(
-        "Пожалуйста, подтвердите введённые данные:",
-        reply_markup=reply_markup
+def registration_result_message(status: Optional[str], full_name: str, ticket: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Текст итогового сообщения пользователю и режим разметки"""
+    if status == 'waitlist':
+        return (
+            "📝 ВЫ В ЛИСТЕ ОЖИДАНИЯ\n\n"
+            f"Спасибо, {full_name}!\n\n"
+            "К сожалению, все места на площадке уже заняты, поэтому мы добавили вас в лист ожидания.\n\n"
+            "Как только освободится место, вы автоматически станете участником и получите сообщение от бота.",
+            None
+        )
+    if status == 'confirmed':
+        return (
+            "🎉 РЕГИСТРАЦИЯ ЗАВЕРШЕНА!\n\n"
+            f"Спасибо, {full_name}!\n\n"
+            f"Вы успешно зарегистрированы на форум **{EVENT_TITLE}**.\n\n"
+            f"📍 Место: {ORGANIZATION_INFO['venue']}, {ORGANIZATION_INFO['city']}\n\n"
+            f"{ticket_line(ticket)}"
+            "Мы отправим дополнительную информацию на указанный вами email.\n\n"
+            "До встречи на форуме! 👋",
+            'Markdown'
+        )
+    return (
+        "⚠️ Произошла ошибка при сохранении данных. "
+        "Пожалуйста, попробуйте зарегистрироваться позже или свяжитесь с организаторами.",
+        None
     )
 
 
-    return CONFIRMATION
+def issued_ticket(status: Optional[str], user_id: int) -> Optional[str]:
+    """Код билета для участника с местом на площадке"""
+    return ticket_signer.issue(user_id) if status == 'confirmed' else None
+
+
+def ticket_line(ticket: Optional[str]) -> str:
+    """Строка с кодом билета для сообщений в Markdown"""
+    if not ticket:
+        return ""
+    return f"🎟 Ваш билет: `{ticket}`\nПокажите его на входе (QR-код — /ticket).\n\n"
 
 
 async def confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Подтверждение регистрации"""
-    query = update.callback_query
-    await query.answer()
-
     user = update.effective_user
+    answer = update.message.text.strip()
 
-    if query.data == "confirm_yes":
+    if answer == CONFIRM_YES:
         # Сохраняем данные в базу
         user_data = context.user_data
 
@@ -804,43 +1183,90 @@ async def confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
             'telegram_username': user.username or ''
         }
 
-        success = db.save_registration(registration_data)
+        status = await complete_registration(context, registration_data)
+        text, parse_mode = registration_result_message(status, user_data['full_name'], issued_ticket(status, user.id))
+        await update.message.reply_text(text, parse_mode=parse_mode, reply_markup=ReplyKeyboardRemove())
+        api_calls.finish(update.effective_chat.id)
 
-        if success:
-            log_registration("НОВАЯ РЕГИСТРАЦИЯ ЗАВЕРШЕНА!", registration_data)
+        context.user_data.clear()
+        sessions.end(user.id)
+        return ConversationHandler.END
+    elif answer == CONFIRM_NO:
+        log_info("Пользователь отменил регистрацию на этапе подтверждения", user)
+        await update.message.reply_text(
+            "Регистрация отменена. Используйте /start для начала новой регистрации.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        context.user_data.clear()
+        sessions.end(user.id)
+        return ConversationHandler.END
+    else:
+        await update.message.reply_text("Пожалуйста, выберите вариант ответа на клавиатуре ниже.")
+        return CONFIRMATION
 
-            # Отправляем уведомления админам о новой регистрации (всегда)
-            await notify_admins(context, registration_data)
 
-            # Отправляем данные в групповой чат стажировок (только если заинтересован)
-            await send_to_internship_chat(context, registration_data)
+async def stale_button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Нажатие кнопки из сообщений прежней версии диалога (до перехода на обычную клавиатуру)"""
+    await update.callback_query.answer(
+        "Эта кнопка устарела. Используйте клавиатуру под полем ввода или /restart.",
+        show_alert=True
+    )
 
-            await query.edit_message_text(
-                "🎉 РЕГИСТРАЦИЯ ЗАВЕРШЕНА!\n\n"
-                f"Спасибо, {user_data['full_name']}!\n\n"
-                f"Вы успешно зарегистрированы на форум **Future Wave**.\n\n"
-                f"📍 Место: {ORGANIZATION_INFO['venue']}, {ORGANIZATION_INFO['city']}\n\n"
-                "Мы отправим дополнительную информацию на указанный вами email.\n\n"
-                "До встречи на форуме! 👋",
-                parse_mode='Markdown'
-            )
-        else:
-            log_error("Ошибка при сохранении регистрации в БД", user)
-            await query.edit_message_text(
-                "⚠️ Произошла ошибка при сохранении данных. "
-                "Пожалуйста, попробуйте зарегистрироваться позже или свяжитесь с организаторами."
-            )
 
-        context.user_data.clear()
+async def web_app_submit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Регистрация одной формой: данные из Web App приходят одним сообщением web_app_data"""
+    user = update.effective_user
+    message = update.effective_message
+
+    try:
+        form = json.loads(message.web_app_data.data)
+        if not isinstance(form, dict):
+            raise ValueError("ожидался JSON-объект")
+    except ValueError as e:
+        log_warning(f"Некорректные данные формы Web App: {e}", user)
+        await message.reply_text("⚠️ Не удалось прочитать данные формы. Пожалуйста, попробуйте ещё раз.")
         return ConversationHandler.END
-    else:
-        log_info("Пользователь отменил регистрацию на этапе подтверждения", user)
-        await query.edit_message_text(
-            "Регистрация отменена. Используйте /start для начала новой регистрации."
+
+    fields, errors = validate_form(form, UNIVERSITIES, COURSES, OTHER_UNIVERSITY)
+    if errors:
+        log_debug(f"Форма Web App отклонена: ошибок {len(errors)}", user)
+        await message.reply_text(
+            "\n\n".join(errors) + "\n\nИсправьте данные и отправьте форму ещё раз.",
+            reply_markup=WEBAPP_KEYBOARD
+        )
+        return ConversationHandler.END
+
+    force_restart = context.user_data.get('force_restart', False)
+    if not force_restart and registered_users.might_be_registered(user.id) and db.get_registration(user.id):
+        log_info("Форма Web App от уже зарегистрированного пользователя", user)
+        await message.reply_text(
+            f"Вы уже зарегистрированы на форум {EVENT_TITLE}.\n\n"
+            "Для повторной регистрации используйте /restart",
+            reply_markup=ReplyKeyboardRemove()
         )
-        context.user_data.clear()
         return ConversationHandler.END
 
+    log_info("Пользователь отправил форму Web App", user)
+
+    now = datetime.now().isoformat()
+    registration_data = {
+        'user_id': user.id,
+        **fields,
+        'consent_given': True,
+        'consent_datetime': now,
+        'registration_datetime': now,
+        'telegram_username': user.username or ''
+    }
+
+    status = await complete_registration(context, registration_data)
+    text, parse_mode = registration_result_message(status, registration_data['full_name'], issued_ticket(status, user.id))
+    await message.reply_text(text, parse_mode=parse_mode, reply_markup=ReplyKeyboardRemove())
+    api_calls.finish(update.effective_chat.id)
+
+    context.user_data.clear()
+    sessions.end(user.id)
+    return ConversationHandler.END
+
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Отмена регистрации"""
@@ -851,49 +1277,276 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         reply_markup=ReplyKeyboardRemove()
     )
     context.user_data.clear()
+    sessions.end(user.id)
     return ConversationHandler.END
 
 
-async def restart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Перезапуск регистрации"""
+async def registration_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Завершение регистрации по таймауту бездействия"""
     user = update.effective_user
-    log_info("Команда /restart - перезапуск регистрации", user)
-    context.user_data.clear()
-    # Устанавливаем флаг, что это перезапуск
-    context.user_data['force_restart'] = True
-    await update.message.reply_text(
-        "Начинаем регистрацию заново...",
-        reply_markup=ReplyKeyboardRemove()
-    )
-    return await start(update, context)
+    log_warning("Регистрация прервана по таймауту бездействия", user)
 
+    context.user_data.clear()
+    context.application.drop_user_data(user.id)
+    sessions.end(user.id)
+    sessions.timed_out_total += 1
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Помощь"""
-    help_text = (
-        "🤖 КОМАНДЫ БОТА:\n\n"
-        "/start - Начать регистрацию\n"
-        "/restart - Перезапустить регистрацию\n"
-        "/cancel - Отменить текущую регистрацию\n"
-        "/help - Показать эту справку\n"
-        "/whoami - Показать информацию о вашем аккаунте\n\n"
-        "По вопросам обращайтесь к организаторам форума Future Wave."
-    )
-    await update.message.reply_text(help_text)
+    try:
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="⏰ Время заполнения анкеты истекло, введённые данные удалены.\n\n"
+                 "Используйте /start, чтобы начать регистрацию заново.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+    except Exception as e:
+        log_error(f"Ошибка при отправке сообщения о таймауте: {e}", user)
 
 
-async def whoami_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Показать информацию о пользователе для диагностики"""
+async def flood_control(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отбрасывание обновлений сверх лимита до любых обращений к БД и Bot API"""
     user = update.effective_user
+    if not user:
+        return
 
-    log_info("Команда /whoami", user)
+    key = update_key(update)
+    if flood_guard.check(user.id, key):
+        return
 
-    username_text = f"@{user.username}" if user.username else "❌ НЕТ USERNAME"
-    is_admin_status = "✅ ДА" if is_admin(user) else "❌ НЕТ"
-    is_registered_admin = "✅ ДА" if db.is_admin_registered(user.id) else "❌ НЕТ"
+    log_debug(f"Превышен лимит запросов ({key}), обновление отброшено", user)
 
-    info_text = (
-        f"👤 ИНФОРМАЦИЯ О ВАШЕМ АККАУНТЕ\n\n"
+    if flood_guard.should_notify(user.id):
+        log_warning(f"Пользователь превысил лимит запросов ({key})", user)
+        if update.callback_query:
+            await update.callback_query.answer("⏳ Слишком много запросов. Подождите немного.", show_alert=True)
+        elif update.effective_message:
+            await update.effective_message.reply_text("⏳ Слишком много запросов. Подождите немного и попробуйте снова.")
+    elif update.callback_query:
+        # Без ответа на callback у пользователя продолжает крутиться индикатор загрузки на кнопке
+        await update.callback_query.answer()
+
+    raise ApplicationHandlerStop
+
+
+async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Запись обновления до любой обработки (в том числе отброшенных защитой от флуда)"""
+    user = update.effective_user
+    update_recorder.record(
+        update.to_dict(),
+        user.id if user else None,
+        conversation_state(update, context),
+        is_admin(user) if user else False,
+        registered_users.might_be_registered(user.id) if user else False
+    )
+
+
+async def flush_update_recording(context: ContextTypes.DEFAULT_TYPE) -> None:
+    update_recorder.flush()
+
+
+def close_update_recording(application: Application) -> None:
+    """Итоговые состояния диалогов и статусы регистраций записанных пользователей — для сверки при воспроизведении"""
+    states = {user_id: STATE_NAMES.get(state, state) for user_id, state in sessions.states().items()}
+    statuses = {}
+    for user_id in update_recorder.user_ids():
+        registration = db.get_registration(user_id)
+        statuses[user_id] = registration['status'] if registration else None
+    update_recorder.close(states, statuses)
+
+
+async def track_session_activity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обновление времени последней активности для пользователей с активной регистрацией"""
+    user = update.effective_user
+    if user and user.id in sessions:
+        sessions.touch(user.id, update.effective_chat.id if update.effective_chat else user.id)
+
+
+def track_conversation_states(conversation: ConversationHandler) -> None:
+    """Запись состояния диалога в реестр сессий по значению, которое вернул обработчик
+
+    Шаги диалога вытесненной сессии не выполняются: ее данные уже удалены,
+    и вместо шага диалог завершается (session_expired).
+    """
+    def track(handler, check_expired: bool) -> None:
+        callback = handler.callback
+
+        @functools.wraps(callback)
+        async def tracked(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            user = update.effective_user
+            if check_expired and user and sessions.is_expired(user.id):
+                state = await session_expired(update, context)
+            else:
+                state = await callback(update, context)
+            if user and state is not None:
+                if state == ConversationHandler.END:
+                    sessions.end(user.id)
+                else:
+                    sessions.set_state(user.id, update.effective_chat.id, state)
+            return state
+
+        handler.callback = tracked
+
+    for state, handlers in conversation.states.items():
+        # Таймаут PTB завершает диалог сам, registration_timeout закрывает сессию
+        if state != ConversationHandler.TIMEOUT:
+            for handler in handlers:
+                track(handler, check_expired=True)
+    for handler in conversation.entry_points + conversation.fallbacks:
+        track(handler, check_expired=False)
+
+
+async def session_expired(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Первое сообщение после вытеснения брошенной сессии: завершение старого диалога"""
+    user = update.effective_user
+    message = update.effective_message
+    if message.text and message.text.startswith('/start'):
+        # Пользователь сам начинает заново — сразу новый диалог
+        return await start(update, context)
+
+    log_info("Сообщение в вытесненной сессии регистрации, диалог завершен", user)
+    await message.reply_text(
+        "⏰ Время заполнения анкеты истекло, введённые данные удалены.\n\n"
+        "Используйте /start, чтобы начать регистрацию заново.",
+        reply_markup=ReplyKeyboardRemove()
+    )
+    return ConversationHandler.END
+
+
+async def evict_stale_sessions(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Периодическое вытеснение брошенных сессий регистрации
+
+    Таймауты ConversationHandler после перезапуска не восстанавливаются, поэтому
+    восстановленные сессии закрываются здесь.
+    """
+    stale = sessions.stale()
+    if not stale:
+        return
+
+    for user_id, chat_id in stale:
+        context.application.drop_user_data(user_id)
+        sessions.expire(user_id)
+
+    log_info(f"Вытеснено брошенных сессий регистрации: {len(stale)}")
+
+
+async def restore_sessions(application: Application) -> None:
+    """Восстановление реестра сессий из сохраненных состояний диалогов"""
+    if application.persistence is None:
+        return
+    conversations = await application.persistence.get_conversations(REGISTRATION_CONVERSATION)
+    for (chat_id, user_id), state in conversations.items():
+        sessions.set_state(user_id, chat_id, state)
+
+    if len(sessions):
+        log_info(f"Восстановлено незавершенных регистраций: {len(sessions)}")
+
+
+async def load_participant_indexes() -> None:
+    """Загрузка индексов участников в памяти в фоне, параллельно с первыми обновлениями
+
+    На большой БД это самые долгие запросы запуска. Пока индексы не загружены,
+    проверка регистрации идет через БД, а билеты не принимаются.
+    """
+    try:
+        user_ids = await asyncio.to_thread(db.get_registered_user_ids)
+        registered_users.load(user_ids)
+        log_info(f"Загружено зарегистрированных пользователей: {len(registered_users)}")
+
+        roster, checkins = await asyncio.to_thread(lambda: (db.get_confirmed_names(), db.get_checkins()))
+        checkin_desk.load(roster, checkins)
+    except Exception as e:
+        log_error(f"Ошибка загрузки списков участников: {e}")
+
+
+async def prepare_participants(bot) -> None:
+    """Перевод из листа ожидания на свободные места (VENUE_CAPACITY могли увеличить), затем загрузка индексов"""
+    promoted = await asyncio.to_thread(db.promote_waitlist, VENUE_CAPACITY)
+    await load_participant_indexes()
+    if promoted:
+        log_info(f"При запуске переведено из листа ожидания: {len(promoted)}")
+        await notify_promoted(bot, promoted)
+
+
+async def on_startup(application: Application) -> None:
+    """Действия после инициализации приложения: восстановление сессий и фоновые задачи"""
+    await restore_sessions(application)
+
+    # Не задерживает начало опроса Bot API: бот отвечает, пока списки загружаются
+    application.create_task(prepare_participants(application.bot))
+
+    job_queue = application.job_queue
+    job_queue.run_repeating(evict_stale_sessions, interval=SESSION_SWEEP_INTERVAL, first=SESSION_SWEEP_INTERVAL)
+    job_queue.run_repeating(admit_waiting_users, interval=WAITING_ROOM_TICK_SECONDS, first=WAITING_ROOM_TICK_SECONDS)
+    job_queue.run_repeating(update_waiting_positions, interval=WAITING_ROOM_UPDATE_INTERVAL, first=WAITING_ROOM_UPDATE_INTERVAL)
+    job_queue.run_repeating(flush_checkins, interval=CHECKIN_FLUSH_INTERVAL, first=CHECKIN_FLUSH_INTERVAL)
+    if update_recorder:
+        job_queue.run_repeating(flush_update_recording, interval=UPDATE_RECORDING_FLUSH_INTERVAL,
+                                first=UPDATE_RECORDING_FLUSH_INTERVAL)
+        log_warning(f"Включена запись обновлений в {update_recorder.path}")
+    if SHARD_INDEX is not None:
+        job_queue.run_repeating(publish_shard_status, interval=SHARD_STATUS_INTERVAL, first=0)
+
+    if webapp_server:
+        await webapp_server.start()
+
+    if metrics_server:
+        # Занятый порт (второй экземпляр бота, другой экспортер) не должен мешать запуску бота
+        try:
+            await metrics_server.start()
+        except OSError as e:
+            log_error(f"Сервер метрик не запущен ({METRICS_HOST}:{METRICS_PORT}): {e}")
+
+    loop_watchdog.start()
+
+    if mailer:
+        mailer.start()
+
+    # Продолжение рассылок, прерванных остановкой бота, с сохраненного курсора
+    # (при нескольких процессах-обработчиках — только в первом, иначе сообщения уйдут дважды)
+    if SHARD_INDEX:
+        return
+    for campaign in db.get_running_campaigns():
+        log_info(f"Продолжение рассылки #{campaign['id']} после перезапуска")
+        broadcast_runner.start(application.bot, campaign['id'], on_finish=broadcast_reporter(application.bot))
+
+
+async def restart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Перезапуск регистрации"""
+    user = update.effective_user
+    log_info("Команда /restart - перезапуск регистрации", user)
+    context.user_data.clear()
+    # Устанавливаем флаг, что это перезапуск (start сообщит о нем в приветствии)
+    context.user_data['force_restart'] = True
+    return await start(update, context)
+
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Помощь"""
+    help_text = (
+        "🤖 КОМАНДЫ БОТА:\n\n"
+        "/start - Начать регистрацию\n"
+        "/restart - Перезапустить регистрацию\n"
+        "/cancel - Отменить текущую регистрацию\n"
+        "/help - Показать эту справку\n"
+        "/unregister - Отменить регистрацию на форум\n"
+        "/ticket - Показать билет на форум\n"
+        "/whoami - Показать информацию о вашем аккаунте\n\n"
+        f"По вопросам обращайтесь к организаторам форума {EVENT_TITLE}."
+    )
+    await update.message.reply_text(help_text)
+
+
+async def whoami_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показать информацию о пользователе для диагностики"""
+    user = update.effective_user
+
+    log_info("Команда /whoami", user)
+
+    username_text = f"@{user.username}" if user.username else "❌ НЕТ USERNAME"
+    is_admin_status = "✅ ДА" if is_admin(user) else "❌ НЕТ"
+    is_registered_admin = "✅ ДА" if db.is_admin_registered(user.id) else "❌ НЕТ"
+
+    info_text = (
+        f"👤 ИНФОРМАЦИЯ О ВАШЕМ АККАУНТЕ\n\n"
         f"Имя: {user.first_name}\n"
         f"Фамилия: {user.last_name or 'не указана'}\n"
         f"Username: {username_text}\n"
@@ -904,29 +1557,642 @@ async def whoami_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         f"Chat ID сохранён: {is_registered_admin}\n\n"
     )
 
-    if not user.username:
+    if is_admin(user):
+        info_text += "✅ У вас есть доступ к админ-панели. Используйте /admin"
+    elif not user.username:
         info_text += (
             "⚠️ У вас нет username в Telegram!\n\n"
             "Чтобы получить доступ к админ-панели:\n"
-            "1. Откройте Настройки → Редактировать профиль\n"
-            "2. Установите имя пользователя (Username)\n"
-            "3. Убедитесь что ваш username добавлен в список админов\n"
-            "4. Напишите боту /start снова\n"
+            f"1. Попросите администратора выполнить /add_admin {user.id}\n"
+            "2. Или установите имя пользователя (Настройки → Редактировать профиль) "
+            "и попросите добавить ваш username\n"
+            "3. Напишите боту /start снова\n"
         )
-    elif not is_admin(user):
+    else:
         info_text += (
             f"ℹ️ Вы не являетесь администратором.\n\n"
-            f"Если вы должны быть администратором, проверьте:\n"
-            f"1. Ваш username (@{user.username}) должен быть в списке админов\n"
-            f"2. Проверьте правильность написания username\n"
-            f"3. Обратитесь к разработчику бота\n"
+            f"Если вы должны быть администратором:\n"
+            f"1. Попросите администратора выполнить /add_admin {user.id} или /add_admin @{user.username}\n"
+            f"2. Напишите боту /start снова\n"
+        )
+
+    await update.message.reply_text(info_text)
+
+
+async def publish_shard_status(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Счетчики процесса-обработчика в общую базу для сводок по всем процессам
+
+    Заодно перечитывается список администраторов: его могли изменить в другом процессе.
+    """
+    await asyncio.to_thread(db.save_shard_status, SHARD_INDEX, metrics.collect())
+    admin_registry.reload()
+
+
+def shard_summary() -> str:
+    """Сводка счетчиков всех процессов-обработчиков (пусто, если бот работает одним процессом)"""
+    if SHARD_INDEX is None:
+        return ""
+    statuses = db.get_shard_statuses()
+
+    def total(name: str):
+        result = 0
+        for status in statuses:
+            value = status['data'].get(name, 0)
+            result += sum(value.values()) if isinstance(value, dict) else value
+        return result
+
+    age = max(
+        ((datetime.now() - datetime.fromisoformat(status['updated_datetime'])).total_seconds() for status in statuses),
+        default=0
+    )
+    return (
+        f"\n\n🧩 ВСЕ ПРОЦЕССЫ ({len(statuses)} из {SHARD_COUNT}, данные не старше {age:.0f} с):\n"
+        f"Активных сессий: {total('bot_active_sessions')}\n"
+        f"Завершено регистраций: {total('bot_registrations_completed_total')}\n"
+        f"Вызовов Bot API: {total('bot_api_calls_total')}, ошибок {total('bot_api_errors_total')}\n"
+        f"В очередях: {total('bot_queue_depth')}\n"
+        f"Зависаний цикла событий: {total('bot_event_loop_stalls_total')}"
+    )
+
+
+async def sessions_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Статистика активных сессий регистрации (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    log_admin("Команда /sessions - статистика сессий регистрации", user)
+
+    user_data = context.application.user_data
+    sizes = [approximate_size(user_data.get(user_id, {})) for user_id in sessions.user_ids()]
+    average_size = sum(sizes) / len(sizes) if sizes else 0
+
+    await update.message.reply_text(
+        f"🧮 СЕССИИ РЕГИСТРАЦИИ\n\n"
+        f"Активных сессий: {len(sessions)}\n"
+        f"Хранится user_data: {len(user_data)}\n"
+        f"Память на сессию: ~{average_size / 1024:.1f} КБ\n"
+        f"Всего в памяти: ~{sum(sizes) / 1024:.1f} КБ\n\n"
+        f"Завершено по таймауту: {sessions.timed_out_total}\n"
+        f"Вытеснено при очистке: {sessions.evicted_total}\n"
+        f"Таймаут бездействия: {SESSION_TIMEOUT_SECONDS // 60} мин"
+        f"{shard_summary()}"
+    )
+
+
+def campaign_text(campaign: Dict) -> str:
+    """Краткая сводка рассылки"""
+    processed = campaign['delivered'] + campaign['blocked'] + campaign['failed']
+    return (
+        f"📣 Рассылка #{campaign['id']} — {STATUS_TITLES.get(campaign['status'], campaign['status'])}\n"
+        f"Аудитория: {AUDIENCE_TITLES.get(campaign['audience'], campaign['audience'])}\n"
+        f"Обработано: {processed} из {campaign['total']}\n"
+        f"✅ Доставлено: {campaign['delivered']}\n"
+        f"🚫 Заблокировали бота: {campaign['blocked']}\n"
+        f"⚠️ Ошибки: {campaign['failed']}"
+    )
+
+
+def broadcast_reporter(bot):
+    """Отчет автору рассылки после ее завершения, отмены или остановки из-за ошибки"""
+    async def report(campaign: Dict) -> None:
+        log_info(f"Рассылка #{campaign['id']}: {campaign['status']}, доставлено {campaign['delivered']}")
+        if not campaign['created_by']:
+            return
+        try:
+            text = campaign_text(campaign)
+            if campaign['status'] == 'paused':
+                text += f"\n\nПродолжить с сохраненной позиции: /broadcast_resume {campaign['id']}"
+            await bot.send_message(chat_id=campaign['created_by'], text=text)
+        except Exception as e:
+            log_error(f"Ошибка при отправке отчета о рассылке #{campaign['id']}: {e}")
+    return report
+
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Создание рассылки: /broadcast [аудитория] текст (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    parts = update.message.text.split(maxsplit=1)
+    body = parts[1] if len(parts) > 1 else ""
+    audience = 'all'
+    first_word = body.split(maxsplit=1)
+    if first_word and first_word[0] in AUDIENCE_TITLES:
+        audience = first_word[0]
+        body = first_word[1] if len(first_word) > 1 else ""
+
+    if not body.strip():
+        audiences = "\n".join(f"  {key} — {title}" for key, title in AUDIENCE_TITLES.items())
+        await update.message.reply_text(
+            "📣 Использование: /broadcast [аудитория] текст сообщения\n\n"
+            f"Аудитории (по умолчанию all):\n{audiences}\n\n"
+            "Пример: /broadcast internship Завтра в 10:00 встреча с работодателями в ауд. 101"
+        )
+        return
+
+    campaign_id = db.create_campaign(body.strip(), audience, user.id)
+    if campaign_id is None:
+        await update.message.reply_text("⚠️ Не удалось создать рассылку")
+        return
+
+    campaign = db.get_campaign(campaign_id)
+    log_admin(f"Создан черновик рассылки #{campaign_id} ({audience}, получателей: {campaign['total']})", user)
+
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton(f"📤 Отправить ({campaign['total']})", callback_data=f"broadcast_start_{campaign_id}")],
+        [InlineKeyboardButton("❌ Отменить", callback_data=f"broadcast_cancel_{campaign_id}")]
+    ])
+    await update.message.reply_text(
+        f"📣 ЧЕРНОВИК РАССЫЛКИ #{campaign_id}\n"
+        f"Аудитория: {AUDIENCE_TITLES[audience]}\n"
+        f"Получателей: {campaign['total']}\n\n"
+        f"{campaign['text']}",
+        reply_markup=keyboard
+    )
+
+
+async def broadcast_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Подтверждение или отмена черновика рассылки"""
+    query = update.callback_query
+    user = update.effective_user
+
+    if not is_admin(user):
+        await query.answer("❌ У вас нет прав администратора", show_alert=True)
+        return
+
+    _, action, campaign_id = query.data.split("_")
+    campaign = db.get_campaign(int(campaign_id))
+    if not campaign or campaign['status'] != 'draft':
+        await query.answer("Рассылка уже запущена или отменена", show_alert=True)
+        return
+
+    await query.answer()
+    if action == "start":
+        log_admin(f"Запуск рассылки #{campaign['id']}", user)
+        broadcast_runner.start(context.bot, campaign['id'], on_finish=broadcast_reporter(context.bot))
+        await query.edit_message_text(
+            f"📤 Рассылка #{campaign['id']} запущена: {campaign['total']} получателей.\n"
+            f"Ход отправки: /broadcasts, остановка: /broadcast_stop {campaign['id']}"
         )
     else:
-        info_text += "✅ У вас есть доступ к админ-панели. Используйте /admin"
+        db.set_campaign_status(campaign['id'], 'cancelled')
+        await query.edit_message_text(f"Рассылка #{campaign['id']} отменена.")
+
+
+async def broadcasts_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Последние рассылки и их счетчики (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    log_admin("Команда /broadcasts - список рассылок", user)
+
+    campaigns = db.get_campaigns()
+    if not campaigns:
+        await update.message.reply_text("📣 Рассылок пока не было. Создать: /broadcast")
+        return
+
+    await update.message.reply_text("\n\n".join(campaign_text(campaign) for campaign in campaigns))
+
+
+async def broadcast_stop_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Остановка рассылки: /broadcast_stop id (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("Использование: /broadcast_stop id_рассылки")
+        return
+
+    campaign_id = int(context.args[0])
+    requested = broadcast_runner.stop(campaign_id)
+    if requested:
+        log_admin(f"Остановка рассылки #{campaign_id}", user)
+        await update.message.reply_text(f"⛔ Рассылка #{campaign_id} будет остановлена после текущей порции.")
+    elif requested is None:
+        await update.message.reply_text("⚠️ Не удалось остановить рассылку")
+    else:
+        await update.message.reply_text(f"Рассылка #{campaign_id} сейчас не отправляется.")
+
+
+async def broadcast_resume_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Продолжение рассылки, приостановленной из-за ошибки: /broadcast_resume id (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("Использование: /broadcast_resume id_рассылки")
+        return
+
+    campaign = db.get_campaign(int(context.args[0]))
+    if not campaign or campaign['status'] != 'paused':
+        await update.message.reply_text(f"Рассылка #{context.args[0]} не приостановлена.")
+        return
+
+    log_admin(f"Продолжение рассылки #{campaign['id']}", user)
+    broadcast_runner.start(context.bot, campaign['id'], on_finish=broadcast_reporter(context.bot))
+    await update.message.reply_text(
+        f"📤 Рассылка #{campaign['id']} продолжена с сохраненной позиции.\n"
+        f"Ход отправки: /broadcasts, остановка: /broadcast_stop {campaign['id']}"
+    )
+
+
+async def ticket_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Билет участника: QR-код (если доступен) и текстовый код"""
+    user = update.effective_user
+    log_info("Команда /ticket", user)
+
+    registration = db.get_registration(user.id) if registered_users.might_be_registered(user.id) else None
+    if not registration:
+        await update.message.reply_text("Вы не зарегистрированы на форум. Для регистрации используйте /start")
+        return
+    if registration['status'] != 'confirmed':
+        await update.message.reply_text(
+            "📝 Вы в листе ожидания. Билет появится, как только освободится место — бот пришлёт сообщение."
+        )
+        return
+
+    ticket = ticket_signer.issue(user.id)
+    caption = f"🎟 Билет на форум {EVENT_TITLE}\n{registration['full_name']}\n\nКод: {ticket}"
+    qr = render_qr(ticket)
+    if qr:
+        await update.message.reply_photo(photo=qr, caption=caption)
+    else:
+        await update.message.reply_text(caption)
+
+
+def checkin_result_text(result: str, user_id: Optional[int], moment: Optional[str]) -> str:
+    """Ответ сканеру: кто проходит и можно ли его пропустить"""
+    if result == SCAN_OK:
+        return f"✅ ПРОХОД РАЗРЕШЁН\n{checkin_desk.roster[user_id]}"
+    if result == SCAN_DUPLICATE:
+        return (
+            f"⚠️ ПОВТОРНЫЙ ПРОХОД\n{checkin_desk.roster[user_id]}\n"
+            f"Уже отмечен в {datetime.fromisoformat(moment).strftime('%H:%M:%S')}"
+        )
+    if result == SCAN_REVOKED:
+        return "⛔ Билет не действует: регистрация отменена или участник в листе ожидания"
+    if result == SCAN_NOT_READY:
+        return "⏳ Список участников загружается после перезапуска бота. Повторите через несколько секунд"
+    return "❌ Недействительный код билета"
+
+
+async def checkin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отметка прохода: /checkin КОД или переключение режима сканирования (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    if context.args:
+        result, user_id, moment = checkin_desk.scan(context.args[0], scanned_by=user.id)
+        await update.message.reply_text(checkin_result_text(result, user_id, moment))
+        return
+
+    if user.id in checkin_mode:
+        checkin_mode.discard(user.id)
+        log_admin("Режим сканирования билетов выключен", user)
+        state = "⏹ Режим сканирования выключен."
+    else:
+        checkin_mode.add(user.id)
+        log_admin("Режим сканирования билетов включен", user)
+        state = "▶️ Режим сканирования включен: отправляйте коды билетов сообщениями. Выключить — /checkin"
+
+    await update.message.reply_text(
+        f"{state}\n\n"
+        f"Прошли: {len(checkin_desk.checked_in)} из {len(checkin_desk.roster)}\n"
+        f"Сканирований: {checkin_desk.scans_total}, повторных: {checkin_desk.duplicates_total}, "
+        f"недействительных: {checkin_desk.invalid_total}"
+    )
+
+
+async def checkin_scan(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Код билета, присланный в режиме сканирования"""
+    user = update.effective_user
+    if not user or user.id not in checkin_mode:
+        return
+
+    result, user_id, moment = checkin_desk.scan(update.message.text, scanned_by=user.id)
+    await update.message.reply_text(checkin_result_text(result, user_id, moment))
+
+
+async def flush_checkins(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Запись накопленных отметок прохода в БД одной порцией"""
+    rows = checkin_desk.take_pending()
+    if rows and not db.save_checkins(rows):
+        checkin_desk.restore_pending(rows)
+
+
+async def apicalls_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Статистика вызовов Bot API (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    log_admin("Команда /apicalls - статистика вызовов Bot API", user)
+
+    text = "📡 ВЫЗОВЫ BOT API\n\n"
+
+    per_registration = api_calls.per_registration()
+    if per_registration:
+        text += (
+            f"На одну регистрацию (последние {per_registration['count']}):\n"
+            f"  в среднем: {per_registration['average']:.1f}\n"
+            f"  медиана: {per_registration['median']}\n"
+            f"  максимум: {per_registration['max']}\n"
+            f"Всего завершено регистраций: {api_calls.completed_total}\n\n"
+        )
+    else:
+        text += "Завершенных регистраций пока нет\n\n"
+
+    text += "По методам:\n"
+    for method, count in api_calls.calls_by_method.most_common(10):
+        text += f"  {method}: {count}\n"
+
+    await update.message.reply_text(text)
+
+
+def milliseconds(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:.1f}" if seconds is not None else "—"
+
+
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Сводка метрик бота (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    log_admin("Команда /metrics - сводка метрик", user)
+
+    text = "📈 МЕТРИКИ\n\nШаги регистрации (p50 / p95 мс, обновлений):\n"
+    if handler_seconds.children:
+        for state, histogram in sorted(handler_seconds.children.items()):
+            text += (f"  {state}: {milliseconds(histogram.quantile(0.5))} / "
+                     f"{milliseconds(histogram.quantile(0.95))} ({histogram.count})\n")
+    else:
+        text += "  данных пока нет\n"
+
+    text += "\nБаза данных (всего мс, в среднем мс, вызовов):\n"
+    slowest = sorted(db_seconds.children.items(), key=lambda item: item[1].total, reverse=True)[:8]
+    for method, histogram in slowest:
+        text += f"  {method}: {histogram.total * 1000:.0f}, {milliseconds(histogram.total / histogram.count)}, {histogram.count}\n"
+
+    text += (f"\nBot API: вызовов {sum(api_calls.calls_by_method.values())}, "
+             f"ошибок {sum(api_calls.errors_by_method.values())}\n")
+    for method, count in api_calls.calls_by_method.most_common(5):
+        text += f"  {method}: {count} (ошибок {api_calls.errors_by_method[method]})\n"
+
+    queues = ", ".join(f"{name} {size}" for name, size in outbound_queues().items())
+    text += (f"\nОчереди: {queues}\n"
+             f"Идущих рассылок: {broadcast_runner.running_count()}\n"
+             f"Активных сессий: {len(sessions)}")
+    text += shard_summary()
+    if metrics_server:
+        text += f"\n\nPrometheus: http://{METRICS_HOST}:{METRICS_PORT}/metrics"
+
+    await update.message.reply_text(text)
+
+
+async def perf_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Самые медленные обработчики и горячие стеки за последние N минут (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    minutes = PERF_WINDOW_MINUTES
+    if context.args:
+        try:
+            minutes = min(max(float(context.args[0]), 1), PERF_WINDOW_MINUTES)
+        except ValueError:
+            await update.message.reply_text(f"Использование: /perf [минут, до {PERF_WINDOW_MINUTES}]")
+            return
+
+    log_admin(f"Команда /perf - профиль обработчиков за {minutes:g} мин", user)
+
+    text = f"🐢 МЕДЛЕННЫЕ ОБРАБОТЧИКИ (за {minutes:g} мин)\n\n"
+    slow = perf_recorder.slow_handlers(minutes)
+    if not slow:
+        text += "Замеров пока нет\n"
+    for item in slow:
+        python_share = max(0.0, 1 - item['db_share'] - item['api_share'])
+        text += (
+            f"{item['name']}: p50 {milliseconds(item['p50'])} / p95 {milliseconds(item['p95'])} / "
+            f"макс {milliseconds(item['max'])} мс ({item['count']})\n"
+            f"  БД {item['db_share']:.0%}, Bot API {item['api_share']:.0%}, Python {python_share:.0%}\n"
+        )
+
+    stacks = perf_recorder.hot_stacks(minutes)
+    if stacks:
+        text += "\n🔥 Горячие стеки (cProfile):\n"
+        for item in stacks:
+            text += f"{item['handler']} — {milliseconds(item['seconds'])} мс в {item['samples']} профилях\n  {item['stack']}\n"
+    elif PERF_PROFILE_SAMPLE_RATE:
+        text += f"\nПрофилей пока нет (профилируется {PERF_PROFILE_SAMPLE_RATE:.0%} обновлений)"
+    else:
+        text += "\nПрофилирование отключено (PERF_PROFILE_SAMPLE_RATE = 0)"
+
+    await update.message.reply_text(text[:4096])
+
+
+async def stalls_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Зависания цикла событий за последние N минут: где и в каком состоянии блокирует синхронный код (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    minutes = PERF_WINDOW_MINUTES
+    if context.args:
+        try:
+            minutes = max(float(context.args[0]), 1)
+        except ValueError:
+            await update.message.reply_text("Использование: /stalls [минут]")
+            return
+
+    log_admin(f"Команда /stalls - зависания цикла событий за {minutes:g} мин", user)
+
+    text = (
+        f"🧊 ЗАВИСАНИЯ ЦИКЛА СОБЫТИЙ (за {minutes:g} мин, порог {milliseconds(loop_watchdog.threshold)} мс)\n"
+        f"Всего с запуска: {loop_watchdog.stalls_total}, наибольшая задержка {milliseconds(loop_watchdog.max_lag)} мс\n\n"
+    )
+    summary = loop_watchdog.summary(minutes)
+    if not summary:
+        text += "Зависаний не было\n"
+    for item in summary:
+        state = f" [{item['state']}]" if item['state'] is not None else ""
+        text += (
+            f"{item['handler']}{state}: {item['count']} раз, всего {milliseconds(item['total'])} мс, "
+            f"макс {milliseconds(item['max'])} мс\n"
+        )
+        if item['stack']:
+            text += f"  {item['stack']}\n"
+
+    latest = loop_watchdog.latest(minutes)
+    if latest:
+        text += "\nПоследние:\n"
+        for item in latest:
+            state = f" [{item['state']}]" if item['state'] is not None else ""
+            text += f"{item['ago'] / 60:.0f} мин назад — {milliseconds(item['lag'])} мс, {item['handler']}{state}\n"
+
+    await update.message.reply_text(text[:4096])
+
+
+async def waitroom_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Управление очередью на регистрацию (только для админов)
+
+    /waitroom — состояние, /waitroom on|off — включить/выключить,
+    /waitroom <число> — изменить лимит одновременных регистраций.
+    """
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    if context.args:
+        argument = context.args[0].lower()
+        if argument in ("on", "off"):
+            waiting_room.enabled = argument == "on"
+        elif argument.isdigit() and int(argument) > 0:
+            waiting_room.max_active = int(argument)
+        else:
+            await update.message.reply_text("Использование: /waitroom [on|off|<лимит>]")
+            return
+        log_admin(f"Очередь на регистрацию: enabled={waiting_room.enabled}, лимит={waiting_room.max_active}", user)
+
+    status = "✅ включена" if waiting_room.enabled else "❌ выключена"
+    await update.message.reply_text(
+        f"⏳ ОЧЕРЕДЬ НА РЕГИСТРАЦИЮ\n\n"
+        f"Статус: {status}\n"
+        f"Лимит одновременных регистраций: {waiting_room.max_active}\n"
+        f"Активных регистраций: {len(sessions)}\n"
+        f"Ожидают в очереди: {len(waiting_room)}\n"
+        f"Приглашены, ещё не начали: {waiting_room.invited_count()}\n\n"
+        f"Впущено всего: {waiting_room.admitted_total}\n"
+        f"Приглашений истекло: {waiting_room.expired_total}"
+    )
+
+
+async def flood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Статистика защиты от флуда (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    log_admin("Команда /flood - статистика защиты от флуда", user)
+
+    info_text = (
+        f"🛡 ЗАЩИТА ОТ ФЛУДА\n\n"
+        f"Пропущено обновлений: {sum(flood_guard.allowed.values())}\n"
+        f"Отброшено обновлений: {sum(flood_guard.dropped.values())}\n"
+        f"Отслеживается корзин: {flood_guard.tracked_buckets()}\n"
+    )
+
+    if flood_guard.dropped:
+        info_text += "\n🚫 Отброшено по типам:\n"
+        for key, count in flood_guard.dropped.most_common():
+            info_text += f"  • {key}: {count}\n"
+
+    offenders = flood_guard.top_offenders()
+    if offenders:
+        info_text += "\n👤 Чаще всего ограничены:\n"
+        for offender_id, count in offenders:
+            info_text += f"  • {offender_id}: {count}\n"
 
     await update.message.reply_text(info_text)
 
 
+def parse_admin_target(argument: str):
+    """Разбор аргумента команд управления админами: user_id или @username"""
+    if argument.lstrip('-').isdigit():
+        return int(argument), None
+    username = argument.lstrip('@')
+    if re.match(r'^[A-Za-z0-9_]{4,32}$', username):
+        return None, username
+    return None, None
+
+
+async def add_admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Выдача роли администратора: /add_admin <user_id | @username> (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    target_id, target_username = parse_admin_target(context.args[0]) if context.args else (None, None)
+    if target_id is None and target_username is None:
+        await update.message.reply_text("Использование: /add_admin <user_id> или /add_admin @username")
+        return
+
+    if target_id is not None:
+        success = admin_registry.grant(target_id, '', added_by=user.id)
+        target_display = str(target_id)
+    else:
+        success = admin_registry.invite(target_username, added_by=user.id)
+        target_display = f"@{target_username}"
+
+    if success:
+        log_admin(f"Выдана роль администратора: {target_display}", user)
+        await update.message.reply_text(
+            f"✅ {target_display} теперь администратор.\n"
+            f"Чтобы получать уведомления, новому администратору нужно написать боту /admin"
+        )
+    else:
+        await update.message.reply_text("⚠️ Не удалось сохранить роль администратора")
+
+
+async def remove_admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Снятие роли администратора: /remove_admin <user_id | @username> (только для админов)"""
+    user = update.effective_user
+
+    if not is_admin(user):
+        await update.message.reply_text("❌ Эта команда доступна только администраторам")
+        return
+
+    target_id, target_username = parse_admin_target(context.args[0]) if context.args else (None, None)
+    if target_id is None and target_username is None:
+        await update.message.reply_text("Использование: /remove_admin <user_id> или /remove_admin @username")
+        return
+
+    if target_id == user.id or (target_username and user.username and target_username.lower() == user.username.lower()):
+        await update.message.reply_text("⚠️ Нельзя снять роль администратора с самого себя")
+        return
+
+    removed = admin_registry.revoke(user_id=target_id, username=target_username)
+    target_display = str(target_id) if target_id is not None else f"@{target_username}"
+
+    if removed:
+        log_admin(f"Снята роль администратора: {target_display}", user)
+        await update.message.reply_text(f"✅ {target_display} больше не администратор")
+    else:
+        await update.message.reply_text(f"ℹ️ {target_display} не найден среди администраторов")
+
+
 async def check_admins_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Проверка списка сохраненных администраторов (только для админов)"""
     user = update.effective_user
@@ -942,11 +2208,15 @@ async def check_admins_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
     info_text = (
         f"👑 ПРОВЕРКА АДМИНИСТРАТОРОВ\n\n"
-        f"📋 Список админов в config.py:\n"
+        f"📋 Администраторы:\n"
     )
 
-    for admin_username in ADMIN_USERNAMES:
-        info_text += f"  • @{admin_username}\n"
+    for role in db.get_admin_roles():
+        username_display = f"@{role['username']}" if role['username'] else "без username"
+        info_text += f"  • {username_display} ({role['user_id']})\n"
+
+    for username in db.get_admin_invites():
+        info_text += f"  • @{username} (приглашен, еще не писал боту)\n"
 
     info_text += f"\n💾 Сохраненных chat_id в базе: {len(admin_chats)}\n\n"
 
@@ -962,23 +2232,68 @@ async def check_admins_command(update: Update, context: ContextTypes.DEFAULT_TYP
     log_info(f"Проверка завершена. Сохранено {len(admin_chats)} chat_id", user)
 
 
-def main():
-    """Запуск бота"""
-    # Получаем токен из .env файла
-    token = os.getenv('BOT_TOKEN')
+async def on_shutdown(application: Application) -> None:
+    """Завершение фоновой работы перед остановкой бота: форма, метрики, рассылки, почта и сводки уведомлений"""
+    if webapp_server:
+        await webapp_server.stop()
 
-    if not token:
-        print("Ошибка: BOT_TOKEN не найден в .env файле")
-        return
+    if metrics_server:
+        await metrics_server.stop()
+
+    await loop_watchdog.stop()
+
+    await broadcast_runner.shutdown()
+
+    if mailer:
+        await mailer.stop()
+
+    rows = checkin_desk.take_pending()
+    if rows:
+        db.save_checkins(rows)
+
+    if notification_digest.pending_count():
+        log_info(f"Отправка {notification_digest.pending_count()} накопленных уведомлений перед остановкой")
+    # flush дожидается и сводок, отправка которых уже началась
+    await notification_digest.flush()
+
+    if update_recorder:
+        close_update_recording(application)
+
+
+def build_application(token: str, base_url: Optional[str] = None, request=None, get_updates_request=None) -> Application:
+    """Сборка приложения со всеми обработчиками (base_url — другой сервер Bot API, например заглушка)
+
+    request и get_updates_request заменяют собственный пул соединений бота
+    (например, общим пулом процесса с несколькими мероприятиями).
+    """
+    # Состояния диалогов и user_data хранятся в той же SQLite базе
+    persistence = SQLitePersistence(PERSISTENCE_PATH or db.db_path, update_interval=PERSISTENCE_UPDATE_INTERVAL)
 
     # Создаём приложение
-    application = Application.builder().token(token).build()
+    builder = (
+        Application.builder()
+        .token(token)
+        .request(request or CountingRequest(api_calls, charge=charge_api, connection_pool_size=256))
+        .persistence(persistence)
+        .post_init(on_startup)
+        .post_stop(on_shutdown)
+    )
+    if get_updates_request:
+        builder = builder.get_updates_request(get_updates_request)
+    if base_url:
+        builder = builder.base_url(base_url)
+        log_warning(f"Bot API: используется {base_url}")
+    application = builder.build()
 
     # Настраиваем ConversationHandler для регистрации
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler('start', start)],
+        entry_points=[
+            CommandHandler('start', start),
+            CallbackQueryHandler(waiting_room_enter, pattern="^waitroom_enter$"),
+            MessageHandler(filters.StatusUpdate.WEB_APP_DATA, web_app_submit)
+        ],
         states={
-            CONSENT: [CallbackQueryHandler(consent_callback, pattern="^consent_")],
+            CONSENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, consent)],
             FULL_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, full_name)],
             BIRTH_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, birth_date)],
             EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, email)],
@@ -986,27 +2301,83 @@ def main():
             UNIVERSITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, university)],
             UNIVERSITY_CUSTOM: [MessageHandler(filters.TEXT & ~filters.COMMAND, university_custom)],
             COURSE: [MessageHandler(filters.TEXT & ~filters.COMMAND, course)],
-            INTERNSHIP_INTEREST: [CallbackQueryHandler(internship_interest, pattern="^internship_")],
-            CONFIRMATION: [CallbackQueryHandler(confirmation, pattern="^confirm_")],
+            INTERNSHIP_INTEREST: [MessageHandler(filters.TEXT & ~filters.COMMAND, internship_interest)],
+            CONFIRMATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, confirmation)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, registration_timeout)],
         },
         fallbacks=[
+            # Форма Web App принимается на любом шаге пошагового диалога
+            MessageHandler(filters.StatusUpdate.WEB_APP_DATA, web_app_submit),
             CommandHandler('cancel', cancel),
-            CommandHandler('restart', restart)
+            CommandHandler('restart', restart),
+            CallbackQueryHandler(stale_button, pattern="^(consent|internship|confirm)_"),
+            # Любое другое сообщение (например, /start) в вытесненной сессии завершает старый диалог
+            MessageHandler(ExpiredSessionFilter(), session_expired)
         ],
+        name=REGISTRATION_CONVERSATION,
+        persistent=True,
+        conversation_timeout=SESSION_TIMEOUT_SECONDS,
     )
 
+    # Запись обновлений — раньше защиты от флуда, чтобы в записи были и отброшенные
+    if update_recorder:
+        application.add_handler(TypeHandler(Update, record_update), group=-3)
+    # Защита от флуда — самая ранняя группа, до любых обращений к БД
+    application.add_handler(TypeHandler(Update, flood_control), group=-2)
+    # Отметка активности сессий до обработки диалога
+    application.add_handler(TypeHandler(Update, track_session_activity), group=-1)
+    track_conversation_states(conv_handler)
     application.add_handler(conv_handler)
     application.add_handler(CommandHandler('help', help_command))
     application.add_handler(CommandHandler('whoami', whoami_command))
     application.add_handler(CommandHandler('check_admins', check_admins_command))
+    application.add_handler(CommandHandler('add_admin', add_admin_command))
+    application.add_handler(CommandHandler('remove_admin', remove_admin_command))
+    application.add_handler(CommandHandler('sessions', sessions_command))
+    application.add_handler(CommandHandler('flood', flood_command))
+    application.add_handler(CommandHandler('waitroom', waitroom_command))
+    application.add_handler(CommandHandler('apicalls', apicalls_command))
+    application.add_handler(CommandHandler('metrics', metrics_command))
+    application.add_handler(CommandHandler('perf', perf_command))
+    application.add_handler(CommandHandler('stalls', stalls_command))
+    application.add_handler(CommandHandler('broadcast', broadcast_command))
+    application.add_handler(CommandHandler('broadcasts', broadcasts_command))
+    application.add_handler(CommandHandler('broadcast_stop', broadcast_stop_command))
+    application.add_handler(CommandHandler('broadcast_resume', broadcast_resume_command))
+    application.add_handler(CallbackQueryHandler(broadcast_callback, pattern="^broadcast_"))
+    application.add_handler(CommandHandler('ticket', ticket_command))
+    application.add_handler(CommandHandler('checkin', checkin_command))
+    application.add_handler(CommandHandler('unregister', unregister_command))
+    application.add_handler(CallbackQueryHandler(unregister_callback, pattern="^unregister_"))
     application.add_handler(CommandHandler('restart', restart))
     application.add_handler(CommandHandler('admin', admin_command))
 
     # Обработчик для кнопок админ-панели
     application.add_handler(CallbackQueryHandler(admin_callback_handler, pattern="^admin_"))
 
+    # Коды билетов от администраторов в режиме сканирования (после диалога регистрации)
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, checkin_scan))
+
+    # Замер времени всех обработчиков (после регистрации последнего из них)
+    instrument_handlers(application)
+
+    return application
+
+
+def main():
+    """Запуск бота"""
+    # Получаем токен из .env файла
+    token = os.getenv(BOT_TOKEN_ENV)
+
+    if not token:
+        log_error(f"Ошибка: {BOT_TOKEN_ENV} не найден в .env файле")
+        return
+
+    # Другой сервер Bot API (например, локальная заглушка для нагрузочных тестов)
+    application = build_application(token, os.getenv('BOT_API_BASE_URL'))
+
     # Запускаем бота
-    print("🤖 Бот запущен! Ожидание сообщений...")
+    log_success("🤖 Бот запущен! Ожидание сообщений...")
     application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
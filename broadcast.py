@@ -0,0 +1,156 @@
+"""
+Рассылки зарегистрированным участникам с ограничением скорости и продолжением после сбоя
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+AUDIENCE_TITLES = {
+    'all': "все участники",
+    'internship': "заинтересованные в стажировках",
+    'confirmed': "участники с местом на площадке",
+    'waitlist': "лист ожидания",
+}
+
+STATUS_TITLES = {
+    'draft': "📝 черновик",
+    'running': "📤 идет отправка",
+    'done': "✅ завершена",
+    'cancelled': "⛔ отменена",
+    'paused': "⏸ приостановлена из-за ошибки",
+}
+
+
+class RateLimiter:
+    """Равномерная выдача слотов на отправку: не больше rate сообщений в секунду
+
+    pause() сдвигает все следующие слоты — так соблюдается retry_after,
+    полученный от Telegram, для всей рассылки, а не только для одного сообщения.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float) -> None:
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+class BroadcastRunner:
+    """Отправка рассылок порциями получателей с сохранением курсора после каждой порции
+
+    Получатели читаются из registrations по возрастанию user_id начиная с курсора
+    кампании. Внутри порции сообщения отправляются параллельно в темпе RateLimiter;
+    после порции курсор и счетчики сохраняются в БД, поэтому после перезапуска
+    рассылка продолжается с первой необработанной порции.
+    limiter — общий RateLimiter, если темп отправки делят несколько ботов процесса.
+    """
+
+    def __init__(self, db: Database, rate: float, batch_size: int, max_attempts: int = 3,
+                 limiter: Optional[RateLimiter] = None):
+        self.db = db
+        self.limiter = limiter or RateLimiter(rate)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def is_running(self, campaign_id: int) -> bool:
+        return campaign_id in self._tasks
+
+    def running_count(self) -> int:
+        return len(self._tasks)
+
+    def start(self, bot, campaign_id: int, on_finish: Optional[Callable] = None) -> None:
+        """Запуск (или продолжение) рассылки фоновой задачей"""
+        if campaign_id in self._tasks:
+            return
+        self.db.set_campaign_status(campaign_id, 'running')
+        task = asyncio.create_task(self._run(bot, campaign_id, on_finish))
+        self._tasks[campaign_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(campaign_id, None))
+
+    def stop(self, campaign_id: int) -> Optional[bool]:
+        """Отмена рассылки: текущая порция дорабатывается, дальше отправка не идет
+
+        Запрос сохраняется в БД, поэтому его видит и другой процесс, если рассылку
+        ведет он (shards.py). False — рассылка не идет, None — ошибка БД.
+        """
+        return self.db.request_campaign_stop(campaign_id)
+
+    async def shutdown(self) -> None:
+        """Остановка при выключении бота: статус остается running, чтобы продолжить после запуска"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, bot, campaign_id: int, on_finish: Optional[Callable]) -> None:
+        try:
+            await self._send_batches(bot, campaign_id)
+        except Exception as e:
+            # Курсор последней отправленной порции сохранен — рассылку можно продолжить
+            logger.error(f"Рассылка #{campaign_id} приостановлена из-за ошибки: {e}", exc_info=True)
+            self.db.set_campaign_status(campaign_id, 'paused')
+
+        if on_finish is not None:
+            await on_finish(self.db.get_campaign(campaign_id))
+
+    async def _send_batches(self, bot, campaign_id: int) -> None:
+        """Отправка порциями до конца аудитории или до запроса остановки"""
+        campaign = self.db.get_campaign(campaign_id)
+        cursor = campaign['last_user_id']
+        logger.info(f"Рассылка #{campaign_id}: старт с user_id > {cursor}")
+
+        while True:
+            if self.db.is_campaign_stop_requested(campaign_id):
+                self.db.set_campaign_status(campaign_id, 'cancelled')
+                logger.info(f"Рассылка #{campaign_id} отменена")
+                break
+
+            recipients = self.db.get_campaign_recipients(campaign['audience'], cursor, self.batch_size)
+            if not recipients:
+                self.db.set_campaign_status(campaign_id, 'done')
+                logger.info(f"Рассылка #{campaign_id} завершена")
+                break
+
+            results = await asyncio.gather(
+                *(self._send(bot, user_id, campaign['text']) for user_id in recipients)
+            )
+            cursor = recipients[-1]
+            self.db.checkpoint_campaign(
+                campaign_id, cursor,
+                delivered=results.count('delivered'),
+                blocked=results.count('blocked'),
+                failed=results.count('failed')
+            )
+
+    async def _send(self, bot, chat_id: int, text: str) -> str:
+        """Отправка одного сообщения; возвращает delivered, blocked или failed"""
+        for _ in range(self.max_attempts):
+            await self.limiter.wait()
+            try:
+                await bot.send_message(chat_id=chat_id, text=text)
+                return 'delivered'
+            except RetryAfter as e:
+                logger.warning(f"Рассылка: превышен лимит Telegram, пауза {e.retry_after} с")
+                self.limiter.pause(e.retry_after)
+            except Forbidden:
+                return 'blocked'
+            except TelegramError as e:
+                logger.warning(f"Рассылка: ошибка отправки в чат {chat_id}: {e}")
+                return 'failed'
+        return 'failed'
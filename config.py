@@ -2,6 +2,9 @@
 Конфигурация бота для регистрации на форум Future Wave
 """
 
+# Вариант списка, после которого название университета вводится вручную
+OTHER_UNIVERSITY = "Другой университет"
+
 # Список университетов Санкт-Петербурга
 UNIVERSITIES = [
     "СПбГУ (Санкт-Петербургский государственный университет)",
@@ -12,7 +15,7 @@ UNIVERSITIES = [
     "СПбГТИ(ТУ) (Технологический институт)",
     "ГУАП (Санкт-Петербургский государственный университет аэрокосмического приборостроения)",
     "СПбГАСУ (Санкт-Петербургский государственный архитектурно-строительный университет)",
-    "Другой университет"
+    OTHER_UNIVERSITY
 ]
 
 # Курсы обучения
@@ -32,7 +35,8 @@ COURSES = [
 # Город проведения форума
 CITY = "Санкт-Петербург"
 
-# Список администраторов (username без @)
+# Начальный список администраторов (username без @).
+# Используется только при первом запуске, дальше роли управляются командами /add_admin и /remove_admin
 ADMIN_USERNAMES = [
     "jiznkoritse",
     "Gryaznulya520",
@@ -73,3 +77,133 @@ PERSONAL_DATA_CONSENT = f"""
 ✓ Даете согласие добровольно в соответствии с 152-ФЗ РФ
 """
 
+
+# Режим уведомлений о новых регистрациях для админов и чата стажировок:
+# "immediate" — отдельное сообщение на каждую регистрацию,
+# "digest" — сводка за окно DIGEST_WINDOW_SECONDS или по DIGEST_MAX_BATCH записей
+NOTIFICATION_MODE = "immediate"
+DIGEST_WINDOW_SECONDS = 60
+DIGEST_MAX_BATCH = 20
+
+# Как часто (в секундах) состояния диалогов и user_data сбрасываются в SQLite
+PERSISTENCE_UPDATE_INTERVAL = 5
+
+# Через сколько секунд бездействия незавершенная регистрация считается брошенной
+SESSION_TIMEOUT_SECONDS = 30 * 60
+# Как часто (в секундах) проверять и вытеснять брошенные сессии
+SESSION_SWEEP_INTERVAL = 5 * 60
+
+# Логирование: JSON-файл с ротацией и доля записей, сохраняемых для каждого уровня
+LOG_FILE = "logs/bot.jsonl"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_SAMPLE_RATES = {
+    "DEBUG": 0.0,
+    "INFO": 1.0,
+    "WARNING": 1.0,
+    "ERROR": 1.0,
+}
+
+# Защита от флуда: (размер корзины, пополнение запросов в секунду)
+# "*" — все обновления пользователя, остальные ключи — команды, "callback" и "message"
+FLOOD_LIMITS = {
+    "*": (20, 1.0),
+    "start": (3, 1 / 20),
+    "restart": (3, 1 / 20),
+    "callback": (10, 1.0),
+    "message": (10, 1.0),
+}
+# Как часто (в секундах) напоминать пользователю, что он превысил лимит
+FLOOD_NOTICE_INTERVAL = 30
+
+# Виртуальная очередь на регистрацию (для пиковой нагрузки при открытии регистрации)
+WAITING_ROOM_ENABLED = False
+# Сколько регистраций может заполняться одновременно
+MAX_ACTIVE_SESSIONS = 200
+# Сколько секунд место держится за пользователем, дошедшим до начала очереди
+WAITING_ROOM_INVITE_TTL = 120
+# Как часто (в секундах) впускать пользователей из очереди
+WAITING_ROOM_TICK_SECONDS = 5
+# Как часто (в секундах) обновлять сообщения с позицией в очереди и сколько правок делать за раз
+WAITING_ROOM_UPDATE_INTERVAL = 30
+WAITING_ROOM_MAX_EDITS_PER_UPDATE = 300
+
+# Вместимость площадки (None — без ограничения). Сверх лимита регистрации попадают в лист ожидания
+VENUE_CAPACITY = None
+
+# Регистрация одной формой через Telegram Web App (пошаговый диалог остается запасным вариантом).
+# Telegram открывает Web App только по HTTPS: WEBAPP_URL — внешний адрес reverse proxy,
+# который перенаправляет запросы на локальный сервер WEBAPP_HOST:WEBAPP_PORT. None — форма отключена
+WEBAPP_URL = None
+WEBAPP_HOST = "127.0.0.1"
+WEBAPP_PORT = 8080
+# Запускать ли локальный сервер страницы формы в этом процессе (при нескольких процессах-обработчиках
+# страницу отдает только первый; кнопка формы при этом есть у всех)
+WEBAPP_SERVE = True
+
+# Рассылки участникам: сообщений в секунду (лимит Telegram — около 30) и размер порции,
+# после которой сохраняется курсор (после сбоя повторно может уйти не больше одной порции)
+BROADCAST_RATE_PER_SECOND = 25
+BROADCAST_BATCH_SIZE = 100
+
+# Письма участникам после регистрации (логин и пароль SMTP — в .env: SMTP_USERNAME, SMTP_PASSWORD)
+EMAIL_ENABLED = False
+SMTP_HOST = "localhost"
+SMTP_PORT = 587
+SMTP_USE_TLS = True
+SMTP_SENDER = "Future Wave <noreply@futurewave.ru>"
+# Постоянных SMTP-соединений, писем за один заход соединения и попыток на письмо
+MAILER_POOL_SIZE = 4
+MAILER_BATCH_SIZE = 20
+MAILER_MAX_ATTEMPTS = 5
+
+# Билеты и отметка прохода на площадку. Секрет подписи — TICKET_SECRET в .env
+# (если не задан, выводится из BOT_TOKEN). Отметки сбрасываются в БД раз в CHECKIN_FLUSH_INTERVAL секунд
+TICKET_PREFIX = "FW"
+CHECKIN_FLUSH_INTERVAL = 2
+
+# Метрики в формате Prometheus на локальном адресе (http://METRICS_HOST:METRICS_PORT/metrics).
+# None — сервер метрик не запускается (команда /metrics у админов работает всегда)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# Профилирование обработчиков: сколько минут замеров хранить для /perf, предел числа замеров
+# и доля обновлений, выполняемых под cProfile (0 — без профилирования)
+PERF_WINDOW_MINUTES = 60
+PERF_MAX_RECORDS = 50000
+PERF_PROFILE_SAMPLE_RATE = 0.01
+
+# Запись входящих обновлений для воспроизведения нагрузочным тестом (benchmarks/replay_updates.py):
+# путь к файлу JSONL или None — запись выключена. Персональные данные обезличиваются до записи;
+# соль псевдонимов — UPDATE_RECORDING_SALT в .env (если не задана, своя для каждого запуска).
+# Буфер записи сбрасывается на диск раз в UPDATE_RECORDING_FLUSH_INTERVAL секунд
+UPDATE_RECORDING_FILE = None
+UPDATE_RECORDING_FLUSH_INTERVAL = 5
+
+# Сторож цикла событий: задержка дольше порога (секунд) записывается как зависание
+# с обработчиком, состоянием диалога и стеком блокирующего кода (команда /stalls у админов)
+LOOP_STALL_THRESHOLD_SECONDS = 0.1
+LOOP_STALL_MAX_RECORDS = 500
+
+# Мероприятие: токен бота и секрет билетов читаются из переменных окружения с этими именами,
+# регистрации и состояния диалогов хранятся в DB_PATH. Когда в одном процессе работают несколько
+# мероприятий (python multi_event.py), у каждого свои значения в events/<имя>.py, а EVENT_NAME —
+# метка мероприятия в метриках и в журнале зависаний цикла событий
+EVENT_NAME = None
+BOT_TOKEN_ENV = "BOT_TOKEN"
+TICKET_SECRET_ENV = "TICKET_SECRET"
+DB_PATH = "registrations.db"
+
+# Состояния диалогов и user_data: путь к отдельному файлу SQLite или None — в той же базе DB_PATH
+PERSISTENCE_PATH = None
+
+# Процессы-обработчики (python shards.py): обновления распределяются по SHARD_COUNT процессам
+# по user_id, процесс i принимает их на SHARD_HOST:SHARD_BASE_PORT + i. Регистрации — в общей
+# базе DB_PATH, состояния диалогов — в своем файле у каждого процесса. Счетчики процессов для
+# админ-команд сохраняются в базе раз в SHARD_STATUS_INTERVAL секунд.
+# SHARD_INDEX задается процессу-обработчику при запуске (None — бот работает одним процессом)
+SHARD_COUNT = 4
+SHARD_HOST = "127.0.0.1"
+SHARD_BASE_PORT = 9200
+SHARD_STATUS_INTERVAL = 5
+SHARD_INDEX = None
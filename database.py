@@ -1,14 +1,30 @@
 """
 Database module для хранения данных регистраций
 """
+import json
+import logging
 import sqlite3
+import threading
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Аудитории рассылок: условие отбора получателей из registrations
+BROADCAST_AUDIENCES = {
+    'all': "1 = 1",
+    'internship': "interested_in_internship = 1",
+    'confirmed': "status = 'confirmed'",
+    'waitlist': "status = 'waitlist'",
+}
 
 
 class Database:
     def __init__(self, db_path: str = "registrations.db"):
         self.db_path = db_path
+        # Запись мест на площадке внутри процесса идет по очереди, а не через
+        # ожидание блокировки SQLite (BEGIN IMMEDIATE защищает между процессами)
+        self._seat_lock = threading.Lock()
         self.init_db()
 
     def init_db(self):
@@ -16,6 +32,9 @@ class Database:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
+        # WAL: чтение не блокируется записью, коммиты дешевле при параллельных подтверждениях
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS registrations (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,6 +60,13 @@ class Database:
             # Колонка уже существует
             pass
 
+        # Статус участия: confirmed — место на площадке, waitlist — лист ожидания
+        try:
+            cursor.execute("ALTER TABLE registrations ADD COLUMN status TEXT NOT NULL DEFAULT 'confirmed'")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS admin_chats (
                 user_id INTEGER PRIMARY KEY,
@@ -50,6 +76,71 @@ class Database:
             )
         """)
 
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS admin_roles (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                added_by INTEGER,
+                added_datetime TEXT NOT NULL
+            )
+        """)
+
+        # Приглашения администраторов по username: превращаются в роль по user_id,
+        # когда приглашенный впервые пишет боту
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS admin_invites (
+                username TEXT PRIMARY KEY,
+                added_by INTEGER,
+                added_datetime TEXT NOT NULL
+            )
+        """)
+
+        # Рассылки: last_user_id — курсор, до которого (включительно) получатели уже обработаны
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS broadcast_campaigns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                audience TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'draft',
+                total INTEGER NOT NULL DEFAULT 0,
+                last_user_id INTEGER NOT NULL DEFAULT 0,
+                delivered INTEGER NOT NULL DEFAULT 0,
+                blocked INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                created_by INTEGER,
+                created_datetime TEXT NOT NULL,
+                finished_datetime TEXT
+            )
+        """)
+
+        # Запрос остановки рассылки: его видит процесс, который ведет рассылку (shards.py)
+        try:
+            cursor.execute("ALTER TABLE broadcast_campaigns ADD COLUMN stop_requested INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+
+        # Отметки прохода на площадку по билетам
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS checkins (
+                user_id INTEGER PRIMARY KEY,
+                checked_in_datetime TEXT NOT NULL,
+                checked_in_by INTEGER
+            )
+        """)
+
+        # Подсчет мест и перевод из листа ожидания выбирают регистрации по статусу
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrations_status ON registrations (status)")
+
+        # Счетчики процессов-обработчиков (shards.py) для сводок админ-команд
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS shard_status (
+                shard INTEGER PRIMARY KEY,
+                updated_datetime TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+
         conn.commit()
         conn.close()
 
@@ -83,9 +174,145 @@ class Database:
             conn.close()
             return True
         except Exception as e:
-            print(f"Error saving registration: {e}")
+            logger.error(f"Error saving registration: {e}")
             return False
 
+    def reserve_registration(self, user_data: Dict, capacity: Optional[int]) -> Optional[str]:
+        """Сохранение регистрации с атомарным резервированием места на площадке
+
+        Подсчет занятых мест и вставка выполняются в одной транзакции под
+        блокировкой записи, поэтому параллельные подтверждения не превышают capacity.
+        Повторная регистрация сохраняет уже полученный статус и место в листе ожидания.
+        Возвращает 'confirmed', 'waitlist' или None при ошибке.
+        """
+        with self._seat_lock:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+
+                cursor.execute("SELECT status FROM registrations WHERE user_id = ?", (user_data['user_id'],))
+                row = cursor.fetchone()
+                if row:
+                    status = row[0]
+                elif capacity is None:
+                    status = 'confirmed'
+                else:
+                    cursor.execute("SELECT COUNT(*) FROM registrations WHERE status = 'confirmed'")
+                    status = 'confirmed' if cursor.fetchone()[0] < capacity else 'waitlist'
+
+                cursor.execute("""
+                    INSERT INTO registrations
+                    (user_id, full_name, birth_date, email, phone, university, course,
+                     interested_in_internship, consent_given, consent_datetime, registration_datetime,
+                     telegram_username, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        full_name = excluded.full_name,
+                        birth_date = excluded.birth_date,
+                        email = excluded.email,
+                        phone = excluded.phone,
+                        university = excluded.university,
+                        course = excluded.course,
+                        interested_in_internship = excluded.interested_in_internship,
+                        consent_given = excluded.consent_given,
+                        consent_datetime = excluded.consent_datetime,
+                        registration_datetime = excluded.registration_datetime,
+                        telegram_username = excluded.telegram_username
+                """, (
+                    user_data['user_id'],
+                    user_data['full_name'],
+                    user_data['birth_date'],
+                    user_data['email'],
+                    user_data['phone'],
+                    user_data['university'],
+                    user_data['course'],
+                    user_data.get('interested_in_internship', False),
+                    user_data['consent_given'],
+                    user_data['consent_datetime'],
+                    user_data['registration_datetime'],
+                    user_data.get('telegram_username', ''),
+                    status
+                ))
+
+                cursor.execute("COMMIT")
+                return status
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.error(f"Error reserving registration: {e}")
+                return None
+            finally:
+                conn.close()
+
+    def cancel_registration(self, user_id: int, capacity: Optional[int]) -> Union[List[int], bool, None]:
+        """Отмена регистрации и перевод первых из листа ожидания на освободившиеся места
+
+        Возвращает user_id переведенных участников, False, если регистрации не было,
+        или None при ошибке (регистрация тогда не отменена).
+        """
+        with self._seat_lock:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+
+                cursor.execute("DELETE FROM registrations WHERE user_id = ?", (user_id,))
+                if cursor.rowcount == 0:
+                    cursor.execute("ROLLBACK")
+                    return False
+
+                promoted = self._promote_waitlist(cursor, capacity)
+                cursor.execute("COMMIT")
+                return promoted
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.error(f"Error cancelling registration: {e}")
+                return None
+            finally:
+                conn.close()
+
+    def promote_waitlist(self, capacity: Optional[int]) -> List[int]:
+        """Перевод участников из листа ожидания на свободные места (например, после увеличения вместимости)"""
+        with self._seat_lock:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                promoted = self._promote_waitlist(cursor, capacity)
+                cursor.execute("COMMIT")
+                return promoted
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.error(f"Error promoting waitlist: {e}")
+                return []
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _promote_waitlist(cursor: sqlite3.Cursor, capacity: Optional[int]) -> List[int]:
+        """Перевод из листа ожидания внутри уже открытой транзакции (в порядке регистрации)"""
+        if capacity is None:
+            cursor.execute("SELECT user_id FROM registrations WHERE status = 'waitlist' ORDER BY id")
+        else:
+            cursor.execute("SELECT COUNT(*) FROM registrations WHERE status = 'confirmed'")
+            free_seats = capacity - cursor.fetchone()[0]
+            if free_seats <= 0:
+                return []
+            cursor.execute(
+                "SELECT user_id FROM registrations WHERE status = 'waitlist' ORDER BY id LIMIT ?",
+                (free_seats,)
+            )
+
+        promoted = [row[0] for row in cursor.fetchall()]
+        cursor.executemany(
+            "UPDATE registrations SET status = 'confirmed' WHERE user_id = ?",
+            [(user_id,) for user_id in promoted]
+        )
+        return promoted
+
     def get_registration(self, user_id: int) -> Optional[Dict]:
         """Получение регистрации пользователя"""
         conn = sqlite3.connect(self.db_path)
@@ -110,10 +337,23 @@ class Database:
                 'consent_given': row[9],
                 'consent_datetime': row[10],
                 'registration_datetime': row[11],
-                'telegram_username': row[12]
+                'telegram_username': row[12],
+                'status': row[13]
             }
         return None
 
+    def get_registered_user_ids(self) -> List[int]:
+        """Получение user_id всех зарегистрированных пользователей"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT user_id FROM registrations")
+        user_ids = [row[0] for row in cursor.fetchall()]
+
+        conn.close()
+
+        return user_ids
+
     def get_all_registrations(self) -> List[Dict]:
         """Получение всех регистраций"""
         conn = sqlite3.connect(self.db_path)
@@ -139,7 +379,8 @@ class Database:
                 'consent_given': row[9],
                 'consent_datetime': row[10],
                 'registration_datetime': row[11],
-                'telegram_username': row[12]
+                'telegram_username': row[12],
+                'status': row[13]
             })
 
         return registrations
@@ -152,6 +393,9 @@ class Database:
         cursor.execute("SELECT COUNT(*) FROM registrations")
         total = cursor.fetchone()[0]
 
+        cursor.execute("SELECT status, COUNT(*) FROM registrations GROUP BY status")
+        by_status = dict(cursor.fetchall())
+
         cursor.execute("SELECT university, COUNT(*) FROM registrations GROUP BY university")
         universities = cursor.fetchall()
 
@@ -162,6 +406,8 @@ class Database:
 
         return {
             'total': total,
+            'confirmed': by_status.get('confirmed', 0),
+            'waitlist': by_status.get('waitlist', 0),
             'by_university': dict(universities),
             'by_course': dict(courses)
         }
@@ -182,7 +428,7 @@ class Database:
             conn.close()
             return True
         except Exception as e:
-            print(f"Error saving admin chat: {e}")
+            logger.error(f"Error saving admin chat: {e}")
             return False
 
     def get_admin_chats(self) -> List[int]:
@@ -209,4 +455,394 @@ class Database:
 
         return count > 0
 
+    def seed_admin_invites(self, usernames: List[str]) -> int:
+        """Первичное заполнение приглашений администраторов (только если ролей еще нет)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT (SELECT COUNT(*) FROM admin_roles) + (SELECT COUNT(*) FROM admin_invites)")
+        if cursor.fetchone()[0] > 0:
+            conn.close()
+            return 0
+
+        now = datetime.now().isoformat()
+        cursor.executemany(
+            "INSERT OR IGNORE INTO admin_invites (username, added_by, added_datetime) VALUES (?, NULL, ?)",
+            [(username.lower(), now) for username in usernames]
+        )
+        seeded = cursor.rowcount
+
+        conn.commit()
+        conn.close()
+
+        return seeded
+
+    def get_admin_roles(self) -> List[Dict]:
+        """Получение всех администраторов с ролью по user_id"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT user_id, username, added_by, added_datetime FROM admin_roles ORDER BY added_datetime")
+        rows = cursor.fetchall()
+
+        conn.close()
+
+        return [
+            {'user_id': row[0], 'username': row[1], 'added_by': row[2], 'added_datetime': row[3]}
+            for row in rows
+        ]
+
+    def get_admin_invites(self) -> List[str]:
+        """Получение username приглашенных, но еще не писавших боту администраторов"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT username FROM admin_invites ORDER BY added_datetime")
+        rows = cursor.fetchall()
+
+        conn.close()
+
+        return [row[0] for row in rows]
+
+    def add_admin_role(self, user_id: int, username: str, added_by: Optional[int]) -> bool:
+        """Выдача роли администратора по user_id (приглашение по username удаляется)"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                INSERT OR REPLACE INTO admin_roles (user_id, username, added_by, added_datetime)
+                VALUES (?, ?, ?, ?)
+            """, (user_id, username, added_by, datetime.now().isoformat()))
+            if username:
+                cursor.execute("DELETE FROM admin_invites WHERE username = ?", (username.lower(),))
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error adding admin role: {e}")
+            return False
+
+    def add_admin_invite(self, username: str, added_by: Optional[int]) -> bool:
+        """Приглашение администратора по username"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO admin_invites (username, added_by, added_datetime) VALUES (?, ?, ?)",
+                (username.lower(), added_by, datetime.now().isoformat())
+            )
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error adding admin invite: {e}")
+            return False
+
+    def remove_admin(self, user_id: Optional[int] = None, username: Optional[str] = None) -> int:
+        """Снятие роли администратора по user_id или username (вместе с приглашением); 0 — и при ошибке"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            removed = 0
+            if user_id is not None:
+                cursor.execute("DELETE FROM admin_roles WHERE user_id = ?", (user_id,))
+                removed += cursor.rowcount
+                cursor.execute("DELETE FROM admin_chats WHERE user_id = ?", (user_id,))
+            if username:
+                cursor.execute("SELECT user_id FROM admin_roles WHERE LOWER(username) = ?", (username.lower(),))
+                for (admin_id,) in cursor.fetchall():
+                    cursor.execute("DELETE FROM admin_chats WHERE user_id = ?", (admin_id,))
+                cursor.execute("DELETE FROM admin_roles WHERE LOWER(username) = ?", (username.lower(),))
+                removed += cursor.rowcount
+                cursor.execute("DELETE FROM admin_invites WHERE username = ?", (username.lower(),))
+                removed += cursor.rowcount
+
+            conn.commit()
+            return removed
+        except Exception as e:
+            logger.error(f"Error removing admin: {e}")
+            return 0
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def create_campaign(self, text: str, audience: str, created_by: Optional[int]) -> Optional[int]:
+        """Создание черновика рассылки; возвращает id кампании"""
+        if audience not in BROADCAST_AUDIENCES:
+            raise ValueError(f"Неизвестная аудитория рассылки: {audience}")
+
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute(f"SELECT COUNT(*) FROM registrations WHERE {BROADCAST_AUDIENCES[audience]}")
+            total = cursor.fetchone()[0]
+
+            cursor.execute("""
+                INSERT INTO broadcast_campaigns (text, audience, total, created_by, created_datetime)
+                VALUES (?, ?, ?, ?, ?)
+            """, (text, audience, total, created_by, datetime.now().isoformat()))
+            campaign_id = cursor.lastrowid
+
+            conn.commit()
+            conn.close()
+            return campaign_id
+        except Exception as e:
+            logger.error(f"Error creating broadcast campaign: {e}")
+            return None
+
+    def get_campaign(self, campaign_id: int) -> Optional[Dict]:
+        """Получение рассылки по id"""
+        campaigns = self._get_campaigns("WHERE id = ?", (campaign_id,))
+        return campaigns[0] if campaigns else None
 
+    def get_campaigns(self, limit: int = 10) -> List[Dict]:
+        """Последние рассылки"""
+        return self._get_campaigns("ORDER BY id DESC LIMIT ?", (limit,))
+
+    def get_running_campaigns(self) -> List[Dict]:
+        """Рассылки, прерванные остановкой бота (для продолжения с курсора)"""
+        return self._get_campaigns("WHERE status = 'running' ORDER BY id", ())
+
+    def _get_campaigns(self, condition: str, params: tuple) -> List[Dict]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(f"""
+            SELECT id, text, audience, status, total, last_user_id, delivered, blocked, failed,
+                   created_by, created_datetime, finished_datetime
+            FROM broadcast_campaigns {condition}
+        """, params)
+        rows = cursor.fetchall()
+
+        conn.close()
+
+        return [
+            {
+                'id': row[0],
+                'text': row[1],
+                'audience': row[2],
+                'status': row[3],
+                'total': row[4],
+                'last_user_id': row[5],
+                'delivered': row[6],
+                'blocked': row[7],
+                'failed': row[8],
+                'created_by': row[9],
+                'created_datetime': row[10],
+                'finished_datetime': row[11]
+            }
+            for row in rows
+        ]
+
+    def get_campaign_recipients(self, audience: str, after_user_id: int, limit: int) -> List[int]:
+        """Следующая порция получателей после курсора (по возрастанию user_id)
+
+        Пагинация по ключу: запрос использует индекс user_id и не зависит от того,
+        сколько получателей уже обработано.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(f"""
+            SELECT user_id FROM registrations
+            WHERE user_id > ? AND {BROADCAST_AUDIENCES[audience]}
+            ORDER BY user_id
+            LIMIT ?
+        """, (after_user_id, limit))
+        user_ids = [row[0] for row in cursor.fetchall()]
+
+        conn.close()
+
+        return user_ids
+
+    def checkpoint_campaign(self, campaign_id: int, last_user_id: int,
+                            delivered: int, blocked: int, failed: int) -> bool:
+        """Сохранение курсора рассылки и прибавление счетчиков за обработанную порцию"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                UPDATE broadcast_campaigns
+                SET last_user_id = ?, delivered = delivered + ?, blocked = blocked + ?, failed = failed + ?
+                WHERE id = ?
+            """, (last_user_id, delivered, blocked, failed, campaign_id))
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving broadcast checkpoint: {e}")
+            return False
+
+    def set_campaign_status(self, campaign_id: int, status: str) -> bool:
+        """Смена статуса рассылки (draft, running, done, cancelled)"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            finished = datetime.now().isoformat() if status in ('done', 'cancelled') else None
+            # Запуск (и продолжение) рассылки сбрасывает прошлый запрос остановки
+            cursor.execute(
+                "UPDATE broadcast_campaigns SET status = ?, finished_datetime = ?, "
+                "stop_requested = CASE WHEN ? = 'running' THEN 0 ELSE stop_requested END WHERE id = ?",
+                (status, finished, status, campaign_id)
+            )
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating broadcast status: {e}")
+            return False
+
+    def get_confirmed_names(self) -> Dict[int, str]:
+        """ФИО участников с местом на площадке (для проверки билетов в памяти)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT user_id, full_name FROM registrations WHERE status = 'confirmed'")
+        names = dict(cursor.fetchall())
+
+        conn.close()
+
+        return names
+
+    def get_checkins(self) -> Dict[int, str]:
+        """Уже отмеченные проходы: user_id -> время"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT user_id, checked_in_datetime FROM checkins")
+        checkins = dict(cursor.fetchall())
+
+        conn.close()
+
+        return checkins
+
+    def save_checkins(self, rows: List[tuple]) -> bool:
+        """Запись порции отметок прохода (user_id, время, кто отметил) одной транзакцией"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.executemany(
+                "INSERT OR IGNORE INTO checkins (user_id, checked_in_datetime, checked_in_by) VALUES (?, ?, ?)",
+                rows
+            )
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving check-ins: {e}")
+            return False
+
+    def save_shard_status(self, shard: int, data: Dict) -> bool:
+        """Запись текущих счетчиков процесса-обработчика"""
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO shard_status (shard, updated_datetime, data) VALUES (?, ?, ?)",
+                (shard, datetime.now().isoformat(), json.dumps(data, ensure_ascii=False))
+            )
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving shard status: {e}")
+            return False
+
+    def get_shard_statuses(self) -> List[Dict]:
+        """Последние счетчики всех процессов-обработчиков"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT shard, updated_datetime, data FROM shard_status ORDER BY shard")
+        statuses = [
+            {'shard': shard, 'updated_datetime': updated, 'data': json.loads(data)}
+            for shard, updated, data in cursor.fetchall()
+        ]
+
+        conn.close()
+
+        return statuses
+
+    def request_campaign_stop(self, campaign_id: int) -> Optional[bool]:
+        """Запрос остановки идущей рассылки; False — рассылка не идет, None — ошибка БД"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                "UPDATE broadcast_campaigns SET stop_requested = 1 WHERE id = ? AND status = 'running'",
+                (campaign_id,)
+            )
+            requested = cursor.rowcount > 0
+
+            conn.commit()
+            conn.close()
+            return requested
+        except Exception as e:
+            logger.error(f"Error requesting broadcast stop: {e}")
+            return None
+
+    def is_campaign_stop_requested(self, campaign_id: int) -> bool:
+        """Запрошена ли остановка рассылки"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT stop_requested FROM broadcast_campaigns WHERE id = ?", (campaign_id,))
+        row = cursor.fetchone()
+
+        conn.close()
+
+        return bool(row and row[0])
+
+    def get_confirmed_name(self, user_id: int) -> Optional[str]:
+        """ФИО участника, если у него есть место на площадке"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT full_name FROM registrations WHERE user_id = ? AND status = 'confirmed'", (user_id,))
+        row = cursor.fetchone()
+
+        conn.close()
+
+        return row[0] if row else None
+
+    def record_checkin(self, user_id: int, checked_in_datetime: str,
+                       checked_in_by: Optional[int]) -> Optional[Tuple[bool, str]]:
+        """Отметка прохода сразу в таблицу: (отмечен сейчас, время первого прохода); None — ошибка БД
+
+        Если участник уже отмечен (в том числе другим процессом), отметка не меняется
+        и возвращается ее время — так повтор находится при любом числе процессов.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                "INSERT OR IGNORE INTO checkins (user_id, checked_in_datetime, checked_in_by) VALUES (?, ?, ?)",
+                (user_id, checked_in_datetime, checked_in_by)
+            )
+            inserted = cursor.rowcount > 0
+            cursor.execute("SELECT checked_in_datetime FROM checkins WHERE user_id = ?", (user_id,))
+            row = cursor.fetchone()
+
+            conn.commit()
+            conn.close()
+            return (inserted, row[0]) if row else None
+        except Exception as e:
+            logger.error(f"Error recording check-in: {e}")
+            return None
@@ -0,0 +1,15 @@
+"""
+Форум Future Wave (значения config.py без изменений)
+
+Файл мероприятия для multi_event.py: здесь задаются только настройки,
+отличающиеся от config.py. У каждого мероприятия должны быть свои
+BOT_TOKEN_ENV и DB_PATH; обычно меняются также ORGANIZATION_INFO,
+UNIVERSITIES, COURSES, ADMIN_USERNAMES, INTERNSHIP_CHAT_ID, TICKET_PREFIX
+и TICKET_SECRET_ENV. Общие на процесс METRICS_PORT, темп рассылок и порог
+сторожа берутся из config.py; WEBAPP_PORT, если форма включена, у каждого
+мероприятия должен быть свой.
+"""
+
+BOT_TOKEN_ENV = "BOT_TOKEN"
+TICKET_SECRET_ENV = "TICKET_SECRET"
+DB_PATH = "registrations.db"
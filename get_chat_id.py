@@ -54,7 +54,11 @@ def main():
     print("3. Бот покажет Chat ID группы")
     print("\nДля остановки нажмите Ctrl+C\n")
 
-    application = Application.builder().token(token).build()
+    builder = Application.builder().token(token)
+    # Другой сервер Bot API (например, локальная заглушка из benchmarks/fake_telegram.py)
+    if os.getenv('BOT_API_BASE_URL'):
+        builder = builder.base_url(os.getenv('BOT_API_BASE_URL'))
+    application = builder.build()
     application.add_handler(MessageHandler(filters.ALL, get_chat_id))
     application.run_polling()
 
@@ -0,0 +1,83 @@
+"""
+Минимальный HTTP-сервер на asyncio для локальных страниц бота (форма Web App, метрики)
+
+Сервер работает в том же цикле событий, что и бот, понимает только GET и
+HEAD и закрывает соединение после каждого ответа. Подклассы задают лишь
+маршруты: route() возвращает тип содержимого и тело ответа для пути.
+"""
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Максимальный размер заголовков запроса
+MAX_REQUEST_BYTES = 8192
+
+TEXT_PLAIN = "text/plain; charset=utf-8"
+
+
+class LocalHttpServer:
+    """Разбор запроса, ответы 404/405 и запуск/остановка; маршруты — в route() подкласса"""
+
+    # Адрес для сообщения о запуске (путь после http://host:port)
+    start_path = "/"
+    start_message = "HTTP-сервер доступен"
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests_total = 0
+
+    def route(self, path: str) -> Optional[Tuple[str, bytes]]:
+        """(Content-Type, тело) для пути или None — 404"""
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"{self.start_message} на http://{self.host}:{self.port}{self.start_path}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+            if len(head) > MAX_REQUEST_BYTES:
+                raise ValueError("слишком большой запрос")
+            method, path, _ = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ", 2)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+            writer.close()
+            return
+
+        self.requests_total += 1
+        path = path.split("?", 1)[0]
+
+        if method not in ("GET", "HEAD"):
+            status, content_type, body = "405 Method Not Allowed", TEXT_PLAIN, b"Method Not Allowed"
+        else:
+            found = self.route(path)
+            if found is None:
+                status, content_type, body = "404 Not Found", TEXT_PLAIN, b"Not Found"
+            else:
+                status, (content_type, body) = "200 OK", found
+
+        headers = (
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("latin-1")
+
+        try:
+            writer.write(headers if method == "HEAD" else headers + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,39 @@
+"""
+Клавиатуры бота, собранные один раз при импорте
+"""
+from typing import List
+
+from telegram import KeyboardButton, ReplyKeyboardMarkup, WebAppInfo
+
+from config import UNIVERSITIES, COURSES, WEBAPP_URL
+
+
+def _two_columns(options: List[str]) -> List[List[str]]:
+    """Раскладка вариантов по две кнопки в ряд"""
+    return [options[i:i + 2] for i in range(0, len(options), 2)]
+
+
+# Объекты telegram неизменяемы, поэтому одну клавиатуру можно отправлять всем пользователям
+UNIVERSITY_KEYBOARD = ReplyKeyboardMarkup(_two_columns(UNIVERSITIES), one_time_keyboard=True, resize_keyboard=True)
+COURSE_KEYBOARD = ReplyKeyboardMarkup(_two_columns(COURSES), one_time_keyboard=True, resize_keyboard=True)
+
+# Ответы на вопросы диалога. Кнопки обычной клавиатуры приходят текстом, поэтому
+# ответ на следующий шаг помещается в одно сообщение вместе со сменой клавиатуры
+# и не требует answerCallbackQuery
+CONSENT_YES = "✅ Даю согласие"
+CONSENT_NO = "❌ Не даю согласие"
+INTERNSHIP_YES = "✅ Да, интересны"
+INTERNSHIP_NO = "❌ Нет, не интересны"
+CONFIRM_YES = "✅ Да, всё верно"
+CONFIRM_NO = "❌ Нет, заполнить заново"
+
+# Кнопка открытия формы Web App (данные из формы приходят боту как web_app_data)
+WEBAPP_BUTTON = KeyboardButton("📝 Заполнить анкету одной формой", web_app=WebAppInfo(WEBAPP_URL)) if WEBAPP_URL else None
+WEBAPP_KEYBOARD = ReplyKeyboardMarkup([[WEBAPP_BUTTON]], resize_keyboard=True) if WEBAPP_BUTTON else None
+
+CONSENT_KEYBOARD = ReplyKeyboardMarkup(
+    [[CONSENT_YES], [CONSENT_NO]] + ([[WEBAPP_BUTTON]] if WEBAPP_BUTTON else []),
+    resize_keyboard=True
+)
+INTERNSHIP_KEYBOARD = ReplyKeyboardMarkup([[INTERNSHIP_YES, INTERNSHIP_NO]], one_time_keyboard=True, resize_keyboard=True)
+CONFIRM_KEYBOARD = ReplyKeyboardMarkup([[CONFIRM_YES], [CONFIRM_NO]], one_time_keyboard=True, resize_keyboard=True)
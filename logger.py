@@ -0,0 +1,199 @@
+"""
+Логирование бота: очередь с фоновой записью, JSON-файл с ротацией и цветной вывод в консоль
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+from colorama import Fore, Back, Style, init
+
+# Имя логгера для сообщений бота (log_info, log_admin и т.д.)
+BOT_LOGGER_NAME = "future_wave"
+
+_logger = logging.getLogger(BOT_LOGGER_NAME)
+_listener: Optional[QueueListener] = None
+_sampler: Optional["SamplingFilter"] = None
+
+# Маскирование персональных данных, которые могут попасть в текст сообщения
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_PHONE_RE = re.compile(r'(?<!\d)(?:\+7|8)[\s\-(]*\d{3}[\s\-)]*\d{3}[\s\-]*\d{2}[\s\-]*\d{2}(?!\d)')
+_DATE_RE = re.compile(r'(?<!\d)\d{2}\.\d{2}\.\d{4}(?!\d)')
+
+# Оформление консольного вывода по типу сообщения
+_CONSOLE_STYLES = {
+    'info': (Fore.CYAN, "ℹ️ "),
+    'success': (Fore.GREEN, "✅"),
+    'warning': (Fore.YELLOW, "⚠️ "),
+    'error': (Fore.RED, "❌"),
+    'admin': (Fore.MAGENTA, "👑"),
+    'registration': (Fore.GREEN + Back.BLACK, "🎉"),
+    'debug': (Fore.WHITE, "🔎"),
+}
+
+
+def redact(text: str) -> str:
+    """Маскирование email, телефонов и дат в тексте"""
+    text = _EMAIL_RE.sub("<email>", text)
+    text = _PHONE_RE.sub("<phone>", text)
+    return _DATE_RE.sub("<date>", text)
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирование записи в одну JSON-строку"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'kind': getattr(record, 'kind', record.levelname.lower()),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        user_id = getattr(record, 'user_id', None)
+        if user_id is not None:
+            entry['user_id'] = user_id
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Цветной вывод в консоль в прежнем формате бота"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        kind = getattr(record, 'kind', record.levelname.lower())
+        color, icon = _CONSOLE_STYLES.get(kind, (Fore.WHITE, "•"))
+        timestamp = datetime.fromtimestamp(record.created).strftime('%H:%M:%S')
+        user_id = getattr(record, 'user_id', None)
+        user_info = f"id {user_id}" if user_id is not None else "System"
+        return f"{color}[{timestamp}] {icon} {Style.BRIGHT}{record.getMessage()}{Style.RESET_ALL} | {Fore.YELLOW}{user_info}{Style.RESET_ALL}"
+
+
+class SamplingFilter(logging.Filter):
+    """Выборочное логирование: для каждого уровня пропускается заданная доля записей"""
+
+    def __init__(self, sample_rates: Dict[str, float]):
+        super().__init__()
+        self.sample_rates = {logging.getLevelName(level): rate for level, rate in sample_rates.items()}
+
+    def sample(self, level: int) -> bool:
+        rate = self.sample_rates.get(level, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Записи из log_* уже прошли выборку до создания
+        return getattr(record, 'sampled', False) or self.sample(record.levelno)
+
+
+class FastQueueHandler(QueueHandler):
+    """QueueHandler без форматирования и копирования записи в потоке обработчика
+
+    Форматирование выполняется в фоновом потоке QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(log_file: str, max_bytes: int, backup_count: int, sample_rates: Dict[str, float]) -> None:
+    """Настройка конвейера логирования: вызовы log_* только кладут запись в очередь"""
+    global _listener, _sampler
+    if _listener is not None:
+        return
+
+    # Инициализация colorama нужна только консоли Windows
+    if os.name == 'nt':
+        init()
+
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(ConsoleFormatter())
+
+    log_queue = queue.SimpleQueue()
+    _sampler = SamplingFilter(sample_rates)
+    queue_handler = FastQueueHandler(log_queue)
+    queue_handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG if sample_rates.get('DEBUG', 0) > 0 else logging.INFO)
+    root.addHandler(queue_handler)
+    # httpx пишет каждый запрос к Bot API на уровне INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Дописывание оставшихся в очереди записей и остановка фонового потока"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _log(level: int, kind: str, message: str, user=None, fields: Optional[Dict] = None) -> None:
+    # Выборка и проверка уровня до создания записи, чтобы отброшенные сообщения ничего не стоили
+    if not _logger.isEnabledFor(level) or (_sampler is not None and not _sampler.sample(level)):
+        return
+    extra = {'kind': kind, 'user_id': user.id if user else None, 'fields': fields, 'sampled': True}
+    # makeRecord + handle вместо _logger.log: без поиска вызывающего кадра в стеке
+    record = _logger.makeRecord(_logger.name, level, "(bot)", 0, redact(message), None, None, extra=extra)
+    _logger.handle(record)
+
+
+def log_debug(message: str, user=None):
+    """Логирование отладочных сообщений (шаги диалога)"""
+    _log(logging.DEBUG, 'debug', message, user)
+
+
+def log_info(message: str, user=None):
+    """Логирование информационных сообщений"""
+    _log(logging.INFO, 'info', message, user)
+
+
+def log_success(message: str, user=None):
+    """Логирование успешных действий"""
+    _log(logging.INFO, 'success', message, user)
+
+
+def log_warning(message: str, user=None):
+    """Логирование предупреждений"""
+    _log(logging.WARNING, 'warning', message, user)
+
+
+def log_error(message: str, user=None):
+    """Логирование ошибок"""
+    _log(logging.ERROR, 'error', message, user)
+
+
+def log_admin(message: str, user=None):
+    """Логирование действий администраторов"""
+    _log(logging.INFO, 'admin', message, user)
+
+
+def log_registration(message: str, data: Dict):
+    """Логирование регистраций (без персональных данных)"""
+    fields = {
+        'registration_user_id': data.get('user_id'),
+        'university': data.get('university', 'N/A'),
+        'course': data.get('course', 'N/A'),
+        'interested_in_internship': bool(data.get('interested_in_internship', False)),
+    }
+    _log(logging.INFO, 'registration', f"{message} {fields['university']}, {fields['course']}", fields=fields)
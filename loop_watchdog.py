@@ -0,0 +1,184 @@
+"""
+Сторож цикла событий: поиск синхронного кода, который надолго блокирует бота
+
+Обращения к SQLite и запись журнала выполняются синхронно внутри обработчиков,
+и пока они идут, цикл событий не обрабатывает ничего другого. Задача-пульс
+в цикле событий просыпается каждые interval секунд, а отдельный поток следит,
+чтобы пульс не пропадал. Если цикл не отвечает дольше threshold, поток
+снимает стек потока цикла событий — он указывает на код, который блокирует
+прямо сейчас, — и берет обработчик и состояние диалога текущей задачи.
+Длительность зависания — насколько позже срока проснулся пульс, она известна,
+когда цикл освобождается (и меньше самой блокировки не больше чем на interval).
+"""
+import asyncio
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Сколько кадров стека блокирующего кода сохранять
+STACK_DEPTH = 8
+
+
+def format_stack(frame, depth: int = STACK_DEPTH) -> str:
+    """Стек от самого глубокого вызова: файл:строка(функция) ← ..."""
+    frames = traceback.extract_stack(frame)[-depth:]
+    return " ← ".join(f"{os.path.basename(item.filename)}:{item.lineno}({item.name})" for item in reversed(frames))
+
+
+class LoopWatchdog:
+    """Замер задержки цикла событий и запись зависаний дольше threshold секунд
+
+    Обработчики оборачиваются track: на время их выполнения задача цикла событий
+    связывается с именем обработчика и состоянием диалога, поэтому зависание
+    относится к обработчику, даже если блокирует вызванная из него функция.
+    state_of(update, context) — состояние диалога пользователя перед обработкой;
+    у track свой state_of, если сторож общий для нескольких ботов со своими диалогами.
+    """
+
+    def __init__(self, threshold: float, max_stalls: int = 500,
+                 state_of: Optional[Callable] = None):
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.state_of = state_of
+        self._stalls: deque = deque(maxlen=max_stalls)
+        self._running: Dict[asyncio.Task, tuple] = {}
+        self._lock = threading.Lock()
+        self._pending: Optional[tuple] = None
+        self._beat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.stalls_total = 0
+        self.max_lag = 0.0
+
+    def track(self, name: str, callback: Callable, state_of: Optional[Callable] = None) -> Callable:
+        """Обертка асинхронного обработчика (update, context); state_of — вместо общего self.state_of"""
+        state_of = state_of or self.state_of
+
+        @functools.wraps(callback)
+        async def wrapper(update, context, *args, **kwargs):
+            task = asyncio.current_task()
+            state = None
+            if state_of is not None:
+                try:
+                    state = state_of(update, context)
+                except Exception:
+                    state = None
+            previous = self._running.get(task)
+            self._running[task] = (name, state)
+            try:
+                return await callback(update, context, *args, **kwargs)
+            finally:
+                if previous is None:
+                    self._running.pop(task, None)
+                else:
+                    self._running[task] = previous
+
+        return wrapper
+
+    def start(self) -> None:
+        """Запуск пульса и потока-наблюдателя; повторный вызов ничего не делает
+        (один сторож на цикл событий может быть общим для нескольких ботов)"""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            beat = time.monotonic()
+            with self._lock:
+                self._beat = beat
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - beat - self.interval
+            self.max_lag = max(self.max_lag, lag)
+            with self._lock:
+                pending, self._pending = self._pending, None
+            if lag >= self.threshold:
+                self._record(lag, pending if pending and pending[0] == beat else None)
+
+    def _watch(self) -> None:
+        """Поток-наблюдатель: снимок стека, пока цикл событий еще заблокирован"""
+        while not self._stopped.wait(self.interval / 2):
+            with self._lock:
+                beat = self._beat
+                if self._pending is not None or time.monotonic() - beat - self.interval < self.threshold:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = format_stack(frame) if frame is not None else ""
+            # Цикл заблокирован, поэтому задача и словарь обработчиков сейчас не меняются
+            task = asyncio.current_task(self._loop)
+            handler, state = self._running.get(task, (task.get_name() if task else "вне задач", None))
+            with self._lock:
+                if self._beat == beat:
+                    self._pending = (beat, handler, state, stack)
+
+    def _record(self, lag: float, pending: Optional[tuple]) -> None:
+        if pending:
+            _, handler, state, stack = pending
+        else:
+            # Зависание закончилось раньше, чем его заметил поток-наблюдатель
+            handler, state, stack = "неизвестно", None, ""
+        self._stalls.append((time.monotonic(), lag, handler, state, stack))
+        self.stalls_total += 1
+        logger.warning(
+            f"Цикл событий заблокирован на {lag * 1000:.0f} мс: {handler}"
+            + (f" (состояние {state})" if state is not None else "")
+            + (f"; {stack}" if stack else "")
+        )
+
+    def _recent(self, minutes: float) -> list:
+        cutoff = time.monotonic() - minutes * 60
+        recent = []
+        for item in reversed(self._stalls):
+            if item[0] < cutoff:
+                break
+            recent.append(item)
+        return recent
+
+    def summary(self, minutes: float, limit: int = 5) -> List[Dict]:
+        """Зависания за последние minutes минут по обработчикам и состояниям (по суммарному времени)"""
+        groups: Dict[tuple, Dict] = {}
+        for _, lag, handler, state, stack in self._recent(minutes):
+            entry = groups.setdefault((handler, state), {
+                'handler': handler, 'state': state, 'count': 0, 'total': 0.0, 'max': 0.0, 'stack': stack,
+            })
+            entry['count'] += 1
+            entry['total'] += lag
+            if lag > entry['max']:
+                entry['max'], entry['stack'] = lag, stack
+        return sorted(groups.values(), key=lambda item: item['total'], reverse=True)[:limit]
+
+    def latest(self, minutes: float, limit: int = 3) -> List[Dict]:
+        return [
+            {'ago': time.monotonic() - moment, 'lag': lag, 'handler': handler, 'state': state, 'stack': stack}
+            for moment, lag, handler, state, stack in self._recent(minutes)[:limit]
+        ]
@@ -0,0 +1,246 @@
+"""
+Отправка писем участникам: очередь, пул постоянных SMTP-соединений и повторы с паузой
+"""
+import asyncio
+import logging
+import smtplib
+import socket
+import ssl
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+from logger import redact
+
+logger = logging.getLogger(__name__)
+
+# Сетевые ошибки, после которых письмо стоит отправить позже. Ошибки SMTP тоже
+# наследуют OSError, поэтому их ответы (4xx/5xx) разбираются отдельно
+TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, socket.gaierror)
+
+
+class SMTPConnection:
+    """Постоянное SMTP-соединение одного исполнителя пула (используется из одного потока)"""
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, use_tls: bool = False, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls(context=ssl.create_default_context())
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        return smtp
+
+    def send(self, message: EmailMessage) -> None:
+        # Сервер мог закрыть простаивавшее соединение: тогда сразу переподключаемся один раз
+        reused = self._smtp is not None
+        while True:
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if not reused:
+                    raise
+                reused = False
+            except smtplib.SMTPResponseException as e:
+                # После 4xx соединение может быть в неопределенном состоянии
+                if 400 <= e.smtp_code < 500:
+                    self.close()
+                raise
+            except TRANSIENT_ERRORS:
+                self.close()
+                raise
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+def is_transient(error: Exception) -> bool:
+    """Стоит ли повторить отправку письма после этой ошибки"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+class Mailer:
+    """Очередь писем, которую разбирает пул исполнителей
+
+    Обработчики только кладут письмо в очередь (enqueue не ждет сети). Каждый
+    исполнитель держит свое постоянное SMTP-соединение, забирает из очереди до
+    batch_size писем и отправляет их одним заходом в отдельном потоке. Письма с
+    временными ошибками возвращаются в очередь с экспоненциальной паузой.
+    """
+
+    def __init__(self, host: str, port: int, sender: str, username: Optional[str] = None,
+                 password: Optional[str] = None, use_tls: bool = False, pool_size: int = 4,
+                 batch_size: int = 20, max_attempts: int = 5, backoff_base: float = 2.0,
+                 max_backoff: float = 300.0):
+        self.sender = sender
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._connection_args = (host, port, username, password, use_tls)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._connections: List[SMTPConnection] = []
+        self._retry_handles: set = set()
+        # Порции, которые сейчас отправляются в потоках: отправка -> письма порции
+        self._in_flight: Dict[asyncio.Future, List[Tuple[EmailMessage, int]]] = {}
+        self.sent_total = 0
+        self.failed_total = 0
+        self.retries_total = 0
+
+    def queue_size(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        for _ in range(self.pool_size):
+            connection = SMTPConnection(*self._connection_args)
+            self._connections.append(connection)
+            self._workers.append(asyncio.create_task(self._worker(connection)))
+        logger.info(f"Почтовый пул запущен: {self.pool_size} соединений")
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Остановка с ожиданием отправки уже поставленных в очередь писем (не дольше timeout)"""
+        if self._queue is None:
+            return
+        unsent = 0
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            unsent = self._queue.qsize() + len(self._retry_handles)
+
+        for handle in self._retry_handles:
+            handle.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        # Потоки отправки не отменяются: соединения закрываются только после текущих порций,
+        # письма с ошибками уже не повторяются
+        in_flight = list(self._in_flight.items())
+        self._in_flight.clear()
+        outcomes = await asyncio.gather(*(sending for sending, _ in in_flight), return_exceptions=True)
+        for (_, batch), results in zip(in_flight, outcomes):
+            if isinstance(results, BaseException):
+                unsent += len(batch)
+                continue
+            for error in results:
+                if error is None:
+                    self.sent_total += 1
+                else:
+                    unsent += 1
+
+        if unsent:
+            logger.warning(f"Почта: не отправлено писем при остановке: {unsent}")
+        await asyncio.to_thread(lambda: [connection.close() for connection in self._connections])
+        self._workers.clear()
+        self._connections.clear()
+        self._queue = None
+
+    async def _drain(self) -> None:
+        """Ожидание, пока очередь и отложенные повторы не опустеют"""
+        while True:
+            await self._queue.join()
+            if not self._retry_handles:
+                return
+            await asyncio.sleep(0.1)
+
+    def enqueue(self, to: str, subject: str, body: str) -> None:
+        """Постановка письма в очередь (без ожидания отправки)
+
+        До start() и после stop() очереди нет: письмо не отправляется и
+        учитывается как неотправленное.
+        """
+        if self._queue is None:
+            self.failed_total += 1
+            logger.error("Почта: пул не запущен, письмо не отправлено")
+            return
+
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = to
+        message['Subject'] = subject
+        message.set_content(body)
+        self._queue.put_nowait((message, 1))
+
+    async def _worker(self, connection: SMTPConnection) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            sending = asyncio.ensure_future(asyncio.to_thread(self._send_batch, connection, batch))
+            self._in_flight[sending] = batch
+            try:
+                # shield: при остановке пула порция дописывается, и ее результат разбирает stop()
+                try:
+                    results = await asyncio.shield(sending)
+                except Exception:
+                    self._in_flight.pop(sending, None)
+                    raise
+                self._in_flight.pop(sending, None)
+                for item, error in zip(batch, results):
+                    self._handle_result(item, error)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _send_batch(connection: SMTPConnection, batch: List[Tuple[EmailMessage, int]]) -> List[Optional[Exception]]:
+        """Отправка порции писем по одному соединению (выполняется в потоке)"""
+        results = []
+        for message, _ in batch:
+            try:
+                connection.send(message)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _handle_result(self, item: Tuple[EmailMessage, int], error: Optional[Exception]) -> None:
+        message, attempt = item
+        if error is None:
+            self.sent_total += 1
+            return
+
+        if is_transient(error) and attempt < self.max_attempts:
+            # Пауза удваивается с каждой попыткой: backoff_base, 2×, 4×...
+            delay = min(self.backoff_base * 2 ** (attempt - 1), self.max_backoff)
+            self.retries_total += 1
+            # Ошибки SMTP (например, SMTPRecipientsRefused) содержат адрес получателя
+            logger.warning(f"Почта: временная ошибка ({redact(str(error))}), повтор через {delay:.0f} с (попытка {attempt})")
+            self._schedule_retry((message, attempt + 1), delay)
+            return
+
+        self.failed_total += 1
+        logger.error(f"Почта: письмо не отправлено после {attempt} попыток: {redact(str(error))}")
+
+    def _schedule_retry(self, item: Tuple[EmailMessage, int], delay: float) -> None:
+        def requeue():
+            self._retry_handles.discard(handle)
+            self._queue.put_nowait(item)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retry_handles.add(handle)
@@ -0,0 +1,47 @@
+"""
+Быстрая проверка "пользователь уже зарегистрирован" без обращения к БД
+"""
+from typing import Iterable
+
+
+class RegisteredUsers:
+    """Множество user_id зарегистрированных пользователей в памяти
+
+    До загрузки (load) любой пользователь считается возможно зарегистрированным,
+    чтобы проверка откатывалась на запрос к БД. Загрузка идет в фоне после
+    запуска, поэтому изменения до нее запоминаются и применяются поверх
+    загруженного снимка — снимок мог быть прочитан до них.
+    """
+
+    def __init__(self):
+        self._user_ids = set()
+        self._changes = []
+        self.loaded = False
+
+    def load(self, user_ids: Iterable[int]) -> None:
+        user_ids = set(user_ids)
+        for user_id, registered in self._changes:
+            if registered:
+                user_ids.add(user_id)
+            else:
+                user_ids.discard(user_id)
+        self._changes = []
+        self._user_ids = user_ids
+        self.loaded = True
+
+    def add(self, user_id: int) -> None:
+        self._user_ids.add(user_id)
+        if not self.loaded:
+            self._changes.append((user_id, True))
+
+    def discard(self, user_id: int) -> None:
+        self._user_ids.discard(user_id)
+        if not self.loaded:
+            self._changes.append((user_id, False))
+
+    def might_be_registered(self, user_id: int) -> bool:
+        """False — пользователь точно не зарегистрирован, запрос к БД не нужен"""
+        return not self.loaded or user_id in self._user_ids
+
+    def __len__(self) -> int:
+        return len(self._user_ids)
@@ -0,0 +1,245 @@
+"""
+Метрики бота: гистограммы времени обработки, счетчики и показатели очередей
+
+Гистограммы обновляются на горячем пути (один perf_counter и bisect на вызов),
+а счетчики других модулей (ApiCallStats, Mailer, SessionRegistry...) не
+дублируются: они читаются функциями-сборщиками только в момент запроса метрик.
+Наружу метрики отдаются в текстовом формате Prometheus на локальном адресе.
+"""
+import functools
+import inspect
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from httpserver import LocalHttpServer
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм в секундах: от 1 мс до 10 с
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Распределение длительностей по корзинам (без хранения отдельных значений)"""
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # Последняя корзина — значения больше верхней границы (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class HistogramFamily:
+    """Гистограммы одной метрики с разбивкой по значению метки (состояние, метод...)"""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self.children: Dict[str, Histogram] = {}
+
+    def observe(self, label_value: str, value: float) -> None:
+        histogram = self.children.get(label_value)
+        if histogram is None:
+            histogram = self.children.setdefault(label_value, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def render(self, const_labels: str = "") -> List[str]:
+        """Строки метрики; const_labels — общие метки реестра, уже в виде 'name="value"'"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        prefix = f"{const_labels}," if const_labels else ""
+        for label_value, histogram in sorted(self.children.items()):
+            label = f'{prefix}{self.label}="{escape_label(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f"{self.name}_sum{{{label}}} {histogram.total:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {histogram.count}")
+        return lines
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Реестр метрик: гистограммы и сборщики счетчиков/показателей других модулей
+
+    Сборщик — функция без аргументов, возвращающая число или словарь
+    {значение метки: число}; вызывается только при выдаче метрик.
+    labels — метки, общие для всех метрик реестра (например, мероприятие,
+    когда в одном процессе работают несколько ботов).
+    """
+
+    def __init__(self, labels: Optional[Dict[str, str]] = None):
+        self._histograms: Dict[str, HistogramFamily] = {}
+        self._collectors: List[Tuple[str, str, str, Optional[str], Callable]] = []
+        self.labels = ",".join(f'{key}="{escape_label(value)}"' for key, value in (labels or {}).items())
+
+    def histogram(self, name: str, help_text: str, label: str,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> HistogramFamily:
+        family = self._histograms.get(name)
+        if family is None:
+            family = self._histograms[name] = HistogramFamily(name, help_text, label, buckets)
+        return family
+
+    def counter(self, name: str, help_text: str, collect: Callable, label: Optional[str] = None) -> None:
+        self._collectors.append((name, help_text, "counter", label, collect))
+
+    def gauge(self, name: str, help_text: str, collect: Callable, label: Optional[str] = None) -> None:
+        self._collectors.append((name, help_text, "gauge", label, collect))
+
+    def collect(self) -> Dict[str, object]:
+        """Текущие значения счетчиков и показателей: имя -> число или словарь по меткам"""
+        values = {}
+        for name, _, _, _, collect in self._collectors:
+            try:
+                values[name] = collect()
+            except Exception as e:
+                logger.error(f"Ошибка сборщика метрики {name}: {e}")
+        return values
+
+    def families(self) -> List[List[str]]:
+        """Строки каждой метрики: HELP, TYPE, затем значения"""
+        families = []
+        values = self.collect()
+        prefix = f"{self.labels}," if self.labels else ""
+        for name, help_text, kind, label, _ in self._collectors:
+            if name not in values:
+                continue
+            lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            value = values[name]
+            if isinstance(value, dict):
+                for label_value, number in sorted(value.items()):
+                    lines.append(f'{name}{{{prefix}{label}="{escape_label(label_value)}"}} {number}')
+            elif self.labels:
+                lines.append(f"{name}{{{self.labels}}} {value}")
+            else:
+                lines.append(f"{name} {value}")
+            families.append(lines)
+        for family in self._histograms.values():
+            families.append(family.render(self.labels))
+        return families
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        return render_registries([self])
+
+
+class RegistryGroup:
+    """Несколько реестров (по одному на бота) за одним сервером метрик"""
+
+    def __init__(self, registries: List[MetricsRegistry]):
+        self.registries = registries
+
+    def render(self) -> str:
+        return render_registries(self.registries)
+
+
+def render_registries(registries: List[MetricsRegistry]) -> str:
+    """Метрики нескольких реестров одним ответом: HELP и TYPE — один раз на имя метрики
+
+    Реестры различаются общими метками (labels), иначе строки значений совпадут.
+    """
+    merged: Dict[str, List[str]] = {}
+    for registry in registries:
+        for lines in registry.families():
+            name = lines[0].split(" ", 3)[2]
+            if name in merged:
+                merged[name].extend(lines[2:])
+            else:
+                merged[name] = list(lines)
+    return "".join(line + "\n" for lines in merged.values() for line in lines)
+
+
+def timed(family: HistogramFamily, label_value: str, callback: Callable) -> Callable:
+    """Обертка асинхронного обработчика, записывающая время его выполнения"""
+
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        finally:
+            family.observe(label_value, time.perf_counter() - start)
+
+    return wrapper
+
+
+def instrument_methods(obj, family: HistogramFamily, charge: Optional[Callable[[float], None]] = None) -> None:
+    """Замер времени всех публичных методов объекта (метка — имя метода)
+
+    Обертки ставятся на экземпляр, поэтому замеряются и вызовы из других
+    модулей, которые держат ссылку на тот же объект. Методы могут вызываться
+    из потоков: редкие гонки при обновлении корзин для метрик допустимы.
+    charge — куда еще передать время вызова (например, профилировщику обработчиков).
+    """
+    for name in dir(type(obj)):
+        if name.startswith("_"):
+            continue
+        if not inspect.isfunction(inspect.getattr_static(type(obj), name)):
+            continue
+        setattr(obj, name, _timed_method(family, name, getattr(obj, name), charge))
+
+
+def _timed_method(family: HistogramFamily, name: str, method: Callable,
+                  charge: Optional[Callable[[float], None]]) -> Callable:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            family.observe(name, elapsed)
+            if charge is not None:
+                charge(elapsed)
+
+    return wrapper
+
+
+class MetricsServer(LocalHttpServer):
+    """HTTP-сервер, отдающий /metrics в формате Prometheus
+
+    Слушает только локальный адрес: метрики забирает Prometheus на той же машине.
+    """
+
+    start_path = "/metrics"
+    start_message = "Метрики доступны"
+
+    def __init__(self, registry: Union[MetricsRegistry, RegistryGroup], host: str = "127.0.0.1", port: int = 9108):
+        super().__init__(host, port)
+        self.registry = registry
+
+    def route(self, path: str) -> Optional[Tuple[str, bytes]]:
+        if path == "/metrics":
+            return "text/plain; version=0.0.4; charset=utf-8", self.registry.render().encode("utf-8")
+        return None
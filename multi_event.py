@@ -0,0 +1,211 @@
+"""
+Несколько мероприятий в одном процессе: у каждого свой бот, настройки и база
+
+Настройки мероприятия — модуль events/<имя>.py, в котором задаются только
+значения, отличающиеся от config.py: ORGANIZATION_INFO, UNIVERSITIES,
+INTERNSHIP_CHAT_ID, ADMIN_USERNAMES, переменная окружения с токеном
+(BOT_TOKEN_ENV), файл базы (DB_PATH) и т.д. Код бота (bot.py) исполняется
+отдельным модулем на каждое мероприятие поверх своей копии config, поэтому
+регистрации, диалоги, сессии, администраторы, очереди и билеты у мероприятий
+раздельные. Общие на процесс: загруженные библиотеки, цикл событий, пул
+соединений с Bot API, темп рассылок, сторож цикла событий и сервер метрик
+(метрики каждого мероприятия — с меткой event).
+
+Запуск: python multi_event.py [имя ...] (без имен — все мероприятия из events/)
+"""
+import asyncio
+import copy
+import importlib.util
+import os
+import signal
+import sys
+from types import ModuleType
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application
+from telegram.request import HTTPXRequest
+
+import config
+from apicalls import PooledRequest
+from broadcast import BroadcastRunner, RateLimiter
+from logger import log_error, log_info, log_success
+from loop_watchdog import LoopWatchdog
+from metrics import MetricsServer, RegistryGroup
+from perf import charge_api
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BOT_PATH = os.path.join(ROOT, "bot.py")
+EVENTS_DIR = os.path.join(ROOT, "events")
+
+# Модули, которые читают config при импорте и поэтому загружаются заново для каждого мероприятия
+CONFIG_DEPENDENT_MODULES = ("keyboards",)
+
+
+def event_names() -> List[str]:
+    """Мероприятия из каталога events/ (файлы, начинающиеся с _, пропускаются)"""
+    if not os.path.isdir(EVENTS_DIR):
+        return []
+    return sorted(
+        name[:-3] for name in os.listdir(EVENTS_DIR)
+        if name.endswith(".py") and not name.startswith("_")
+    )
+
+
+def event_config(name: str, overrides: Optional[Dict] = None) -> ModuleType:
+    """Копия config с настройками мероприятия из events/<имя>.py (и overrides поверх них)"""
+    module = ModuleType("config", f"Настройки мероприятия {name}")
+    module.__dict__.update(copy.deepcopy({key: value for key, value in vars(config).items() if key.isupper()}))
+
+    path = os.path.join(EVENTS_DIR, f"{name}.py")
+    if os.path.exists(path):
+        spec = importlib.util.spec_from_file_location(f"events.{name}", path)
+        settings = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(settings)
+        module.__dict__.update({key: value for key, value in vars(settings).items() if key.isupper()})
+    elif overrides is None:
+        raise FileNotFoundError(f"Нет настроек мероприятия {path}")
+
+    module.__dict__.update(overrides or {})
+    module.EVENT_NAME = name
+    return module
+
+
+def load_event(name: str, event_settings: ModuleType) -> ModuleType:
+    """Исполнение bot.py отдельным модулем, который видит event_settings как config"""
+    saved = {key: sys.modules.get(key) for key in ("config",) + CONFIG_DEPENDENT_MODULES}
+    sys.modules["config"] = event_settings
+    for key in CONFIG_DEPENDENT_MODULES:
+        sys.modules.pop(key, None)
+    try:
+        spec = importlib.util.spec_from_file_location(f"bot_{name}", BOT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                sys.modules.pop(key, None)
+            else:
+                sys.modules[key] = value
+    return module
+
+
+class EventHost:
+    """Мероприятия одного процесса и общие для них ресурсы
+
+    add() загружает мероприятие и подменяет его собственные темп рассылок,
+    сторож цикла событий и сервер метрик общими; start() собирает приложения
+    на общем пуле соединений и запускает опрос Bot API для всех мероприятий.
+    """
+
+    def __init__(self, pool_size: int = 256):
+        self.pool_size = pool_size
+        self.bots: Dict[str, ModuleType] = {}
+        self.settings: Dict[str, ModuleType] = {}
+        self.applications: Dict[str, Application] = {}
+        # Темп рассылок — общий на процесс, а не на каждого бота
+        self.limiter = RateLimiter(config.BROADCAST_RATE_PER_SECOND)
+        # Цикл событий один — и сторож один
+        self.watchdog = LoopWatchdog(config.LOOP_STALL_THRESHOLD_SECONDS, config.LOOP_STALL_MAX_RECORDS)
+        self.metrics_server: Optional[MetricsServer] = None
+        self._pool: Optional[HTTPXRequest] = None
+        self._updates_pool: Optional[HTTPXRequest] = None
+
+    def add(self, name: str, overrides: Optional[Dict] = None) -> ModuleType:
+        settings = event_config(name, overrides)
+        for other, other_settings in self.settings.items():
+            if os.path.abspath(other_settings.DB_PATH) == os.path.abspath(settings.DB_PATH):
+                raise ValueError(f"У мероприятий {other} и {name} одна база {settings.DB_PATH}")
+
+        bot = load_event(name, settings)
+        bot.loop_watchdog = self.watchdog
+        bot.broadcast_runner = BroadcastRunner(
+            bot.db, settings.BROADCAST_RATE_PER_SECOND, settings.BROADCAST_BATCH_SIZE, limiter=self.limiter
+        )
+        bot.metrics_server = None
+        self.bots[name] = bot
+        self.settings[name] = settings
+        log_info(f"Мероприятие {name}: {settings.ORGANIZATION_INFO['event_name']}, база {settings.DB_PATH}")
+        return bot
+
+    async def start(self) -> None:
+        self._pool = HTTPXRequest(connection_pool_size=self.pool_size)
+        # getUpdates держит соединение все время опроса — по одному на мероприятие
+        self._updates_pool = HTTPXRequest(connection_pool_size=max(1, len(self.bots)))
+        await self._pool.initialize()
+        await self._updates_pool.initialize()
+
+        for name, bot in self.bots.items():
+            settings = self.settings[name]
+            token = os.getenv(settings.BOT_TOKEN_ENV)
+            if not token:
+                log_error(f"Мероприятие {name} пропущено: {settings.BOT_TOKEN_ENV} не найден в .env файле")
+                continue
+            application = bot.build_application(
+                token,
+                getattr(settings, "BOT_API_BASE_URL", None) or os.getenv("BOT_API_BASE_URL"),
+                request=PooledRequest(self._pool, bot.api_calls, charge=charge_api),
+                get_updates_request=PooledRequest(self._updates_pool)
+            )
+            # То же, что делает run_polling, но для нескольких приложений в одном цикле
+            await application.initialize()
+            await bot.on_startup(application)
+            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            await application.start()
+            self.applications[name] = application
+
+        if config.METRICS_PORT:
+            self.metrics_server = MetricsServer(
+                RegistryGroup([bot.metrics for bot in self.bots.values()]), config.METRICS_HOST, config.METRICS_PORT
+            )
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                log_error(f"Сервер метрик не запущен ({config.METRICS_HOST}:{config.METRICS_PORT}): {e}")
+
+    async def stop(self) -> None:
+        for name, application in self.applications.items():
+            if application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await self.bots[name].on_shutdown(application)
+            await application.shutdown()
+        self.applications.clear()
+
+        if self.metrics_server:
+            await self.metrics_server.stop()
+            self.metrics_server = None
+        await self.watchdog.stop()
+        for pool in (self._pool, self._updates_pool):
+            if pool is not None:
+                await pool.shutdown()
+
+
+async def serve(names: List[str]) -> None:
+    host = EventHost()
+    for name in names:
+        host.add(name)
+    await host.start()
+    log_success(f"🤖 Запущено мероприятий: {len(host.applications)} из {len(names)}. Ожидание сообщений...")
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        await host.stop()
+
+
+def main():
+    names = sys.argv[1:] or event_names()
+    if not names:
+        log_error(f"Нет мероприятий: добавьте настройки в {EVENTS_DIR}")
+        return
+    asyncio.run(serve(names))
+
+
+if __name__ == '__main__':
+    main()
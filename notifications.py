@@ -0,0 +1,174 @@
+"""
+Модуль уведомлений о новых регистрациях: мгновенный режим и режим сводок (digest)
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Максимальная длина одного сообщения в Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+MODE_IMMEDIATE = "immediate"
+MODE_DIGEST = "digest"
+
+
+def format_registration_entry(registration_data: Dict, interest_text: Optional[str] = None) -> str:
+    """Форматирование одной регистрации для уведомления"""
+    username_display = f"@{registration_data['telegram_username']}" if registration_data['telegram_username'] else "не указан"
+    if interest_text is None:
+        interest_text = "✅ Да" if registration_data.get('interested_in_internship', False) else "❌ Нет"
+
+    entry = (
+        f"👤 ФИО: {registration_data['full_name']}\n"
+        f"📅 Дата рождения: {registration_data['birth_date']}\n"
+        f"📧 Email: {registration_data['email']}\n"
+        f"📱 Телефон: {registration_data['phone']}\n"
+        f"🎓 Университет: {registration_data['university']}\n"
+        f"📚 Курс: {registration_data['course']}\n"
+        f"💼 Стажировки: {interest_text}\n"
+        f"🆔 Telegram: {username_display}\n"
+        f"🕐 Время: {datetime.fromisoformat(registration_data['registration_datetime']).strftime('%d.%m.%Y %H:%M:%S')}\n"
+    )
+    if registration_data.get('status') == 'waitlist':
+        entry += "🎟 Статус: лист ожидания\n"
+    return entry
+
+
+def format_confirmation_email(registration_data: Dict, venue: str, ticket: Optional[str] = None,
+                              event_name: str = "Future Wave",
+                              event_description: str = "Форум по поиску работы") -> Tuple[str, str]:
+    """Тема и текст письма участнику после регистрации"""
+    if registration_data.get('status') == 'waitlist':
+        subject = f"{event_name}: вы в листе ожидания"
+        status_text = (
+            "Все места на площадке сейчас заняты, поэтому вы добавлены в лист ожидания.\n"
+            "Как только освободится место, бот пришлёт сообщение в Telegram."
+        )
+    else:
+        subject = f"{event_name}: регистрация подтверждена"
+        status_text = f"Вы успешно зарегистрированы на {event_description.lower()} {event_name}."
+
+    ticket_text = ""
+    if ticket:
+        ticket_text = f"Ваш билет: {ticket}\nПокажите этот код на входе (QR-код — командой /ticket в боте).\n\n"
+
+    body = (
+        f"Здравствуйте, {registration_data['full_name']}!\n\n"
+        f"{status_text}\n\n"
+        f"Место проведения: {venue}\n\n"
+        "Ваши данные:\n"
+        f"Дата рождения: {registration_data['birth_date']}\n"
+        f"Телефон: {registration_data['phone']}\n"
+        f"Университет: {registration_data['university']}\n"
+        f"Курс: {registration_data['course']}\n\n"
+        f"{ticket_text}"
+        "Если вы не регистрировались на форум, просто проигнорируйте это письмо.\n\n"
+        "До встречи на форуме!\n"
+        f"Команда {event_name}"
+    )
+    return subject, body
+
+
+# Заголовок выгрузки регистраций для админов
+CSV_HEADER = "ФИО,Дата рождения,Email,Телефон,Университет,Курс,Telegram,Дата регистрации,Статус\n"
+
+
+def format_registrations_csv(registrations: List[Dict]) -> str:
+    """Выгрузка регистраций в CSV для админ-панели"""
+    lines = [CSV_HEADER]
+    for reg in registrations:
+        username = reg['telegram_username'] or ''
+        lines.append(
+            f"{reg['full_name']},{reg['birth_date']},{reg['email']},"
+            f"{reg['phone']},{reg['university']},{reg['course']},"
+            f"@{username},{reg['registration_datetime']},{reg['status']}\n"
+        )
+    return "".join(lines)
+
+
+def split_message(header: str, entries: List[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """Разбиение сводки на сообщения не длиннее лимита Telegram (по границам записей)"""
+    messages = []
+    current = header
+
+    for entry in entries:
+        block = f"\n{entry}"
+        if len(current) + len(block) > limit and current != header:
+            messages.append(current)
+            current = header
+        if len(current) + len(block) > limit:
+            # Одна запись длиннее лимита — режем её по символам
+            for start in range(0, len(block), limit - len(header)):
+                messages.append(header + block[start:start + limit - len(header)])
+            current = header
+            continue
+        current += block
+
+    if current != header:
+        messages.append(current)
+
+    return messages
+
+
+class NotificationDigest:
+    """Накопление уведомлений и отправка одной сводкой на каждый чат-получатель
+
+    Сводка отправляется по истечении окна window_seconds с момента первой
+    накопленной записи либо сразу, как только для чата набралось max_batch записей.
+    """
+
+    def __init__(self, window_seconds: float, max_batch: int):
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._entries: Dict[int, List[str]] = {}
+        self._titles: Dict[int, str] = {}
+        self._timer: Optional[asyncio.Task] = None
+        # Отправки заполненных сводок: ссылки держатся до завершения, flush() их дожидается
+        self._sending: Set[asyncio.Task] = set()
+        self._bot = None
+
+    def pending_count(self) -> int:
+        """Количество записей, ожидающих отправки"""
+        return sum(len(entries) for entries in self._entries.values())
+
+    def add(self, bot, chat_id: int, title: str, entry: str) -> None:
+        """Добавление записи в сводку для чата"""
+        self._bot = bot
+        self._titles[chat_id] = title
+        entries = self._entries.setdefault(chat_id, [])
+        entries.append(entry)
+
+        if len(entries) >= self.max_batch:
+            task = asyncio.create_task(self.flush_chat(chat_id))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        """Отправка всех сводок по истечении окна"""
+        await asyncio.sleep(self.window_seconds)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Немедленная отправка всех накопленных сводок (и ожидание уже начатых отправок)"""
+        for chat_id in list(self._entries):
+            await self.flush_chat(chat_id)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    async def flush_chat(self, chat_id: int) -> None:
+        """Немедленная отправка сводки для одного чата"""
+        entries = self._entries.pop(chat_id, None)
+        if not entries or self._bot is None:
+            return
+
+        header = f"{self._titles.get(chat_id, '🆕 НОВЫЕ РЕГИСТРАЦИИ')} ({len(entries)})\n"
+        for text in split_message(header, entries):
+            try:
+                await self._bot.send_message(chat_id=chat_id, text=text)
+            except Exception as e:
+                logger.error(f"Error sending digest to {chat_id}: {e}")
@@ -0,0 +1,171 @@
+"""
+Профилирование обработчиков: время по частям (БД, Bot API, Python) и выборочный cProfile
+
+Каждый обработчик оборачивается PerfRecorder.instrument. На время обработки
+в контекстной переменной лежит счетчик, в который обертки методов Database и
+CountingRequest добавляют свое время, поэтому для каждого обновления известно,
+сколько ушло на SQLite, сколько на ожидание Bot API, а остальное — Python.
+Небольшая доля обновлений выполняется под cProfile; из профиля сохраняются
+только самые горячие стеки вызовов.
+"""
+import functools
+import os
+import random
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Индексы в счетчике времени текущего обработчика
+DB = 0
+API = 1
+
+_costs: ContextVar[Optional[List[float]]] = ContextVar("handler_costs", default=None)
+
+
+def charge(kind: int, seconds: float) -> None:
+    """Добавить время к текущему обработчику (вне обработчиков ничего не делает)"""
+    costs = _costs.get()
+    if costs is not None:
+        costs[kind] += seconds
+
+
+charge_db = functools.partial(charge, DB)
+charge_api = functools.partial(charge, API)
+
+
+def _frame_name(func: Tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{lineno}({name})"
+
+
+def hottest_stacks(profiler, limit: int = 3, depth: int = 8) -> List[Tuple[str, float]]:
+    """Самые затратные функции профиля (по собственному времени) со стеком их вызова
+
+    Стек восстанавливается по самому затратному вызывающему на каждом уровне —
+    cProfile хранит только пары вызывающий/вызываемый, а не полные стеки.
+    """
+    import pstats
+
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(
+        (item for item in stats.items() if "disable" not in item[0][2]),
+        key=lambda item: item[1][2],
+        reverse=True
+    )
+
+    stacks = []
+    for func, (_, _, own_time, _, callers) in ranked[:limit]:
+        frames = [_frame_name(func)]
+        seen = {func}
+        while callers and len(frames) < depth:
+            caller = max(callers, key=lambda candidate: callers[candidate][3])
+            if caller in seen:
+                break
+            seen.add(caller)
+            frames.append(_frame_name(caller))
+            callers = stats.get(caller, (0, 0, 0, 0, {}))[4]
+        stacks.append((" ← ".join(frames), own_time))
+    return stacks
+
+
+class PerfRecorder:
+    """Замеры обработчиков за последние window_seconds и выборочные профили
+
+    Замер — (время, обработчик, всего, БД, Bot API). Профилируется доля
+    sample_rate обновлений и не больше одного за раз: cProfile не бывает
+    вложенным, а пока профиль включен, в него попадают и другие задачи цикла.
+    """
+
+    def __init__(self, window_seconds: float, sample_rate: float = 0.0,
+                 max_records: int = 50000, max_profiles: int = 500):
+        self.window_seconds = window_seconds
+        self.sample_rate = sample_rate
+        self._records: deque = deque(maxlen=max_records)
+        self._profiles: deque = deque(maxlen=max_profiles)
+        self._profiling = False
+        self.profiles_total = 0
+
+    def instrument(self, name: str, callback: Callable, family=None) -> Callable:
+        """Обертка асинхронного обработчика; family — гистограмма метрик по имени обработчика"""
+
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            costs = [0.0, 0.0]
+            token = _costs.set(costs)
+            profiler = None
+            if self.sample_rate and not self._profiling and random.random() < self.sample_rate:
+                # cProfile и pstats импортируются при первом профиле, а не при запуске бота
+                import cProfile
+
+                self._profiling = True
+                profiler = cProfile.Profile()
+                profiler.enable()
+            start = time.perf_counter()
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                if profiler is not None:
+                    profiler.disable()
+                    self._profiling = False
+                    self.profiles_total += 1
+                    self._profiles.append((time.monotonic(), name, elapsed, hottest_stacks(profiler)))
+                _costs.reset(token)
+                self._records.append((time.monotonic(), name, elapsed, costs[DB], costs[API]))
+                if family is not None:
+                    family.observe(name, elapsed)
+
+        return wrapper
+
+    @staticmethod
+    def _recent(items: deque, minutes: float) -> list:
+        cutoff = time.monotonic() - minutes * 60
+        recent = []
+        for item in reversed(items):
+            if item[0] < cutoff:
+                break
+            recent.append(item)
+        return recent
+
+    def slow_handlers(self, minutes: float, limit: int = 5) -> List[Dict]:
+        """Обработчики с наибольшим p95 за последние minutes минут"""
+        by_name: Dict[str, list] = defaultdict(list)
+        for _, name, elapsed, db_time, api_time in self._recent(self._records, minutes):
+            by_name[name].append((elapsed, db_time, api_time))
+
+        summary = []
+        for name, samples in by_name.items():
+            durations = sorted(sample[0] for sample in samples)
+            total = sum(durations)
+            db_time = sum(sample[1] for sample in samples)
+            api_time = sum(sample[2] for sample in samples)
+            summary.append({
+                'name': name,
+                'count': len(durations),
+                'p50': durations[len(durations) // 2],
+                'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                'max': durations[-1],
+                'total': total,
+                'db_share': db_time / total if total else 0.0,
+                'api_share': api_time / total if total else 0.0,
+            })
+        summary.sort(key=lambda item: item['p95'], reverse=True)
+        return summary[:limit]
+
+    def hot_stacks(self, minutes: float, limit: int = 5) -> List[Dict]:
+        """Самые горячие стеки из профилей за последние minutes минут"""
+        stacks: Dict[Tuple[str, str], list] = {}
+        for _, name, _, profile_stacks in self._recent(self._profiles, minutes):
+            for stack, seconds in profile_stacks:
+                entry = stacks.setdefault((name, stack), [0.0, 0])
+                entry[0] += seconds
+                entry[1] += 1
+
+        ranked = sorted(stacks.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [
+            {'handler': name, 'stack': stack, 'seconds': seconds, 'samples': samples}
+            for (name, stack), (seconds, samples) in ranked
+        ]
@@ -0,0 +1,207 @@
+"""
+Хранение состояний диалогов и user_data в SQLite базе бота
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+from copy import deepcopy
+from typing import Dict, Optional, Set, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+
+class SQLitePersistence(BasePersistence):
+    """Persistence для python-telegram-bot с отложенной пакетной записью
+
+    Приложение передает изменения раз в update_interval секунд; здесь они
+    сравниваются с последним сохраненным состоянием, и в БД одной транзакцией
+    записываются только действительно изменившиеся записи.
+    """
+
+    def __init__(self, db_path: str = "registrations.db", update_interval: float = 5, flush_delay: float = 0.5):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.db_path = db_path
+        self.flush_delay = flush_delay
+
+        self._user_data: Optional[Dict[int, Dict]] = None
+        self._conversations: Optional[Dict[str, Dict[Tuple, object]]] = None
+
+        # Грязные записи, ожидающие записи в БД
+        self._dirty_users: Set[int] = set()
+        self._dropped_users: Set[int] = set()
+        self._dirty_conversations: Set[Tuple[str, Tuple]] = set()
+
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+        self.init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_db(self):
+        """Создание таблиц для хранения состояний"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS persistence_user_data (
+                user_id INTEGER PRIMARY KEY,
+                data TEXT NOT NULL
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS persistence_conversations (
+                name TEXT NOT NULL,
+                conversation_key TEXT NOT NULL,
+                state TEXT NOT NULL,
+                PRIMARY KEY (name, conversation_key)
+            )
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def _load(self):
+        """Загрузка всех сохраненных данных одним проходом"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT user_id, data FROM persistence_user_data")
+        self._user_data = {user_id: json.loads(data) for user_id, data in cursor.fetchall()}
+
+        cursor.execute("SELECT name, conversation_key, state FROM persistence_conversations")
+        self._conversations = {}
+        for name, key, state in cursor.fetchall():
+            self._conversations.setdefault(name, {})[tuple(json.loads(key))] = json.loads(state)
+
+        conn.close()
+
+    async def get_user_data(self) -> Dict[int, Dict]:
+        if self._user_data is None:
+            self._load()
+        return deepcopy(self._user_data)
+
+    async def get_chat_data(self) -> Dict[int, Dict]:
+        return {}
+
+    async def get_bot_data(self) -> Dict:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict:
+        if self._conversations is None:
+            self._load()
+        return dict(self._conversations.get(name, {}))
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        conversations = self._conversations.setdefault(name, {})
+        if conversations.get(key) == new_state:
+            return
+        if new_state is None:
+            conversations.pop(key, None)
+        else:
+            conversations[key] = new_state
+        self._dirty_conversations.add((name, key))
+        self._schedule_flush()
+
+    async def update_user_data(self, user_id: int, data: Dict) -> None:
+        if self._user_data.get(user_id) == data:
+            return
+        self._user_data[user_id] = data
+        self._dropped_users.discard(user_id)
+        self._dirty_users.add(user_id)
+        self._schedule_flush()
+
+    async def update_chat_data(self, chat_id: int, data: Dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: Dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._user_data.pop(user_id, None)
+        self._dirty_users.discard(user_id)
+        self._dropped_users.add(user_id)
+        self._schedule_flush()
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict) -> None:
+        pass
+
+    def _schedule_flush(self):
+        """Планирование отложенной записи (все изменения за flush_delay уходят одной транзакцией)"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Запись всех накопленных изменений в БД"""
+        async with self._flush_lock:
+            if not (self._dirty_users or self._dropped_users or self._dirty_conversations):
+                return
+
+            user_rows = [(user_id, json.dumps(self._user_data[user_id], ensure_ascii=False)) for user_id in self._dirty_users]
+            dropped_rows = [(user_id,) for user_id in self._dropped_users]
+            conversation_rows = []
+            deleted_conversations = []
+            for name, key in self._dirty_conversations:
+                state = self._conversations.get(name, {}).get(key)
+                if state is None:
+                    deleted_conversations.append((name, json.dumps(key)))
+                else:
+                    conversation_rows.append((name, json.dumps(key), json.dumps(state)))
+
+            dirty_users, self._dirty_users = self._dirty_users, set()
+            dropped_users, self._dropped_users = self._dropped_users, set()
+            dirty_conversations, self._dirty_conversations = self._dirty_conversations, set()
+
+            try:
+                await asyncio.to_thread(self._write, user_rows, dropped_rows, conversation_rows, deleted_conversations)
+            except Exception as e:
+                logger.error(f"Error flushing persistence: {e}")
+                # Возвращаем изменения в очередь, чтобы записать их при следующей попытке
+                self._dirty_users |= dirty_users - self._dropped_users
+                self._dropped_users |= dropped_users - self._dirty_users
+                self._dirty_conversations |= dirty_conversations
+
+    def _write(self, user_rows, dropped_rows, conversation_rows, deleted_conversations):
+        """Пакетная запись изменений одной транзакцией"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO persistence_user_data (user_id, data) VALUES (?, ?)", user_rows)
+                conn.executemany("DELETE FROM persistence_user_data WHERE user_id = ?", dropped_rows)
+                conn.executemany("""
+                    INSERT OR REPLACE INTO persistence_conversations (name, conversation_key, state)
+                    VALUES (?, ?, ?)
+                """, conversation_rows)
+                conn.executemany(
+                    "DELETE FROM persistence_conversations WHERE name = ? AND conversation_key = ?",
+                    deleted_conversations
+                )
+        finally:
+            conn.close()
@@ -0,0 +1,209 @@
+"""
+Запись входящих обновлений в обезличенный JSONL для воспроизведения в нагрузочных тестах
+
+Запись включается в config.py (UPDATE_RECORDING_FILE). Каждое обновление
+сохраняется с временем от начала записи, состоянием диалога пользователя на
+момент получения и признаком администратора. Персональные данные заменяются
+до записи на диск:
+  • user_id и chat_id — псевдонимы через HMAC с солью (соль в файл не пишется);
+  • имена и username — производные от псевдонима;
+  • свободный текст — случайные буквы и цифры той же формы (та же длина,
+    алфавит, регистр и пунктуация), поэтому ошибки формата, опечатки в датах
+    и неверные email/телефоны остаются такими же неверными при воспроизведении;
+  • имена команд, ответы кнопками, университеты и курсы сохраняются как
+    есть; аргументы команд (username, user_id, коды билетов) обезличиваются
+    как свободный текст.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import random
+import re
+import secrets
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+RECORDING_VERSION = 1
+
+# Поля объектов пользователя/чата, которые заменяются
+_PERSON_KEYS = {'from', 'chat', 'user', 'sender_chat', 'forward_from', 'via_bot'}
+_TEXT_KEYS = {
+    'text', 'caption', 'first_name', 'last_name', 'title', 'phone_number', 'query',
+    'forward_sender_name', 'author_signature',
+}
+
+# Команда (/cmd или /cmd@bot) и ее аргументы
+_COMMAND_RE = re.compile(r'(/\S+)(\s.*)?', re.DOTALL)
+_DATE_TOKEN_RE = re.compile(r'\b(\d{1,2})([./-])(\d{1,2})\2(\d{2,4})\b')
+_LOWER_CYRILLIC = "абвгдежзиклмнопрстуфхцчшэюя"
+_UPPER_CYRILLIC = _LOWER_CYRILLIC.upper()
+_LOWER_LATIN = "abcdefghijklmnopqrstuvwxyz"
+_UPPER_LATIN = _LOWER_LATIN.upper()
+
+
+class Anonymizer:
+    """Замена персональных данных в обновлениях с сохранением формы"""
+
+    def __init__(self, salt: bytes, keep_texts: Iterable[str] = ()):
+        self._salt = salt
+        self._keep = set(keep_texts)
+
+    def pseudonym(self, value: int) -> int:
+        """Стабильный в пределах записи псевдоним user_id/chat_id (знак сохраняется)"""
+        digest = hmac.new(self._salt, str(abs(value)).encode(), hashlib.sha256).digest()
+        pseudonym = 1_000_000_000 + int.from_bytes(digest[:4], "big") % 1_000_000_000
+        return -pseudonym if value < 0 else pseudonym
+
+    def text(self, value: str) -> str:
+        if value in self._keep:
+            return value
+        command = _COMMAND_RE.fullmatch(value)
+        if command:
+            # Имя команды нужно для воспроизведения, аргументы — персональные данные
+            name, arguments = command.groups()
+            return name + self.text(arguments) if arguments else name
+        rng = random.Random(hmac.new(self._salt, value.encode(), hashlib.sha256).digest())
+
+        # Даты: правильная дата остается правильной (меняется день), неправильная — как есть
+        dates = {}
+
+        def replace_date(match) -> str:
+            day, separator, month, year = match.groups()
+            try:
+                date(int(year), int(month), int(day))
+            except ValueError:
+                replacement = match.group(0)
+            else:
+                replacement = f"{rng.randint(1, 28):0{len(day)}d}{separator}{month}{separator}{year}"
+            dates[f"\x00{len(dates)}\x00"] = replacement
+            return f"\x00{len(dates) - 1}\x00"
+
+        value = _DATE_TOKEN_RE.sub(replace_date, value)
+
+        result = []
+        first_digit = True
+        for char in value:
+            if char.isdigit() and first_digit:
+                # Первая цифра сохраняется: префикс телефона (+7 или 8) определяет его формат
+                first_digit = False
+                result.append(char)
+            elif char.isdigit():
+                result.append(str(rng.randrange(10)))
+            elif char in _LOWER_CYRILLIC or char in "ёйщъыь":
+                result.append(rng.choice(_LOWER_CYRILLIC))
+            elif char in _UPPER_CYRILLIC or char in "ЁЙЩЪЫЬ":
+                result.append(rng.choice(_UPPER_CYRILLIC))
+            elif char.isascii() and char.islower():
+                result.append(rng.choice(_LOWER_LATIN))
+            elif char.isascii() and char.isupper():
+                result.append(rng.choice(_UPPER_LATIN))
+            else:
+                result.append(char)
+        value = "".join(result)
+
+        for marker, replacement in dates.items():
+            value = value.replace(marker, replacement)
+        return value
+
+    def web_app_data(self, data: str) -> str:
+        """Форма Web App: значения полей обезличиваются, структура сохраняется"""
+        try:
+            form = json.loads(data)
+        except ValueError:
+            return self.text(data)
+        if isinstance(form, dict):
+            form = {key: self.text(value) if isinstance(value, str) else value for key, value in form.items()}
+        return json.dumps(form, ensure_ascii=False)
+
+    def update(self, data):
+        """Обезличенная копия update.to_dict()"""
+        if isinstance(data, list):
+            return [self.update(item) for item in data]
+        if not isinstance(data, dict):
+            return data
+
+        result = {}
+        for key, value in data.items():
+            if key in _PERSON_KEYS and isinstance(value, dict) and 'id' in value:
+                result[key] = self.person(value)
+            elif key in _TEXT_KEYS and isinstance(value, str):
+                result[key] = self.text(value)
+            elif key == 'web_app_data' and isinstance(value, dict):
+                result[key] = dict(value, data=self.web_app_data(value.get('data', '')))
+            elif key in ('contact', 'location', 'venue', 'photo', 'document', 'voice', 'video', 'sticker'):
+                # Вложения для воспроизведения не нужны: остается только факт их отправки
+                result[key] = {}
+            elif key == 'chat_instance':
+                result[key] = str(self.pseudonym(int(value))) if str(value).lstrip('-').isdigit() else "0"
+            else:
+                result[key] = self.update(value)
+        return result
+
+    def person(self, value: Dict) -> Dict:
+        pseudonym = self.pseudonym(value['id'])
+        result = self.update({key: item for key, item in value.items() if key not in ('id', 'username')})
+        result['id'] = pseudonym
+        if value.get('username'):
+            result['username'] = f"u{pseudonym}"
+        return result
+
+
+class UpdateRecorder:
+    """Запись обновлений в JSONL: строка meta, затем по строке на обновление
+
+    Строка обновления: {"t": секунд от начала записи, "state": состояние диалога
+    до обработки, "admin": признак администратора, "registered": пользователь,
+    возможно, уже зарегистрирован, "update": обезличенный update}.
+    При закрытии дописывается строка final с итоговыми состояниями и статусами
+    регистраций записанных пользователей — по ним воспроизведение находит расхождения.
+    """
+
+    def __init__(self, path: str, keep_texts: Iterable[str] = (), salt: Optional[bytes] = None):
+        self.path = path
+        self.anonymizer = Anonymizer(salt or secrets.token_bytes(32), keep_texts)
+        self._file = open(path, "a", encoding="utf-8")
+        self._started = time.monotonic()
+        self._users: Dict[int, int] = {}
+        self.recorded_total = 0
+        self._write({'meta': {
+            'version': RECORDING_VERSION,
+            'started': datetime.now().isoformat(timespec='seconds'),
+        }})
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def record(self, update_data: Dict, user_id: Optional[int], state, is_admin: bool, registered: bool) -> None:
+        try:
+            anonymized = self.anonymizer.update(update_data)
+            if user_id is not None:
+                self._users[user_id] = self.anonymizer.pseudonym(user_id)
+            self._write({
+                't': round(time.monotonic() - self._started, 4),
+                'state': state,
+                'admin': is_admin,
+                'registered': registered,
+                'update': anonymized,
+            })
+            self.recorded_total += 1
+        except Exception as e:
+            logger.error(f"Ошибка записи обновления: {e}")
+
+    def user_ids(self) -> Iterable[int]:
+        return self._users.keys()
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self, final_states: Dict[int, object], statuses: Dict[int, Optional[str]]) -> None:
+        """Итоговые состояния диалогов и статусы регистраций (по настоящим user_id) и закрытие файла"""
+        self._write({'final': {
+            str(pseudonym): {'state': final_states.get(user_id), 'status': statuses.get(user_id)}
+            for user_id, pseudonym in self._users.items()
+        }})
+        self._file.close()
+        logger.info(f"Запись обновлений завершена: {self.recorded_total} в {self.path}")
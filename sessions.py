@@ -0,0 +1,88 @@
+"""
+Учет активных сессий регистрации и вытеснение брошенных сессий
+"""
+import sys
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def approximate_size(obj, _seen: Optional[set] = None) -> int:
+    """Приблизительный размер объекта в памяти (с учетом вложенных контейнеров)"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approximate_size(k, _seen) + approximate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, _seen) for item in obj)
+    return size
+
+
+class SessionRegistry:
+    """Реестр сессий регистрации: время последней активности и шаг диалога каждого пользователя
+
+    Шаг диалога записывается по значению, которое вернул обработчик диалога:
+    у ConversationHandler нет публичного способа прочитать или сбросить
+    состояние. Поэтому вытесненная сессия помечается как истекшая, и диалог
+    завершается следующим обновлением пользователя.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        # user_id -> (chat_id, время последней активности)
+        self._sessions: Dict[int, Tuple[int, float]] = {}
+        # user_id -> состояние диалога
+        self._states: Dict[int, object] = {}
+        # Вытесненные сессии, диалог которых еще не завершен
+        self._expired: Set[int] = set()
+        self.evicted_total = 0
+        self.timed_out_total = 0
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def touch(self, user_id: int, chat_id: int) -> None:
+        """Отметка активности пользователя"""
+        self._sessions[user_id] = (chat_id, time.monotonic())
+
+    def set_state(self, user_id: int, chat_id: int, state: object) -> None:
+        """Переход диалога пользователя в новое состояние (считается активностью)"""
+        self.touch(user_id, chat_id)
+        self._states[user_id] = state
+        self._expired.discard(user_id)
+
+    def state_of(self, user_id: int) -> Optional[object]:
+        return self._states.get(user_id)
+
+    def states(self) -> Dict[int, object]:
+        return dict(self._states)
+
+    def end(self, user_id: int) -> None:
+        """Завершение сессии (регистрация завершена или отменена)"""
+        self._sessions.pop(user_id, None)
+        self._states.pop(user_id, None)
+        self._expired.discard(user_id)
+
+    def expire(self, user_id: int) -> None:
+        """Вытеснение брошенной сессии: диалог завершится при следующем обновлении пользователя"""
+        self.end(user_id)
+        self._expired.add(user_id)
+        self.evicted_total += 1
+
+    def is_expired(self, user_id: int) -> bool:
+        return user_id in self._expired
+
+    def stale(self) -> List[Tuple[int, int]]:
+        """Список (user_id, chat_id) сессий без активности дольше ttl_seconds"""
+        deadline = time.monotonic() - self.ttl_seconds
+        return [(user_id, chat_id) for user_id, (chat_id, last_seen) in self._sessions.items() if last_seen < deadline]
+
+    def user_ids(self) -> List[int]:
+        return list(self._sessions)
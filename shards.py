@@ -0,0 +1,246 @@
+"""
+Процессы-обработчики по user_id: один процесс получает обновления, несколько обрабатывают
+
+Один процесс Python упирается в одно ядро. Фронт (python shards.py) получает
+обновления от Bot API и по user_id отправителя передает каждое одному из
+SHARD_COUNT процессов-обработчиков, в которых работают обычные обработчики
+bot.py. Все обновления пользователя попадают в один процесс и в исходном
+порядке, поэтому состояние его диалога хранится только там (у каждого
+процесса свой файл состояний). Ответы процессы отправляют в Bot API сами.
+
+Регистрации, администраторы и рассылки — в общей базе DB_PATH (запись защищена
+BEGIN IMMEDIATE), поэтому статистика и экспорт в админ-панели общие. Билеты на
+входе проверяются и отмечаются по общей базе, а остановка рассылки — флаг в
+ее строке, поэтому и то и другое работает из любого процесса. Счетчики в
+памяти (сессии, вызовы Bot API, очереди) каждый процесс сохраняет в базу раз в
+SHARD_STATUS_INTERVAL секунд, и /metrics и /sessions показывают их сумму по
+всем процессам.
+
+Обновления получаются через getUpdates; при переходе на вебхуки их нужно будет
+передавать в тот же ShardDispatcher.dispatch. Процессу-обработчику обновления
+идут по постоянному TCP-соединению, одна строка JSON на обновление. Bot API
+подтверждается (offset) после передачи: если процесс упадет до обработки,
+переданные ему обновления потеряются.
+
+Запуск: python shards.py [--workers 4] [--port 9200]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import sys
+from typing import Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from telegram import Update
+
+import config
+from database import Database
+from logger import setup_logging, log_error, log_info, log_success, log_warning
+
+# Long polling getUpdates (секунд) и наибольшая строка обновления
+POLL_TIMEOUT = 10
+MAX_UPDATE_BYTES = 1024 * 1024
+
+
+def shard_of(user_id: Optional[int], count: int) -> int:
+    """Номер процесса для пользователя; обновления без отправителя — в первый"""
+    return user_id % count if user_id is not None else 0
+
+
+def update_user_id(data: Dict) -> Optional[int]:
+    """user_id отправителя из JSON обновления (как update.effective_user, без разбора в объекты)"""
+    for value in data.values():
+        if isinstance(value, dict):
+            sender = value.get('from') or value.get('user')
+            if isinstance(sender, dict):
+                return sender.get('id')
+    return None
+
+
+def shard_path(path: str, name: str) -> str:
+    """Файл процесса рядом с общим: logs/bot.jsonl -> logs/bot.shard0.jsonl"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{name}{ext}"
+
+
+class ShardDispatcher:
+    """Передача обновлений процессам-обработчикам по user_id отправителя"""
+
+    def __init__(self, count: int, host: str, base_port: int):
+        self.count = count
+        self.host = host
+        self.base_port = base_port
+        self.forwarded = [0] * count
+        self._writers: List[asyncio.StreamWriter] = []
+
+    async def connect(self, timeout: float) -> None:
+        """Соединение с каждым процессом (ждет, пока процессы запустятся)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        for index in range(self.count):
+            while True:
+                try:
+                    _, writer = await asyncio.open_connection(self.host, self.base_port + index)
+                    break
+                except OSError:
+                    if loop.time() > deadline:
+                        raise
+                    await asyncio.sleep(0.1)
+            self._writers.append(writer)
+
+    def dispatch(self, data: Dict) -> None:
+        index = shard_of(update_user_id(data), self.count)
+        self._writers[index].write(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode() + b"\n")
+        self.forwarded[index] += 1
+
+    async def drain(self) -> None:
+        for writer in self._writers:
+            await writer.drain()
+
+    async def close(self) -> None:
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+
+
+async def poll_updates(dispatcher: ShardDispatcher, token: str, base_url: Optional[str]) -> None:
+    """getUpdates без разбора обновлений в объекты: фронту нужен только user_id"""
+    url = f"{base_url or 'https://api.telegram.org/bot'}{token}"
+    offset = 0
+    async with httpx.AsyncClient(timeout=POLL_TIMEOUT + 10) as client:
+        await client.post(f"{url}/deleteWebhook")
+        while True:
+            try:
+                response = await client.post(f"{url}/getUpdates", json={
+                    'offset': offset, 'timeout': POLL_TIMEOUT, 'allowed_updates': Update.ALL_TYPES
+                })
+                payload = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                log_warning(f"Ошибка getUpdates: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not payload.get('ok'):
+                log_warning(f"Ошибка getUpdates: {payload.get('description')}")
+                await asyncio.sleep(1)
+                continue
+            for data in payload['result']:
+                offset = data['update_id'] + 1
+                dispatcher.dispatch(data)
+            await dispatcher.drain()
+
+
+def configure_worker(index: int, count: int) -> None:
+    """Настройки процесса-обработчика поверх config.py (до импорта bot)"""
+    config.SHARD_INDEX = index
+    config.SHARD_COUNT = count
+    config.PERSISTENCE_PATH = shard_path(config.DB_PATH, f"shard{index}")
+    config.LOG_FILE = shard_path(config.LOG_FILE, f"shard{index}")
+    # Лимит одновременных регистраций — на все процессы вместе
+    config.MAX_ACTIVE_SESSIONS = math.ceil(config.MAX_ACTIVE_SESSIONS / count)
+    if config.METRICS_PORT:
+        config.METRICS_PORT += index
+    if config.UPDATE_RECORDING_FILE:
+        config.UPDATE_RECORDING_FILE = shard_path(config.UPDATE_RECORDING_FILE, f"shard{index}")
+    # Страницу формы Web App отдает первый процесс; кнопка формы остается у всех
+    config.WEBAPP_SERVE = index == 0
+
+
+async def run_worker(index: int, count: int, base_port: int) -> None:
+    configure_worker(index, count)
+    import bot
+
+    token = os.getenv(config.BOT_TOKEN_ENV)
+    if not token:
+        log_error(f"Ошибка: {config.BOT_TOKEN_ENV} не найден в .env файле")
+        return
+    application = bot.build_application(token, os.getenv('BOT_API_BASE_URL'))
+    # Как run_polling, но обновления приходят от фронта, а не из getUpdates
+    await application.initialize()
+    await bot.on_startup(application)
+    await application.start()
+
+    async def receive(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                await application.update_queue.put(Update.de_json(json.loads(line), application.bot))
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(receive, config.SHARD_HOST, base_port + index, limit=MAX_UPDATE_BYTES)
+    log_success(f"Процесс-обработчик {index + 1} из {count} принимает обновления на порту {base_port + index}")
+
+    await wait_for_signal()
+    server.close()
+    await server.wait_closed()
+    await application.stop()
+    await bot.on_shutdown(application)
+    await application.shutdown()
+
+
+async def wait_for_signal() -> None:
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    await stopped.wait()
+
+
+async def run_front(count: int, base_port: int) -> None:
+    token = os.getenv(config.BOT_TOKEN_ENV)
+    if not token:
+        log_error(f"Ошибка: {config.BOT_TOKEN_ENV} не найден в .env файле")
+        return
+    # Схема общей базы создается до запуска процессов, а не всеми сразу
+    Database(config.DB_PATH)
+
+    workers = [
+        await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--worker", str(index),
+            "--workers", str(count), "--port", str(base_port)
+        )
+        for index in range(count)
+    ]
+    dispatcher = ShardDispatcher(count, config.SHARD_HOST, base_port)
+    poller = None
+    try:
+        await dispatcher.connect(timeout=120)
+        poller = asyncio.create_task(poll_updates(dispatcher, token, os.getenv('BOT_API_BASE_URL')))
+        log_success(f"🤖 Бот запущен: {count} процессов-обработчиков. Ожидание сообщений...")
+        stop = asyncio.create_task(wait_for_signal())
+        await asyncio.wait([poller, stop], return_when=asyncio.FIRST_COMPLETED)
+        if poller.done():
+            poller.result()
+    finally:
+        if poller:
+            poller.cancel()
+        await dispatcher.close()
+        for worker in workers:
+            if worker.returncode is None:
+                worker.send_signal(signal.SIGTERM)
+        for worker in workers:
+            await worker.wait()
+        log_info(f"Передано обновлений по процессам: {dispatcher.forwarded}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бот в нескольких процессах-обработчиках по user_id")
+    parser.add_argument("--workers", type=int, default=config.SHARD_COUNT)
+    parser.add_argument("--port", type=int, default=config.SHARD_BASE_PORT, help="порт первого процесса")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    load_dotenv()
+    if args.worker is not None:
+        asyncio.run(run_worker(args.worker, args.workers, args.port))
+        return
+    setup_logging(shard_path(config.LOG_FILE, "front"), config.LOG_MAX_BYTES, config.LOG_BACKUP_COUNT,
+                  config.LOG_SAMPLE_RATES)
+    asyncio.run(run_front(args.workers, args.port))
+
+
+if __name__ == '__main__':
+    main()
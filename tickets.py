@@ -0,0 +1,187 @@
+"""
+Билеты участников с HMAC-подписью и отметка прохода на площадку
+"""
+import base64
+import hashlib
+import hmac
+import io
+import re
+import secrets
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Длина подписи в байтах (80 бит — подобрать подпись перебором нереально)
+SIGNATURE_BYTES = 10
+
+_CODE_RE = re.compile(r'([A-Z]+)-(\d+)-([A-Z2-7]+)')
+
+# Результаты сканирования билета
+SCAN_OK = "ok"
+SCAN_DUPLICATE = "duplicate"
+SCAN_INVALID = "invalid"
+SCAN_REVOKED = "revoked"
+# Списки участников еще загружаются после запуска
+SCAN_NOT_READY = "not_ready"
+
+
+def ticket_secret(explicit: Optional[str], bot_token: Optional[str]) -> bytes:
+    """Секрет подписи билетов: TICKET_SECRET или, если он не задан, производный от токена бота
+
+    Производный секрет стабилен между перезапусками (билеты остаются
+    действительными), но меняется вместе с токеном.
+    """
+    if explicit:
+        return explicit.encode()
+    if bot_token:
+        return hmac.new(bot_token.encode(), b"future-wave-tickets", hashlib.sha256).digest()
+    # Без токена бот не работает; случайный секрет годится только для локальных прогонов
+    return secrets.token_bytes(32)
+
+
+class TicketSigner:
+    """Выдача и проверка кодов билетов вида FW-<user_id>-<подпись>
+
+    Подпись — усеченный HMAC-SHA256 от user_id, поэтому код проверяется
+    без обращения к БД: достаточно секрета.
+    """
+
+    def __init__(self, secret: bytes, prefix: str = "FW"):
+        self._secret = secret
+        self.prefix = prefix
+
+    def _signature(self, user_id: int) -> str:
+        digest = hmac.new(self._secret, f"{self.prefix}:{user_id}".encode(), hashlib.sha256).digest()
+        return base64.b32encode(digest[:SIGNATURE_BYTES]).decode().rstrip("=")
+
+    def issue(self, user_id: int) -> str:
+        return f"{self.prefix}-{user_id}-{self._signature(user_id)}"
+
+    def verify(self, code: str) -> Optional[int]:
+        """user_id из кода билета или None, если код поддельный или поврежден"""
+        match = _CODE_RE.fullmatch(code.strip().upper())
+        if not match or match.group(1) != self.prefix:
+            return None
+        user_id = int(match.group(2))
+        if not hmac.compare_digest(match.group(3), self._signature(user_id)):
+            return None
+        return user_id
+
+
+def render_qr(code: str) -> Optional[bytes]:
+    """PNG с QR-кодом билета или None, если библиотека qrcode не установлена"""
+    try:
+        import qrcode
+    except ImportError:
+        return None
+
+    buffer = io.BytesIO()
+    qrcode.make(code).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class CheckInDesk:
+    """Отметка прохода: проверка и поиск повторов в памяти, запись в БД порциями
+
+    roster — участники с местом на площадке (user_id -> ФИО), checked_in — уже
+    прошедшие (user_id -> время прохода). Оба индекса загружаются при старте и
+    обновляются в памяти; новые отметки копятся в pending и сбрасываются в БД
+    одним executemany. Индексы загружаются в фоне после запуска: до загрузки
+    билеты не проверяются, а выданные и отмененные места запоминаются и
+    применяются поверх загруженного снимка.
+
+    Если список мест и отметки делят несколько процессов, передаются lookup и
+    record: lookup(user_id) — ФИО участника с местом (или None) по общей БД,
+    record(user_id, время, кто) — отметка сразу в общую таблицу, возвращает
+    (отмечен сейчас, время первого прохода) или None при ошибке записи —
+    тогда отметка уходит в pending.
+    """
+
+    def __init__(self, signer: TicketSigner, lookup: Optional[Callable[[int], Optional[str]]] = None,
+                 record: Optional[Callable[[int, str, Optional[int]], Optional[Tuple[bool, str]]]] = None):
+        self.signer = signer
+        self.lookup = lookup
+        self.record = record
+        self.roster: Dict[int, str] = {}
+        self.checked_in: Dict[int, str] = {}
+        self._pending: List[Tuple[int, str, Optional[int]]] = []
+        self._changes: List[Tuple[int, Optional[str]]] = []
+        self.loaded = False
+        self.scans_total = 0
+        self.duplicates_total = 0
+        self.invalid_total = 0
+
+    def load(self, roster: Dict[int, str], checked_in: Dict[int, str]) -> None:
+        roster = dict(roster)
+        for user_id, full_name in self._changes:
+            if full_name is None:
+                roster.pop(user_id, None)
+            else:
+                roster[user_id] = full_name
+        self._changes = []
+        self.roster = roster
+        self.checked_in = dict(checked_in)
+        self.loaded = True
+
+    def admit(self, user_id: int, full_name: str) -> None:
+        """Участник получил место на площадке"""
+        self.roster[user_id] = full_name
+        if not self.loaded:
+            self._changes.append((user_id, full_name))
+
+    def revoke(self, user_id: int) -> None:
+        """Участник отменил регистрацию — его билет больше не действует"""
+        self.roster.pop(user_id, None)
+        if not self.loaded:
+            self._changes.append((user_id, None))
+
+    def scan(self, code: str, scanned_by: Optional[int] = None) -> Tuple[str, Optional[int], Optional[str]]:
+        """Проверка билета: (результат, user_id, время прохода — новое или предыдущее)"""
+        if not self.loaded:
+            return SCAN_NOT_READY, None, None
+
+        self.scans_total += 1
+
+        user_id = self.signer.verify(code)
+        if user_id is None:
+            self.invalid_total += 1
+            return SCAN_INVALID, None, None
+
+        if self.lookup is not None:
+            full_name = self.lookup(user_id)
+            if full_name is None:
+                self.roster.pop(user_id, None)
+            else:
+                self.roster[user_id] = full_name
+
+        if user_id not in self.roster:
+            self.invalid_total += 1
+            return SCAN_REVOKED, user_id, None
+
+        previous = self.checked_in.get(user_id)
+        if previous is not None:
+            self.duplicates_total += 1
+            return SCAN_DUPLICATE, user_id, previous
+
+        now = datetime.now().isoformat(timespec='seconds')
+        stored = self.record(user_id, now, scanned_by) if self.record is not None else None
+        if stored is not None and not stored[0]:
+            self.checked_in[user_id] = stored[1]
+            self.duplicates_total += 1
+            return SCAN_DUPLICATE, user_id, stored[1]
+
+        self.checked_in[user_id] = now
+        if stored is None:
+            self._pending.append((user_id, now, scanned_by))
+        return SCAN_OK, user_id, now
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def take_pending(self) -> List[Tuple[int, str, Optional[int]]]:
+        """Забрать накопленные отметки для записи в БД"""
+        pending, self._pending = self._pending, []
+        return pending
+
+    def restore_pending(self, rows: List[Tuple[int, str, Optional[int]]]) -> None:
+        """Вернуть отметки, которые не удалось записать (будут записаны со следующей порцией)"""
+        self._pending = rows + self._pending
@@ -0,0 +1,151 @@
+"""
+Валидация и нормализация полей регистрационной формы
+"""
+import re
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+MIN_AGE = 14
+MAX_AGE = 100
+
+# Шаблоны компилируются один раз при импорте
+_DATE_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_PHONE_STRIP_RE = re.compile(r'[^\d+]')
+_PHONE_RE = re.compile(r'(?:\+7|8)(\d{10})')
+
+
+class ValidationResult(NamedTuple):
+    """Результат проверки поля: нормализованное значение или текст ошибки для пользователя"""
+    value: Optional[str]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _invalid(error: str) -> ValidationResult:
+    return ValidationResult(None, error)
+
+
+def validate_full_name(text: str) -> ValidationResult:
+    """ФИО: минимум фамилия и имя, лишние пробелы схлопываются"""
+    parts = text.split()
+    if len(parts) < 2:
+        return _invalid(
+            "⚠️ Пожалуйста, введите полное ФИО (минимум Фамилия и Имя).\n"
+            "Например: Иванов Иван Иванович"
+        )
+    return ValidationResult(" ".join(parts))
+
+
+def validate_birth_date(text: str, today: Optional[date] = None) -> ValidationResult:
+    """Дата рождения в формате ДД.ММ.ГГГГ; значение — дата в формате ISO (ГГГГ-ММ-ДД)"""
+    match = _DATE_RE.fullmatch(text.strip())
+    if not match:
+        return _invalid(
+            "⚠️ Неверный формат даты. Пожалуйста, используйте формат ДД.ММ.ГГГГ\n"
+            "Например: 15.03.2003"
+        )
+
+    day, month, year = (int(part) for part in match.groups())
+    try:
+        born = date(year, month, day)
+    except ValueError:
+        return _invalid("⚠️ Указана некорректная дата. Пожалуйста, проверьте правильность ввода.")
+
+    # Полных лет — целочисленно, без деления дней на 365.25
+    today = today or date.today()
+    age = today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+    if age < MIN_AGE:
+        return _invalid(f"⚠️ К сожалению, участие в форуме доступно для лиц старше {MIN_AGE} лет.")
+    if age >= MAX_AGE:
+        return _invalid("⚠️ Пожалуйста, проверьте правильность введённой даты.")
+
+    return ValidationResult(born.isoformat())
+
+
+def format_birth_date(iso_date: str) -> str:
+    """Дата из ISO в формат ДД.ММ.ГГГГ, в котором она хранится и показывается"""
+    year, month, day = iso_date.split('-')
+    return f"{day}.{month}.{year}"
+
+
+def validate_email(text: str) -> ValidationResult:
+    """Email; значение приводится к нижнему регистру"""
+    email = text.strip()
+    if not _EMAIL_RE.fullmatch(email):
+        return _invalid(
+            "⚠️ Неверный формат email. Пожалуйста, введите корректный адрес.\n"
+            "Например: example@mail.ru"
+        )
+    return ValidationResult(email.lower())
+
+
+def validate_phone(text: str) -> ValidationResult:
+    """Российский номер телефона; значение в каноническом виде +7XXXXXXXXXX"""
+    match = _PHONE_RE.fullmatch(_PHONE_STRIP_RE.sub('', text))
+    if not match:
+        return _invalid(
+            "⚠️ Неверный формат номера телефона.\n"
+            "Пожалуйста, введите номер в формате: +79991234567 или 89991234567"
+        )
+    return ValidationResult(f"+7{match.group(1)}")
+
+
+def validate_university(text: str) -> ValidationResult:
+    """Название университета, введенное вручную"""
+    university = text.strip()
+    if len(university) < 3:
+        return _invalid("⚠️ Пожалуйста, введите корректное название университета.")
+    return ValidationResult(university)
+
+
+def validate_form(form: Dict, universities: List[str], courses: List[str],
+                  other_university: str) -> Tuple[Dict, List[str]]:
+    """Проверка всей анкеты из Web App по тем же правилам, что и пошаговый диалог
+
+    other_university — вариант списка, при котором название вводится в поле
+    university_custom. Возвращает нормализованные поля (дата рождения — в формате ДД.ММ.ГГГГ,
+    как в пошаговой регистрации) и список ошибок для пользователя.
+    """
+    fields: Dict = {}
+    errors: List[str] = []
+
+    def check(name: str, result: ValidationResult):
+        if result.ok:
+            fields[name] = result.value
+        else:
+            errors.append(result.error)
+
+    check('full_name', validate_full_name(str(form.get('full_name', ''))))
+    check('birth_date', validate_birth_date(str(form.get('birth_date', ''))))
+    check('email', validate_email(str(form.get('email', ''))))
+    check('phone', validate_phone(str(form.get('phone', ''))))
+
+    if 'birth_date' in fields:
+        fields['birth_date'] = format_birth_date(fields['birth_date'])
+
+    university = str(form.get('university', ''))
+    if university == other_university:
+        # Название вводится вручную и само название варианта за него не считается
+        check('university', validate_university(str(form.get('university_custom') or '')))
+    elif university not in universities:
+        check('university', validate_university(str(form.get('university_custom') or university)))
+    else:
+        fields['university'] = university
+
+    course = str(form.get('course', ''))
+    if course in courses:
+        fields['course'] = course
+    else:
+        errors.append("⚠️ Пожалуйста, выберите курс обучения из списка.")
+
+    fields['interested_in_internship'] = form.get('internship') is True
+
+    if form.get('consent') is not True:
+        errors.append("❌ Без согласия на обработку персональных данных мы не можем зарегистрировать вас на форум.")
+
+    return fields, errors
@@ -0,0 +1,118 @@
+"""
+Виртуальная очередь на регистрацию: ограничение числа одновременно активных сессий
+"""
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Окно (в секундах) для оценки скорости прохождения очереди
+ADMISSION_RATE_WINDOW = 300
+
+
+class WaitingRoom:
+    """FIFO-очередь пользователей, ожидающих свободного места для регистрации
+
+    Пользователь, дошедший до начала очереди, получает приглашение: место
+    резервируется за ним на invite_ttl секунд.
+    """
+
+    def __init__(self, max_active: int, invite_ttl: float, enabled: bool = False):
+        self.max_active = max_active
+        self.invite_ttl = invite_ttl
+        self.enabled = enabled
+        # user_id -> [chat_id, id сообщения с позицией, последняя показанная позиция]
+        self._queue: "OrderedDict[int, list]" = OrderedDict()
+        # user_id -> срок действия приглашения
+        self._invited: Dict[int, float] = {}
+        self._admissions: deque = deque()
+        self.admitted_total = 0
+        self.expired_total = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._queue
+
+    def invited_count(self) -> int:
+        return len(self._invited)
+
+    def free_slots(self, active: int) -> int:
+        """Количество мест, которые можно отдать новым пользователям"""
+        return self.max_active - active - len(self._invited)
+
+    def try_admit(self, user_id: int, active: int) -> bool:
+        """Можно ли пользователю начать регистрацию прямо сейчас"""
+        if not self.enabled:
+            return True
+
+        deadline = self._invited.pop(user_id, None)
+        if deadline is not None and deadline >= time.monotonic():
+            self._record_admission()
+            return True
+
+        if not self._queue and self.free_slots(active) > 0:
+            self._record_admission()
+            return True
+
+        return False
+
+    def enqueue(self, user_id: int, chat_id: int) -> int:
+        """Постановка в конец очереди (повторный /start не сдвигает позицию)"""
+        if user_id not in self._queue:
+            self._queue[user_id] = [chat_id, None, None]
+            return len(self._queue)
+        return self.position(user_id)
+
+    def position(self, user_id: int) -> Optional[int]:
+        for position, queued_id in enumerate(self._queue, 1):
+            if queued_id == user_id:
+                return position
+        return None
+
+    def set_status_message(self, user_id: int, message_id: int, position: int) -> None:
+        """Запоминание сообщения с позицией, чтобы обновлять его, а не присылать новое"""
+        entry = self._queue.get(user_id)
+        if entry is not None:
+            entry[1] = message_id
+            entry[2] = position
+
+    def waiting(self) -> Iterator[Tuple[int, int, int, Optional[int], Optional[int]]]:
+        """(позиция, user_id, chat_id, id сообщения, последняя показанная позиция)"""
+        for position, (user_id, (chat_id, message_id, shown)) in enumerate(self._queue.items(), 1):
+            yield position, user_id, chat_id, message_id, shown
+
+    def release(self, active: int) -> List[Tuple[int, int]]:
+        """Истечение старых приглашений и выдача новых на освободившиеся места
+
+        Возвращает список (user_id, chat_id) приглашенных пользователей.
+        """
+        now = time.monotonic()
+        for user_id in [u for u, deadline in self._invited.items() if deadline < now]:
+            del self._invited[user_id]
+            self.expired_total += 1
+
+        invited = []
+        while self._queue and self.free_slots(active) > 0:
+            user_id, (chat_id, _, _) = self._queue.popitem(last=False)
+            self._invited[user_id] = now + self.invite_ttl
+            invited.append((user_id, chat_id))
+        return invited
+
+    def _record_admission(self):
+        now = time.monotonic()
+        self._admissions.append(now)
+        self.admitted_total += 1
+        while self._admissions and self._admissions[0] < now - ADMISSION_RATE_WINDOW:
+            self._admissions.popleft()
+
+    def estimate_wait(self, position: int) -> Optional[float]:
+        """Примерное время ожидания в секундах по скорости прохождения очереди"""
+        now = time.monotonic()
+        while self._admissions and self._admissions[0] < now - ADMISSION_RATE_WINDOW:
+            self._admissions.popleft()
+        if not self._admissions:
+            return None
+        span = max(now - self._admissions[0], 1.0)
+        rate = len(self._admissions) / span
+        return position / rate
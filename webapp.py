@@ -0,0 +1,110 @@
+"""
+Регистрационная форма Telegram Web App и локальный HTTP-сервер для ее раздачи
+
+Форма собирает все поля за один шаг и отправляет их боту через
+Telegram.WebApp.sendData — бот получает сообщение с web_app_data.
+Telegram открывает Web App только по HTTPS, поэтому сервер слушает локальный
+адрес, а наружу публикуется через reverse proxy (адрес — WEBAPP_URL).
+"""
+import html
+import json
+from typing import List, Optional, Tuple
+
+from httpserver import TEXT_PLAIN, LocalHttpServer
+
+_FORM_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Регистрация на {event_name}</title>
+<script src="https://telegram.org/js/telegram-web-app.js"></script>
+<style>
+body {{ font-family: sans-serif; margin: 16px; color: var(--tg-theme-text-color, #000); background: var(--tg-theme-bg-color, #fff); }}
+label {{ display: block; margin-top: 12px; font-size: 14px; }}
+input, select {{ width: 100%; box-sizing: border-box; padding: 8px; margin-top: 4px; font-size: 16px; }}
+input[type=checkbox] {{ width: auto; }}
+a {{ color: var(--tg-theme-link-color, #2481cc); }}
+#university_custom_block {{ display: none; }}
+#error {{ color: #d33; margin-top: 12px; }}
+</style>
+</head>
+<body>
+<h3>Регистрация на форум {event_name}</h3>
+<p>📍 {venue}</p>
+<form id="form">
+<label>ФИО<input name="full_name" required placeholder="Иванов Иван Иванович"></label>
+<label>Дата рождения<input name="birth_date" required pattern="\\d{{2}}\\.\\d{{2}}\\.\\d{{4}}" placeholder="15.03.2003"></label>
+<label>Email<input name="email" type="email" required placeholder="example@mail.ru"></label>
+<label>Телефон<input name="phone" type="tel" required placeholder="+79991234567"></label>
+<label>Университет<select name="university" id="university">{universities}</select></label>
+<label id="university_custom_block">Название университета<input name="university_custom"></label>
+<label>Курс<select name="course">{courses}</select></label>
+<label><input type="checkbox" name="internship"> Мне интересны стажировки</label>
+<label><input type="checkbox" name="consent" required> Даю <a href="{consent_url}">согласие на обработку персональных данных</a>
+и ознакомлен(а) с <a href="{privacy_url}">политикой конфиденциальности</a></label>
+<div id="error"></div>
+</form>
+<script>
+const app = window.Telegram.WebApp;
+const form = document.getElementById("form");
+const university = document.getElementById("university");
+const other = {other};
+app.ready();
+app.expand();
+university.addEventListener("change", () => {{
+  document.getElementById("university_custom_block").style.display = university.value === other ? "block" : "none";
+}});
+function submit() {{
+  if (!form.reportValidity()) return;
+  const data = Object.fromEntries(new FormData(form));
+  data.internship = form.internship.checked;
+  data.consent = form.consent.checked;
+  app.sendData(JSON.stringify(data));
+}}
+app.MainButton.setText("Зарегистрироваться").show().onClick(submit);
+form.addEventListener("submit", (event) => {{ event.preventDefault(); submit(); }});
+</script>
+</body>
+</html>
+"""
+
+
+def render_form(venue: str, universities: List[str], courses: List[str], consent_url: str, privacy_url: str,
+                other_university: str, event_name: str = "Future Wave") -> str:
+    """HTML формы; варианты университетов и курсов — те же, что на клавиатурах бота
+
+    При выборе other_university на странице появляется поле для названия.
+    """
+    def options(values: List[str]) -> str:
+        return "".join(f'<option value="{html.escape(value)}">{html.escape(value)}</option>' for value in values)
+
+    return _FORM_TEMPLATE.format(
+        event_name=html.escape(event_name),
+        venue=html.escape(venue),
+        universities=options(universities),
+        courses=options(courses),
+        consent_url=html.escape(consent_url),
+        privacy_url=html.escape(privacy_url),
+        other=json.dumps(other_university, ensure_ascii=False),
+    )
+
+
+class WebAppServer(LocalHttpServer):
+    """HTTP-сервер, отдающий страницу формы
+
+    Страница собирается один раз, сервер не обращается ни к БД, ни к Bot API.
+    """
+
+    start_message = "Форма Web App доступна"
+
+    def __init__(self, page: str, host: str = "127.0.0.1", port: int = 8080):
+        super().__init__(host, port)
+        self._page = page.encode("utf-8")
+
+    def route(self, path: str) -> Optional[Tuple[str, bytes]]:
+        if path in ("/", "/index.html"):
+            return "text/html; charset=utf-8", self._page
+        if path == "/health":
+            return TEXT_PLAIN, b"ok"
+        return None